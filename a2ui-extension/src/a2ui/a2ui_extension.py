@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import logging
-from typing import Any, Optional, List
+from typing import Any, Iterable, Optional, List
 
 from a2a.server.agent_execution import RequestContext
 from a2a.types import AgentExtension, Part, DataPart
@@ -51,6 +51,22 @@ def create_a2ui_part(a2ui_data: dict[str, Any]) -> Part:
   )
 
 
+def create_a2ui_parts(messages: Iterable[dict[str, Any]]) -> list[Part]:
+  """Creates an A2A Part for each A2UI message, in order.
+
+  Pydantic only copies the top level of `data` when validating a DataPart and
+  keeps nested values by reference, so the cost per part does not depend on
+  the size of the message.
+
+  Args:
+      messages: The A2UI messages, e.g. a validated A2UI JSON array.
+
+  Returns:
+      One A2A Part per message.
+  """
+  return [create_a2ui_part(message) for message in messages]
+
+
 def is_a2ui_part(part: Part) -> bool:
   """Checks if an A2A Part contains A2UI data.
 
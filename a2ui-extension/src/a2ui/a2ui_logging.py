@@ -0,0 +1,181 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Logging helpers for hot paths that log A2UI payloads.
+
+This module never configures logging itself; applications opt in by
+attaching `LogPolicyFilter` and, for structured logs, `JsonFormatter` to their
+handlers.
+
+  * `Payload`: wraps a value passed as a %-style logging argument so it is
+    serialized and truncated only if a handler actually formats the record.
+  * `LogPolicyFilter`: samples records below WARNING per logger and sets the
+    truncation limit of `Payload` arguments per logger.
+  * `JsonFormatter`: renders each record as one JSON object per line.
+
+Usage:
+
+  ```python
+  logger.debug("A2UI payload: %s", Payload(messages))
+
+  handler = logging.StreamHandler()
+  handler.addFilter(
+      LogPolicyFilter(
+          sample_rates={"a2ui.send_a2ui_to_client_toolset": 0.1},
+          payload_limits={"ui_builder": 2000},
+      )
+  )
+  handler.setFormatter(JsonFormatter())
+  ```
+"""
+
+import datetime
+import json
+import logging
+import random
+from typing import Any, Callable, Mapping, Optional
+
+DEFAULT_PAYLOAD_LIMIT = 500
+
+# Attributes every LogRecord has, plus the ANSI-colored copy of the message
+# uvicorn adds; anything else was passed through `extra`.
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "color_message"}
+
+
+class Payload:
+  """A logging argument that is rendered lazily and truncated.
+
+  Strings are logged as they are; other values are serialized as JSON, with
+  `str()` as the fallback for values JSON cannot represent.
+  """
+
+  __slots__ = ("value", "limit")
+
+  def __init__(self, value: Any, limit: Optional[int] = None):
+    """Initializes the payload.
+
+    Args:
+        value: The value to log.
+        limit: Maximum number of characters to render. When None, the limit
+          set by `LogPolicyFilter` or `DEFAULT_PAYLOAD_LIMIT` applies.
+    """
+    self.value = value
+    self.limit = limit
+
+  def __str__(self) -> str:
+    if isinstance(self.value, str):
+      text = self.value
+    else:
+      try:
+        text = json.dumps(self.value, ensure_ascii=False, default=str)
+      except (TypeError, ValueError):
+        text = str(self.value)
+    limit = DEFAULT_PAYLOAD_LIMIT if self.limit is None else self.limit
+    if limit <= 0 or len(text) <= limit:
+      return text
+    return f"{text[:limit]}... ({len(text)} chars)"
+
+  __repr__ = __str__
+
+
+def _longest_prefix(name: str, settings: Mapping[str, Any]) -> Optional[str]:
+  """Returns the most specific logger name in settings that covers name."""
+  while True:
+    if name in settings:
+      return name
+    if "." not in name:
+      return "" if "" in settings else None
+    name = name.rsplit(".", 1)[0]
+
+
+class LogPolicyFilter(logging.Filter):
+  """Applies per-logger sampling and payload truncation.
+
+  Settings are keyed by logger name and apply to child loggers too, the most
+  specific name winning; the key "" is the default. Records at WARNING and
+  above are never sampled out. Attach the filter to a handler so it sees
+  records from every logger.
+  """
+
+  def __init__(
+      self,
+      sample_rates: Optional[Mapping[str, float]] = None,
+      payload_limits: Optional[Mapping[str, int]] = None,
+      random_func: Callable[[], float] = random.random,
+  ):
+    """Initializes the filter.
+
+    Args:
+        sample_rates: Share of records below WARNING to keep, per logger.
+        payload_limits: Characters to render of each `Payload`, per logger;
+          0 disables truncation.
+        random_func: Source of uniform numbers in [0, 1), for tests.
+    """
+    super().__init__()
+    self._sample_rates = dict(sample_rates or {})
+    self._payload_limits = dict(payload_limits or {})
+    self._random = random_func
+    self._resolved: dict[str, tuple[float, Optional[int]]] = {}
+
+  def _settings(self, name: str) -> tuple[float, Optional[int]]:
+    settings = self._resolved.get(name)
+    if settings is None:
+      rate_key = _longest_prefix(name, self._sample_rates)
+      limit_key = _longest_prefix(name, self._payload_limits)
+      settings = (
+          1.0 if rate_key is None else self._sample_rates[rate_key],
+          None if limit_key is None else self._payload_limits[limit_key],
+      )
+      self._resolved[name] = settings
+    return settings
+
+  def filter(self, record: logging.LogRecord) -> bool:
+    rate, limit = self._settings(record.name)
+    if record.levelno < logging.WARNING and rate < 1.0:
+      if rate <= 0.0 or self._random() >= rate:
+        return False
+    if limit is not None and record.args:
+      args = record.args.values() if isinstance(record.args, dict) else record.args
+      for arg in args:
+        if isinstance(arg, Payload) and arg.limit is None:
+          arg.limit = limit
+    return True
+
+
+class JsonFormatter(logging.Formatter):
+  """Formats each record as a single-line JSON object.
+
+  The object has `time`, `level`, `logger` and `message`, `exception` when
+  the record carries exception info, and any fields passed with `extra`.
+  """
+
+  def format(self, record: logging.LogRecord) -> str:
+    entry = {
+        "time": datetime.datetime.fromtimestamp(
+            record.created, tz=datetime.timezone.utc
+        ).isoformat(timespec="milliseconds"),
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+    }
+    if record.exc_info:
+      entry["exception"] = self.formatException(record.exc_info)
+    elif record.exc_text:
+      entry["exception"] = record.exc_text
+    for key, value in record.__dict__.items():
+      if key not in _RECORD_ATTRIBUTES and key not in entry:
+        entry[key] = value
+    return json.dumps(entry, ensure_ascii=False, default=str)
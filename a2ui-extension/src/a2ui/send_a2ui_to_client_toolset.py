@@ -80,12 +80,15 @@ Usage Examples:
 import inspect
 import json
 import logging
+import time
+from collections import OrderedDict
 from typing import Any, Awaitable, Callable, Optional, TypeAlias, Union
 
 import jsonschema
 
 from a2a import types as a2a_types
-from a2ui.a2ui_extension import create_a2ui_part
+from a2ui.a2ui_extension import create_a2ui_parts
+from a2ui.a2ui_logging import Payload
 from a2ui.a2ui_schema_utils import wrap_as_json_array
 from google.adk.a2a.converters import part_converter
 from google.adk.agents.readonly_context import ReadonlyContext
@@ -106,18 +109,109 @@ A2uiSchemaProvider: TypeAlias = Callable[
 ]
 
 
+def _session_key(ctx: ReadonlyContext) -> Optional[str]:
+  """Returns the id provider results are cached under, if ctx has one."""
+  session = getattr(ctx, "session", None)
+  return getattr(session, "id", None) or getattr(ctx, "invocation_id", None)
+
+
+class _ProviderCache:
+  """Caches the result of a provider per session.
+
+  A provider called for every LLM turn, and in `run_async` again, then runs
+  once per session. Entries expire after `ttl_seconds` when it is set, and
+  the least recently used sessions are evicted beyond `max_sessions`.
+  """
+
+  def __init__(
+      self,
+      enabled: bool = False,
+      ttl_seconds: Optional[float] = None,
+      max_sessions: int = 1024,
+  ):
+    self._enabled = enabled
+    self._ttl_seconds = ttl_seconds
+    self._max_sessions = max_sessions
+    self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+  async def resolve(self, ctx: ReadonlyContext, provider: Callable) -> Any:
+    """Returns the cached result for ctx's session or calls the provider.
+
+    Args:
+        ctx: The ReadonlyContext to resolve the provider with.
+        provider: A sync or async callable taking ctx.
+
+    Returns:
+        The provider's result.
+    """
+    key = _session_key(ctx) if self._enabled else None
+    if key is not None and key in self._entries:
+      stored_at, value = self._entries[key]
+      if self._ttl_seconds is None or (
+          time.monotonic() - stored_at < self._ttl_seconds
+      ):
+        self._entries.move_to_end(key)
+        return value
+      del self._entries[key]
+
+    value = provider(ctx)
+    if inspect.isawaitable(value):
+      value = await value
+    if key is not None:
+      self._entries[key] = (time.monotonic(), value)
+      while len(self._entries) > self._max_sessions:
+        self._entries.popitem(last=False)
+    return value
+
+  def invalidate(self, session_id: Optional[str] = None) -> None:
+    """Drops the result cached for session_id, or every result if None."""
+    if session_id is None:
+      self._entries.clear()
+    else:
+      self._entries.pop(session_id, None)
+
+
 @experimental
 class SendA2uiToClientToolset(base_toolset.BaseToolset):
-  """A toolset that provides A2UI Tools and can be enabled/disabled."""
+  """A toolset that provides A2UI Tools and can be enabled/disabled.
+
+  Callable providers run every time their result is needed, which can be
+  several times per LLM turn. Pass `cache_providers=True` to cache their
+  results per session (`session.id` of the context, or its `invocation_id`)
+  when they do not change within a session; set `provider_cache_ttl_seconds`
+  to bound how long a result is reused, or call `invalidate_provider_cache`.
+  """
 
   def __init__(
       self,
       a2ui_enabled: Union[bool, A2uiEnabledProvider],
       a2ui_schema: Union[dict[str, Any], A2uiSchemaProvider],
+      cache_providers: bool = False,
+      provider_cache_ttl_seconds: Optional[float] = None,
   ):
     super().__init__()
     self._a2ui_enabled = a2ui_enabled
-    self._ui_tools = [self._SendA2uiJsonToClientTool(a2ui_schema)]
+    self._enabled_cache = _ProviderCache(
+        cache_providers, provider_cache_ttl_seconds
+    )
+    self._ui_tools = [
+        self._SendA2uiJsonToClientTool(
+            a2ui_schema,
+            schema_cache=_ProviderCache(
+                cache_providers, provider_cache_ttl_seconds
+            ),
+        )
+    ]
+
+  def invalidate_provider_cache(self, session_id: Optional[str] = None) -> None:
+    """Forgets cached provider results.
+
+    Args:
+        session_id: The session to forget, or None to forget every session.
+    """
+    self._enabled_cache.invalidate(session_id)
+    for tool in self._ui_tools:
+      tool.invalidate_schema_cache(session_id)
 
   async def _resolve_a2ui_enabled(self, ctx: ReadonlyContext) -> bool:
     """The resolved self.a2ui_enabled field to construct instruction for this agent.
@@ -130,11 +224,7 @@ class SendA2uiToClientToolset(base_toolset.BaseToolset):
     """
     if isinstance(self._a2ui_enabled, bool):
       return self._a2ui_enabled
-    else:
-      a2ui_enabled = self._a2ui_enabled(ctx)
-      if inspect.isawaitable(a2ui_enabled):
-        a2ui_enabled = await a2ui_enabled
-    return a2ui_enabled
+    return await self._enabled_cache.resolve(ctx, self._a2ui_enabled)
 
   async def get_tools(
       self,
@@ -152,10 +242,10 @@ class SendA2uiToClientToolset(base_toolset.BaseToolset):
     if readonly_context is not None:
       use_ui = await self._resolve_a2ui_enabled(readonly_context)
     if use_ui:
-      logger.info("A2UI is ENABLED, adding ui tools")
+      logger.debug("A2UI is ENABLED, adding ui tools")
       return self._ui_tools
     else:
-      logger.info("A2UI is DISABLED, not adding ui tools")
+      logger.debug("A2UI is DISABLED, not adding ui tools")
       return []
 
   class _SendA2uiJsonToClientTool(BaseTool):
@@ -164,8 +254,13 @@ class SendA2uiToClientToolset(base_toolset.BaseToolset):
     A2UI_JSON_ARG_NAME = "a2ui_json"
     TOOL_ERROR_KEY = "error"
 
-    def __init__(self, a2ui_schema: Union[dict[str, Any], A2uiSchemaProvider]):
+    def __init__(
+        self,
+        a2ui_schema: Union[dict[str, Any], A2uiSchemaProvider],
+        schema_cache: Optional[_ProviderCache] = None,
+    ):
       self._a2ui_schema = a2ui_schema
+      self._schema_cache = schema_cache or _ProviderCache()
       super().__init__(
           name=self.TOOL_NAME,
           description=(
@@ -206,11 +301,15 @@ class SendA2uiToClientToolset(base_toolset.BaseToolset):
       """
       if isinstance(self._a2ui_schema, dict):
         return self._a2ui_schema
-      else:
-        a2ui_schema = self._a2ui_schema(ctx)
-        if inspect.isawaitable(a2ui_schema):
-          a2ui_schema = await a2ui_schema
-        return a2ui_schema
+      return await self._schema_cache.resolve(ctx, self._a2ui_schema)
+
+    def invalidate_schema_cache(self, session_id: Optional[str] = None) -> None:
+      """Forgets cached schemas.
+
+      Args:
+          session_id: The session to forget, or None to forget every session.
+      """
+      self._schema_cache.invalidate(session_id)
 
     async def get_a2ui_schema(self, ctx: ReadonlyContext) -> dict[str, Any]:
       """Retrieves and wraps the A2UI schema.
@@ -265,7 +364,9 @@ class SendA2uiToClientToolset(base_toolset.BaseToolset):
         jsonschema.validate(instance=a2ui_json_payload, schema=a2ui_schema)
 
         logger.info(
-            f"Validated call to tool {self.TOOL_NAME} with {self.A2UI_JSON_ARG_NAME}"
+            "Validated call to tool %s with %d A2UI messages",
+            self.TOOL_NAME,
+            len(a2ui_json_payload),
         )
 
         # Don't do a second LLM inference call for the JSON response
@@ -277,7 +378,9 @@ class SendA2uiToClientToolset(base_toolset.BaseToolset):
 
       except Exception as e:
         err = f"Failed to call A2UI tool {self.TOOL_NAME}: {e}"
-        logger.error(err)
+        logger.error(
+            "Failed to call A2UI tool %s: %s", self.TOOL_NAME, Payload(str(e))
+        )
 
         return {self.TOOL_ERROR_KEY: err}
 
@@ -296,8 +399,12 @@ def convert_send_a2ui_to_client_genai_part_to_a2a_part(
         in function_response.response
     ):
       logger.warning(
-          "A2UI tool call failed:"
-          f" {function_response.response[SendA2uiToClientToolset._SendA2uiJsonToClientTool.TOOL_ERROR_KEY]}"
+          "A2UI tool call failed: %s",
+          Payload(
+              function_response.response[
+                  SendA2uiToClientToolset._SendA2uiJsonToClientTool.TOOL_ERROR_KEY
+              ]
+          ),
       )
       return []
 
@@ -309,12 +416,8 @@ def convert_send_a2ui_to_client_genai_part_to_a2a_part(
       logger.info("No result in A2UI tool response")
       return []
 
-    final_parts = []
-    for message in json_data:
-      logger.info(f"Found {len(json_data)} messages. Creating individual DataParts.")
-      final_parts.append(create_a2ui_part(message))
-
-    return final_parts
+    logger.debug("Found %d messages. Creating individual DataParts.", len(json_data))
+    return create_a2ui_parts(json_data)
 
   # Don't send a2ui tool call to client
   elif (
@@ -327,5 +430,5 @@ def convert_send_a2ui_to_client_genai_part_to_a2a_part(
   # Use default part converter for other types (images, etc)
   converted_part = part_converter.convert_genai_part_to_a2a_part(part)
 
-  logger.info(f"Returning converted part: {converted_part}")
+  logger.debug("Returning converted part: %s", Payload(converted_part))
   return [converted_part] if converted_part else []
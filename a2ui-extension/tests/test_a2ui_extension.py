@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import timeit
+
+import pytest
 
 from a2a.server.agent_execution import RequestContext
 from a2a.types import DataPart, TextPart, Part
@@ -34,6 +38,69 @@ def test_a2ui_part_serialization():
   assert a2ui_data == data_part.data, "Deserialized data should match original"
 
 
+def test_create_a2ui_parts():
+  messages = [
+      {"beginRendering": {"surfaceId": "s", "root": "root"}},
+      {"dataModelUpdate": {"surfaceId": "s", "contents": []}},
+  ]
+
+  parts = a2ui_extension.create_a2ui_parts(messages)
+
+  assert parts == [a2ui_extension.create_a2ui_part(m) for m in messages]
+  assert all(a2ui_extension.is_a2ui_part(part) for part in parts)
+
+
+def _data_model_update(entries: int) -> dict:
+  return {
+      "dataModelUpdate": {
+          "surfaceId": "s",
+          "path": "/",
+          "contents": [
+              {
+                  "key": f"item{i}",
+                  "valueMap": [
+                      {"key": "title", "valueString": "x" * 32},
+                      {"key": "amount", "valueNumber": i},
+                  ],
+              }
+              for i in range(entries)
+          ],
+      }
+  }
+
+
+def test_create_a2ui_parts_large_message():
+  for message in (_data_model_update(1), _data_model_update(10_000)):
+    parts = a2ui_extension.create_a2ui_parts([message] * 3)
+
+    assert len(parts) == 3
+    assert all(
+        a2ui_extension.get_a2ui_datapart(part).data == message for part in parts
+    )
+
+
+@pytest.mark.skipif(
+    not os.getenv("A2UI_BENCHMARKS"),
+    reason="timing check; set A2UI_BENCHMARKS=1 to run",
+)
+def test_create_a2ui_part_benchmark():
+  # Only the top level of the message is validated, so a 10k-entry
+  # dataModelUpdate costs about as much as a single entry; a deep validation
+  # would be thousands of times slower.
+  def best(message: dict) -> float:
+    return min(
+        timeit.repeat(
+            lambda: a2ui_extension.create_a2ui_parts([message] * 10),
+            number=20,
+            repeat=5,
+        )
+    )
+
+  small_seconds = best(_data_model_update(1))
+  large_seconds = best(_data_model_update(10_000))
+  assert large_seconds < small_seconds * 20
+
+
 def test_non_a2ui_data_part():
   part = Part(
       root=DataPart(
@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import sys
+from unittest.mock import MagicMock
+
+from a2ui.a2ui_logging import JsonFormatter, LogPolicyFilter, Payload
+
+
+def _record(name, level, msg, *args, **extra):
+  record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+  record.__dict__.update(extra)
+  return record
+
+
+# region Payload Tests
+"""Tests for the Payload class."""
+
+
+def test_payload_is_not_rendered_when_record_is_dropped():
+  value = MagicMock()
+  logger = logging.getLogger("test_a2ui_logging.disabled")
+  logger.setLevel(logging.WARNING)
+  logger.info("payload: %s", Payload(value))
+  value.__str__.assert_not_called()
+
+
+def test_payload_serializes_and_truncates():
+  assert str(Payload("abc")) == "abc"
+  assert str(Payload({"a": [1, 2]})) == '{"a": [1, 2]}'
+  assert str(Payload("x" * 10, limit=4)) == "xxxx... (10 chars)"
+  assert str(Payload("x" * 10, limit=0)) == "x" * 10
+
+
+# endregion
+
+# region LogPolicyFilter Tests
+"""Tests for the LogPolicyFilter class."""
+
+
+def test_filter_samples_by_most_specific_logger():
+  policy = LogPolicyFilter(
+      sample_rates={"": 1.0, "a2ui": 0.0, "a2ui.keep": 1.0},
+      random_func=lambda: 0.5,
+  )
+  assert policy.filter(_record("agent", logging.INFO, "m"))
+  assert not policy.filter(_record("a2ui.toolset", logging.INFO, "m"))
+  assert policy.filter(_record("a2ui.keep.child", logging.DEBUG, "m"))
+
+
+def test_filter_keeps_share_of_records():
+  samples = iter([0.1, 0.3, 0.2, 0.9])
+  policy = LogPolicyFilter(
+      sample_rates={"a2ui": 0.25}, random_func=lambda: next(samples)
+  )
+  kept = [policy.filter(_record("a2ui", logging.INFO, "m")) for _ in range(4)]
+  assert kept == [True, False, True, False]
+
+
+def test_filter_never_samples_warnings():
+  policy = LogPolicyFilter(sample_rates={"": 0.0})
+  assert policy.filter(_record("a2ui", logging.WARNING, "m"))
+  assert policy.filter(_record("a2ui", logging.ERROR, "m"))
+
+
+def test_filter_sets_payload_limit():
+  policy = LogPolicyFilter(payload_limits={"": 5, "ui_builder": 0})
+  record = _record("agent", logging.INFO, "%s %s", Payload("x" * 10), "y" * 10)
+  assert policy.filter(record)
+  assert record.getMessage() == "xxxxx... (10 chars) " + "y" * 10
+
+  record = _record("ui_builder", logging.INFO, "%s", Payload("x" * 600))
+  assert policy.filter(record)
+  assert record.getMessage() == "x" * 600
+
+  record = _record("agent", logging.INFO, "%s", Payload("x" * 10, limit=8))
+  assert policy.filter(record)
+  assert record.getMessage() == "xxxxxxxx... (10 chars)"
+
+
+# endregion
+
+# region JsonFormatter Tests
+"""Tests for the JsonFormatter class."""
+
+
+def test_json_formatter():
+  record = _record("a2ui", logging.INFO, "hello %s", "world", requestId="r1")
+  entry = json.loads(JsonFormatter().format(record))
+  assert entry["level"] == "INFO"
+  assert entry["logger"] == "a2ui"
+  assert entry["message"] == "hello world"
+  assert entry["requestId"] == "r1"
+  assert "time" in entry
+
+
+def test_json_formatter_exception():
+  try:
+    raise ValueError("boom")
+  except ValueError:
+    record = logging.LogRecord(
+        "a2ui", logging.ERROR, __file__, 1, "failed", None, sys.exc_info()
+    )
+  entry = json.loads(JsonFormatter().format(record))
+  assert "ValueError: boom" in entry["exception"]
+
+
+# endregion
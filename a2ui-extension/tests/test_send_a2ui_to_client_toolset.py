@@ -105,6 +105,89 @@ async def test_toolset_get_tools_disabled():
   assert len(tools) == 0
 
 
+def _session_ctx(session_id: str) -> MagicMock:
+  ctx = MagicMock(spec=ReadonlyContext)
+  ctx.session.id = session_id
+  return ctx
+
+
+@pytest.mark.asyncio
+async def test_toolset_providers_cached_per_session():
+  enabled_mock = MagicMock(return_value=True)
+  schema_mock = AsyncMock(return_value=TEST_A2UI_SCHEMA)
+  toolset = SendA2uiToClientToolset(
+      a2ui_enabled=enabled_mock, a2ui_schema=schema_mock, cache_providers=True
+  )
+  tool = toolset._ui_tools[0]
+
+  for session_id in ("a", "a", "b", "a", "b"):
+    ctx = _session_ctx(session_id)
+    assert await toolset.get_tools(ctx) == [tool]
+    assert await tool._resolve_a2ui_schema(ctx) == TEST_A2UI_SCHEMA
+
+  assert enabled_mock.call_count == 2
+  assert schema_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_toolset_invalidate_provider_cache():
+  enabled_mock = MagicMock(return_value=True)
+  schema_mock = MagicMock(return_value=TEST_A2UI_SCHEMA)
+  toolset = SendA2uiToClientToolset(
+      a2ui_enabled=enabled_mock, a2ui_schema=schema_mock, cache_providers=True
+  )
+  tool = toolset._ui_tools[0]
+
+  async def resolve_both(session_id):
+    ctx = _session_ctx(session_id)
+    await toolset._resolve_a2ui_enabled(ctx)
+    await tool._resolve_a2ui_schema(ctx)
+
+  await resolve_both("a")
+  await resolve_both("b")
+  toolset.invalidate_provider_cache("a")
+  await resolve_both("a")
+  await resolve_both("b")
+  assert enabled_mock.call_count == 3
+  assert schema_mock.call_count == 3
+
+  toolset.invalidate_provider_cache()
+  await resolve_both("a")
+  await resolve_both("b")
+  assert enabled_mock.call_count == 5
+  assert schema_mock.call_count == 5
+
+
+@pytest.mark.asyncio
+async def test_toolset_provider_cache_ttl():
+  schema_mock = MagicMock(return_value=TEST_A2UI_SCHEMA)
+  toolset = SendA2uiToClientToolset(
+      a2ui_enabled=True,
+      a2ui_schema=schema_mock,
+      cache_providers=True,
+      provider_cache_ttl_seconds=0,
+  )
+  tool = toolset._ui_tools[0]
+  ctx = _session_ctx("a")
+
+  await tool._resolve_a2ui_schema(ctx)
+  await tool._resolve_a2ui_schema(ctx)
+  assert schema_mock.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_toolset_provider_cache_off_by_default():
+  enabled_mock = MagicMock(return_value=True)
+  toolset = SendA2uiToClientToolset(
+      a2ui_enabled=enabled_mock, a2ui_schema=TEST_A2UI_SCHEMA
+  )
+  ctx = _session_ctx("a")
+
+  await toolset.get_tools(ctx)
+  await toolset.get_tools(ctx)
+  assert enabled_mock.call_count == 2
+
+
 # endregion
 
 # region SendA2uiJsonToClientTool Tests
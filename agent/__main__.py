@@ -12,171 +12,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import base64
-import logging
+import time
 
-import click
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
-from a2a.types import AgentCapabilities, AgentCard, AgentSkill
-from a2ui.a2ui_extension import get_a2ui_agent_extension
-from dotenv import load_dotenv
-from PIL import UnidentifiedImageError
-from starlette.middleware.cors import CORSMiddleware
-from starlette.requests import Request
-from starlette.responses import JSONResponse
+# Reported as expense_startup_seconds{phase="import"} once the app is built.
+_STARTED = time.perf_counter()
 
-from agent_executor import ExpenseAgentExecutor
-from entries import load_entries
-from ocr import extract_from_base64
-from ui_builder import build_ai_review, build_entries_screen
+import logging  # noqa: E402
+
+import click  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from log_config import configure_logging  # noqa: E402
 
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
+structured_logs = configure_logging()
 logger = logging.getLogger(__name__)
 
 
 @click.command()
 @click.option("--host", default="localhost")
 @click.option("--port", default=10002)
-def main(host, port):
-    capabilities = AgentCapabilities(
-        streaming=False,
-        extensions=[get_a2ui_agent_extension()],
-    )
-    skill = AgentSkill(
-        id="expense_reporter",
-        name="Expense Report",
-        description="OCR receipts and submit expense reports.",
-        tags=["expense", "receipt", "ocr"],
-        examples=["Upload a receipt image and submit an expense report."],
-    )
-
-    base_url = f"http://{host}:{port}"
-    agent_card = AgentCard(
-        name="Expense Reporter",
-        description="A2UI agent for expense reports with OCR.",
-        url=base_url,
-        version="1.0.0",
-        default_input_modes=["text", "text/plain"],
-        default_output_modes=["text", "text/plain"],
-        capabilities=capabilities,
-        skills=[skill],
-    )
-
-    request_handler = DefaultRequestHandler(
-        agent_executor=ExpenseAgentExecutor(base_url=base_url),
-        task_store=InMemoryTaskStore(),
-    )
-    server = A2AStarletteApplication(
-        agent_card=agent_card, http_handler=request_handler
-    )
-
+@click.option(
+    "--warmup/--no-warmup",
+    default=None,
+    help="Preload dependencies before /readyz reports ready (default: WARMUP env).",
+)
+def main(host, port, warmup):
     import uvicorn
 
-    app = server.build()
-
-    async def ocr_endpoint(request: Request) -> JSONResponse:
-        try:
-            payload = await request.json()
-        except Exception:
-            return JSONResponse({"error": "Invalid JSON payload"}, status_code=400)
-
-        file_base64 = payload.get("fileBase64")
-        file_name = payload.get("fileName", "receipt")
-        file_type = payload.get("fileType", "image/png")
-        if not file_base64:
-            return JSONResponse({"error": "fileBase64 is required"}, status_code=400)
-
-        try:
-            result = extract_from_base64(file_base64, file_type, file_name)
-        except (base64.binascii.Error, ValueError, UnidentifiedImageError) as exc:
-            return JSONResponse(
-                {"error": f"Invalid receipt payload: {exc}"},
-                status_code=400,
-            )
-        except Exception as exc:
-            return JSONResponse(
-                {"error": f"OCR failed: {exc}"},
-                status_code=500,
-            )
-        return JSONResponse(
-            {
-                "text": result.text,
-                "merchant": result.merchant,
-                "date": result.date,
-                "amount": result.amount,
-                "currency": result.currency,
-            }
-        )
-
-    async def review_endpoint(request: Request) -> JSONResponse:
-        try:
-            payload = await request.json()
-        except Exception:
-            return JSONResponse({"error": "Invalid JSON payload"}, status_code=400)
-
-        file_base64 = payload.get("fileBase64")
-        file_name = payload.get("fileName", "receipt")
-        file_type = payload.get("fileType", "image/png")
-        if not file_base64:
-            return JSONResponse({"error": "fileBase64 is required"}, status_code=400)
-
-        try:
-            result = extract_from_base64(file_base64, file_type, file_name)
-        except (base64.binascii.Error, ValueError, UnidentifiedImageError) as exc:
-            return JSONResponse(
-                {"error": f"Invalid receipt payload: {exc}"},
-                status_code=400,
-            )
-        except Exception as exc:
-            return JSONResponse(
-                {"error": f"OCR failed: {exc}"},
-                status_code=500,
-            )
-
-        form_data = {
-            "receiptName": file_name,
-            "merchant": result.merchant,
-            "date": result.date,
-            "amount": result.amount,
-            "currency": result.currency,
-            "category": "",
-            "paymentMethod": "",
-            "memo": "",
-        }
-        messages = build_ai_review(form_data)
-        return JSONResponse(messages)
-
-    async def entries_endpoint(request: Request) -> JSONResponse:
-        payload = load_entries()
-        layout = payload.get("layout", {})
-        params = request.query_params
-        mode = params.get("mode")
-        fields = params.get("fields")
-        theme = params.get("theme")
-        if mode:
-            layout = {**layout, "mode": mode}
-        if fields:
-            layout = {**layout, "showFields": [f for f in fields.split(",") if f]}
-        if theme:
-            layout = {**layout, "theme": theme}
-        return JSONResponse(build_entries_screen(payload.get("entries", []), layout))
-
-    app.add_route("/ocr", ocr_endpoint, methods=["POST"])
-    app.add_route("/review", review_endpoint, methods=["POST"])
-    app.add_route("/entries", entries_endpoint, methods=["GET"])
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origin_regex=r"https?://.*",
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
+    from app import build_app
+    from metrics import STARTUP_SECONDS
 
-    uvicorn.run(app, host=host, port=port)
+    app = build_app(f"http://{host}:{port}", warmup=warmup)
+    STARTUP_SECONDS.set(time.perf_counter() - _STARTED, phase="import")
+    log_config = None if structured_logs else uvicorn.config.LOGGING_CONFIG
+    uvicorn.run(app, host=host, port=port, log_config=log_config)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,327 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Salvages LLM-generated A2UI instead of discarding it on the first defect.
+
+parse_lenient() accepts code fences, prose around the JSON, a single message
+instead of an array and output truncated mid-array. repair_messages() then
+checks every message and component against the A2UI v0.8 schema (a copy of
+the renderer's server_to_client_with_standard_catalog.json), strips
+properties the catalog does not define, drops what is still invalid, prunes references to components that no longer exist and fills in
+whatever the caller's fallback surface requires.
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from jsonschema import Draft202012Validator
+
+SCHEMA_PATH = Path(__file__).resolve().parent / "schemas" / "server_to_client_with_standard_catalog.json"
+
+_FENCE_RE = re.compile(r"```[A-Za-z0-9_-]*")
+_DECODER = json.JSONDecoder()
+# Component properties holding a single component id; the component is
+# unusable when the referenced one is missing.
+_SINGLE_CHILD_KEYS = ("child", "entryPointChild", "contentChild")
+
+
+@dataclass
+class RepairResult:
+    messages: list[dict[str, Any]]
+    # Human-readable notes, one per repair, for logs.
+    repairs: list[str] = field(default_factory=list)
+    # Components from the model output that survived validation.
+    kept_components: int = 0
+
+
+@functools.lru_cache(maxsize=1)
+def _validators() -> tuple[dict[str, Draft202012Validator], dict[str, Draft202012Validator]]:
+    """Per-message-type and per-component-type validators, built once."""
+    from jsonschema import Draft202012Validator
+
+    schema = json.loads(SCHEMA_PATH.read_text(encoding="utf-8"))
+    messages = {
+        name: Draft202012Validator(definition)
+        for name, definition in schema["properties"].items()
+        if name != "surfaceUpdate"
+    }
+    component_types = schema["properties"]["surfaceUpdate"]["properties"]["components"]["items"][
+        "properties"
+    ]["component"]["properties"]
+    components = {
+        name: Draft202012Validator(definition) for name, definition in component_types.items()
+    }
+    return messages, components
+
+
+def warm_up() -> None:
+    """Loads the schema and builds the validators before the first review."""
+    _validators()
+
+
+def parse_lenient(raw: str) -> list[Any]:
+    """Extracts the A2UI message list from model output.
+
+    Returns an empty list when nothing parses.
+    """
+    text = _FENCE_RE.sub("", raw)
+    starts = [index for index in (text.find("["), text.find("{")) if index != -1]
+    if not starts:
+        return []
+    start = min(starts)
+    try:
+        value, _ = _DECODER.raw_decode(text, start)
+        return value if isinstance(value, list) else [value]
+    except json.JSONDecodeError:
+        pass
+
+    closed = _close_truncated(text[start:])
+    if closed is None:
+        return []
+    return closed if isinstance(closed, list) else [closed]
+
+
+def _close_truncated(text: str, max_attempts: int = 64) -> Any:
+    """Parses the longest prefix of text that is valid once its brackets are closed.
+
+    Candidate cut points are the ends of objects and arrays, tried from the
+    last one backwards, so a response cut off in the middle of a component
+    keeps every component before it.
+    """
+    stack: list[str] = []
+    cuts: list[tuple[int, str]] = []
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            stack.append("]" if char == "[" else "}")
+        elif char in "]}":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((index + 1, "".join(reversed(stack))))
+            if not stack:
+                break
+    for end, closing in reversed(cuts[-max_attempts:]):
+        try:
+            return json.loads(text[:end] + closing)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _message_type(message: Any) -> str | None:
+    if not isinstance(message, dict) or len(message) != 1:
+        return None
+    (name,) = message
+    return name
+
+
+def _component_type(component: dict[str, Any]) -> str | None:
+    body = component.get("component")
+    if not isinstance(body, dict) or len(body) != 1:
+        return None
+    (name,) = body
+    return name
+
+
+def _check_component(
+    component: Any, validators: dict[str, Draft202012Validator]
+) -> tuple[dict[str, Any] | None, str]:
+    if not isinstance(component, dict) or not isinstance(component.get("id"), str):
+        return None, "component without an id"
+    name = _component_type(component)
+    if name not in validators:
+        return None, f"{component['id']}: unknown component type {name!r}"
+    props = component["component"][name]
+    errors = list(validators[name].iter_errors(props))
+    if errors and all(error.validator == "additionalProperties" for error in errors):
+        # Models often add properties the catalog does not have; the rest of
+        # the component is still usable without them.
+        for error in errors:
+            _strip_unknown_properties(error)
+        errors = list(validators[name].iter_errors(props))
+    if errors:
+        return None, f"{component['id']}: invalid {name}: {errors[0].message}"
+    cleaned = {"id": component["id"], "component": component["component"]}
+    if isinstance(component.get("weight"), (int, float)):
+        cleaned["weight"] = component["weight"]
+    return cleaned, ""
+
+
+def _strip_unknown_properties(error: Any) -> None:
+    allowed = error.schema.get("properties", {})
+    for key in [key for key in error.instance if key not in allowed]:
+        del error.instance[key]
+
+
+def _prune_references(components: dict[str, dict[str, Any]], repairs: list[str]) -> None:
+    """Removes references to missing components until none are left.
+
+    Dropping a component can leave its parent dangling, hence the loop.
+    """
+    changed = True
+    while changed:
+        changed = False
+        ids = components.keys()
+        for component_id in list(components):
+            component = components[component_id]
+            name = _component_type(component)
+            props = component["component"][name]
+            missing = [
+                key for key in _SINGLE_CHILD_KEYS if key in props and props[key] not in ids
+            ]
+            template = (props.get("children") or {}).get("template")
+            if template and template.get("componentId") not in ids:
+                missing.append("children.template")
+            if missing:
+                repairs.append(f"{component_id}: dropped, missing {', '.join(missing)}")
+                del components[component_id]
+                changed = True
+                continue
+            children = (props.get("children") or {}).get("explicitList")
+            if children is not None:
+                kept = [child for child in children if child in ids]
+                if len(kept) != len(children):
+                    repairs.append(f"{component_id}: removed {len(children) - len(kept)} missing children")
+                    props["children"]["explicitList"] = kept
+            if "tabItems" in props:
+                kept = [item for item in props["tabItems"] if item.get("child") in ids]
+                if len(kept) != len(props["tabItems"]):
+                    repairs.append(f"{component_id}: removed tabs with missing children")
+                    props["tabItems"] = kept
+
+
+def _fallback_parts(
+    fallback: list[dict[str, Any]], surface_id: str
+) -> tuple[dict[str, Any] | None, list[dict[str, Any]], dict[str, Any] | None]:
+    begin = components = data = None
+    for message in fallback:
+        name = _message_type(message)
+        body = message[name] if name else None
+        if not isinstance(body, dict) or body.get("surfaceId") != surface_id:
+            continue
+        if name == "beginRendering" and begin is None:
+            begin = body
+        elif name == "surfaceUpdate" and components is None:
+            components = body.get("components", [])
+        elif name == "dataModelUpdate" and data is None:
+            data = body
+    return begin, components or [], data
+
+
+def repair_messages(
+    messages: list[Any],
+    surface_id: str,
+    fallback: list[dict[str, Any]],
+) -> RepairResult:
+    """Turns parsed model output into a valid surface for surface_id.
+
+    Every component of the fallback surface that the model left out or got
+    wrong is taken from the fallback, and containers present in both gain
+    the fallback's children they are missing, in the fallback's order.
+    """
+    message_validators, component_validators = _validators()
+    repairs: list[str] = []
+    begin: dict[str, Any] | None = None
+    components: dict[str, dict[str, Any]] = {}
+    data_updates: list[dict[str, Any]] = []
+
+    for message in messages:
+        name = _message_type(message)
+        body = message[name] if name else None
+        if not isinstance(body, dict) or name not in ("surfaceUpdate", *message_validators):
+            repairs.append(f"dropped message {name or type(message).__name__!r}")
+            continue
+        if body.get("surfaceId") != surface_id:
+            repairs.append(f"dropped {name} for surface {body.get('surfaceId')!r}")
+            continue
+        if name == "surfaceUpdate":
+            items = body.get("components")
+            for item in items if isinstance(items, list) else []:
+                cleaned, problem = _check_component(item, component_validators)
+                if cleaned is None:
+                    repairs.append(problem)
+                else:
+                    # Later updates of the same id win, as they would on the client.
+                    components[cleaned["id"]] = cleaned
+            continue
+        error = next(message_validators[name].iter_errors(body), None)
+        if error is not None:
+            repairs.append(f"dropped invalid {name}: {error.message}")
+        elif name == "beginRendering":
+            begin = begin or body
+        elif name == "dataModelUpdate":
+            data_updates.append(body)
+
+    _prune_references(components, repairs)
+    kept_components = len(components)
+
+    fallback_begin, fallback_components, fallback_data = _fallback_parts(fallback, surface_id)
+    for required in fallback_components:
+        component_id = required["id"]
+        existing = components.get(component_id)
+        if existing is None:
+            components[component_id] = copy.deepcopy(required)
+            repairs.append(f"{component_id}: added from fallback")
+            continue
+        required_children = (
+            required["component"].get(_component_type(required), {}).get("children") or {}
+        ).get("explicitList")
+        props = existing["component"][_component_type(existing)]
+        children = (props.get("children") or {}).get("explicitList")
+        if required_children and children is not None:
+            present = set(children)
+            missing = [child for child in required_children if child not in present]
+            if missing:
+                children.extend(missing)
+                repairs.append(f"{component_id}: appended {len(missing)} required children")
+
+    if begin is None or begin.get("root") not in components:
+        if fallback_begin is not None:
+            begin = copy.deepcopy(fallback_begin)
+            repairs.append("beginRendering taken from fallback")
+    if fallback_data is not None:
+        if not data_updates:
+            data_updates.append(copy.deepcopy(fallback_data))
+            repairs.append("dataModelUpdate taken from fallback")
+        elif not data_updates[0].get("contents"):
+            data_updates[0]["contents"] = copy.deepcopy(fallback_data["contents"])
+            repairs.append("empty dataModelUpdate filled from fallback")
+
+    repaired: list[dict[str, Any]] = []
+    if begin is not None:
+        repaired.append({"beginRendering": begin})
+    if components:
+        repaired.append(
+            {"surfaceUpdate": {"surfaceId": surface_id, "components": list(components.values())}}
+        )
+    repaired.extend({"dataModelUpdate": update} for update in data_updates)
+    return RepairResult(messages=repaired, repairs=repairs, kept_components=kept_components)
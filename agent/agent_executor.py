@@ -15,6 +15,8 @@
 from __future__ import annotations
 
 import logging
+import time
+from datetime import date
 from typing import Any
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -23,33 +25,129 @@ from a2a.server.tasks import TaskUpdater
 from a2a.types import DataPart, Part, Task, TaskState, TextPart, UnsupportedOperationError
 from a2a.utils import new_agent_parts_message, new_agent_text_message, new_task
 from a2a.utils.errors import ServerError
-from a2ui.a2ui_extension import create_a2ui_part, try_activate_a2ui_extension
+from a2ui.a2ui_extension import create_a2ui_parts, try_activate_a2ui_extension
+from starlette.concurrency import run_in_threadpool
 
-from ocr import extract_from_base64
-from storage import add_claim, search_claims
-from ui_builder import build_ai_review, build_confirmation, build_search_results
+from metrics import ACTION_SECONDS, ACTION_TOTAL, ACTIONS_IN_FLIGHT
+from ocr import review_form_data
+from ocr_store import OcrResultStore
+from profiling import PROFILER
+from receipts import ocr_receipt, review_receipt
+from storage import add_claim, claim_summary, claim_table, search_claims
+from surface_state import SurfaceStateTracker
+from tracing import span, stage
+from ui_builder import build_confirmation, build_search_results, build_summary
 
 logger = logging.getLogger(__name__)
 
+# Action names come from the client; anything else is counted as "other".
+_ACTIONS = {"upload_receipt", "submit_expense", "search_expense", "show_summary"}
+
+
+def _authenticated_user(context: RequestContext) -> str:
+    call_context = context.call_context
+    if call_context is None or not call_context.user.is_authenticated:
+        return ""
+    return call_context.user.user_name
+
+
+def _summary_period(action_context: dict[str, Any]) -> tuple[date | None, date | None] | None:
+    """The optional inclusive months "from" and "to" ("YYYY-MM") as dates.
+
+    Returns the first day of "from" and the last day of "to", or None when
+    either is not a month.
+    """
+    from claim_table import month_range
+
+    try:
+        return month_range(action_context.get("from") or None, action_context.get("to") or None)
+    except ValueError:
+        return None
+
+
+def _summary_messages(
+    context: RequestContext, action_context: dict[str, Any], start: date | None, end: date | None
+) -> list[dict[str, Any]]:
+    """Totals for the company, or with scope "mine" for the requesting user, from start to end."""
+    user = None
+    if action_context.get("scope") == "mine":
+        user = _authenticated_user(context)
+    start_month = f"{start.year}-{start.month:02d}" if start else None
+    end_month = f"{end.year}-{end.month:02d}" if end else None
+    summary = claim_summary()
+    filters = {"user": user, "start_month": start_month, "end_month": end_month}
+    period = f"{start_month or ''} 〜 {end_month or ''}" if start_month or end_month else ""
+    return build_summary(
+        summary.totals((), **filters),
+        summary.totals(("month",), **filters),
+        summary.totals(("category",), **filters),
+        period,
+        _converted_total(user, start, end),
+    )
+
+
+def _converted_total(user: str | None, start: date | None, end: date | None) -> str:
+    """The total in the FX base currency, or "" without a rate file."""
+    from claim_table import format_amount
+    from fx import rate_table
+
+    rates = rate_table()
+    if rates is None:
+        return ""
+    table = claim_table()
+    mask = table.select(start=start, end=end, user=user)
+    rows, skipped = table.converted_totals(rates, rates.base, mask=mask)
+    total = rows[0]["amount"] if rows else 0
+    text = f"{rates.base} 換算合計: {format_amount(total)} {rates.base}"
+    if skipped:
+        text += f" (レートのない {skipped} 件を除く)"
+    return text
+
 
 class ExpenseAgentExecutor(AgentExecutor):
     """Expense reporting AgentExecutor."""
 
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        ocr_results: OcrResultStore | None = None,
+        surface_state: SurfaceStateTracker | None = None,
+    ):
         self.base_url = base_url
+        self.ocr_results = ocr_results or OcrResultStore()
+        self.surface_state = surface_state or SurfaceStateTracker()
 
     async def execute(
         self,
         context: RequestContext,
         event_queue: EventQueue,
+    ) -> None:
+        if not PROFILER.enabled:
+            return await self._execute(context, event_queue)
+        metadata = (context.message.metadata if context.message else None) or {}
+        await PROFILER.run(
+            "execute",
+            bool(metadata.get("expenseProfile")),
+            self._execute,
+            context,
+            event_queue,
+        )
+
+    async def _execute(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
     ) -> None:
         action_name = None
         action_context: dict[str, Any] = {}
         text_input = ""
 
         use_ui = try_activate_a2ui_extension(context)
-        logger.info(f"--- Client requested extensions: {context.requested_extensions} ---")
-        logger.info(f"--- A2UI extension active: {use_ui} ---")
+        logger.debug(
+            "Client requested extensions: %s; A2UI extension active: %s",
+            context.requested_extensions,
+            use_ui,
+        )
 
         if context.message and context.message.parts:
             for part in context.message.parts:
@@ -69,6 +167,35 @@ class ExpenseAgentExecutor(AgentExecutor):
                 elif isinstance(part.root, TextPart):
                     text_input = part.root.text
 
+        if action_name in _ACTIONS:
+            action_label = action_name
+        elif action_name:
+            action_label = "other"
+        else:
+            action_label = "text" if text_input else "none"
+        start = time.perf_counter()
+        result = "error"
+        ACTIONS_IN_FLIGHT.inc(action=action_label)
+        try:
+            with span("a2a.execute", action=action_label, context_id=context.context_id):
+                await self._handle_action(
+                    context, event_queue, use_ui, action_name, action_context, text_input
+                )
+            result = "ok"
+        finally:
+            ACTIONS_IN_FLIGHT.dec(action=action_label)
+            ACTION_SECONDS.observe(time.perf_counter() - start, action=action_label)
+            ACTION_TOTAL.inc(action=action_label, result=result)
+
+    async def _handle_action(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
+        use_ui: bool,
+        action_name: str | None,
+        action_context: dict[str, Any],
+        text_input: str,
+    ) -> None:
         task = context.current_task
         if not task:
             task = new_task(context.message)
@@ -90,10 +217,12 @@ class ExpenseAgentExecutor(AgentExecutor):
         final_state = TaskState.input_required
 
         if action_name == "upload_receipt":
+            ocr_id = action_context.get("ocrId")
             file_base64 = action_context.get("fileBase64")
             file_name = action_context.get("fileName", "receipt")
             file_type = action_context.get("fileType", "image/png")
-            if not file_base64:
+            ocr_result = self.ocr_results.get(ocr_id) if ocr_id else None
+            if ocr_result is None and not file_base64:
                 await updater.update_status(
                     TaskState.completed,
                     new_agent_text_message(
@@ -102,18 +231,9 @@ class ExpenseAgentExecutor(AgentExecutor):
                     final=True,
                 )
                 return
-            ocr_result = extract_from_base64(file_base64, file_type, file_name)
-            form_data = {
-                "receiptName": ocr_result.receipt_name,
-                "merchant": ocr_result.merchant,
-                "date": ocr_result.date,
-                "amount": ocr_result.amount,
-                "currency": ocr_result.currency,
-                "category": "",
-                "paymentMethod": "",
-                "memo": "",
-            }
-            messages = build_ai_review(form_data)
+            if ocr_result is None:
+                ocr_result = await ocr_receipt(file_base64, file_type, file_name)
+            messages = await review_receipt(review_form_data(ocr_result))
         elif action_name == "submit_expense":
             payload = {
                 "receiptName": action_context.get("receiptName", ""),
@@ -125,6 +245,9 @@ class ExpenseAgentExecutor(AgentExecutor):
                 "paymentMethod": action_context.get("paymentMethod", ""),
                 "memo": action_context.get("memo", ""),
             }
+            user = _authenticated_user(context)
+            if user:
+                payload["submittedBy"] = user
             record = add_claim(payload)
             messages = build_confirmation(record)
             final_state = TaskState.completed
@@ -132,6 +255,20 @@ class ExpenseAgentExecutor(AgentExecutor):
             query = action_context.get("query", "")
             results = search_claims(query)
             messages = build_search_results(results)
+        elif action_name == "show_summary":
+            period = _summary_period(action_context)
+            if period is None:
+                await updater.update_status(
+                    TaskState.completed,
+                    new_agent_text_message(
+                        "期間は YYYY-MM の形式で指定してください。", task.context_id, task.id
+                    ),
+                    final=True,
+                )
+                return
+            # The first call builds the claim summary and table; keep the
+            # event loop free while it does.
+            messages = await run_in_threadpool(_summary_messages, context, action_context, *period)
         else:
             if text_input:
                 await updater.update_status(
@@ -153,7 +290,19 @@ class ExpenseAgentExecutor(AgentExecutor):
             )
             return
 
-        parts = [create_a2ui_part(message) for message in messages]
+        # Clients that keep their rendered surfaces between responses can ask
+        # for only what changed since the last response in this context.
+        metadata = (context.message.metadata if context.message else None) or {}
+        if metadata.get("a2uiDeltas"):
+            delta = self.surface_state.diff(task.context_id, messages)
+            # Nothing changed: resend the (idempotent) first message, since the
+            # response still needs a part.
+            messages = delta or messages[:1]
+        else:
+            self.surface_state.forget(task.context_id)
+
+        with stage("a2a.serialize"):
+            parts = create_a2ui_parts(messages)
         await updater.update_status(
             final_state,
             new_agent_parts_message(parts, task.context_id, task.id),
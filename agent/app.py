@@ -0,0 +1,440 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Starlette application: the A2A endpoint plus the REST routes used by the client.
+
+The A2A endpoint is built on its first request (or during warm-up): the a2a
+server stack, which also imports FastAPI, is the largest part of startup and
+the REST routes do not need it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+import a2ui_repair
+import ocr
+import storage
+import ui_builder
+from entries import load_entries
+from metrics import FIRST_REQUEST_SECONDS, QUEUE_DEPTH, REGISTRY, track_request
+from ocr import ocr_result_payload, review_form_data
+from ocr_jobs import OcrJobQueue, job_payload
+from ocr_store import OcrResultStore
+from profiling import PROFILER
+from receipts import ocr_receipt, review_receipt
+from tracing import span, traced_handler
+from ui_builder import build_entries_screen
+from warmup import Readiness, start_warmup, warmup_enabled
+
+
+def _build_a2a_app(base_url: str, ocr_results: OcrResultStore) -> Starlette:
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore
+    from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+    from a2ui.a2ui_extension import get_a2ui_agent_extension
+
+    from agent_executor import ExpenseAgentExecutor
+
+    capabilities = AgentCapabilities(
+        streaming=False,
+        extensions=[get_a2ui_agent_extension()],
+    )
+    skill = AgentSkill(
+        id="expense_reporter",
+        name="Expense Report",
+        description="OCR receipts and submit expense reports.",
+        tags=["expense", "receipt", "ocr"],
+        examples=["Upload a receipt image and submit an expense report."],
+    )
+
+    agent_card = AgentCard(
+        name="Expense Reporter",
+        description="A2UI agent for expense reports with OCR.",
+        url=base_url,
+        version="1.0.0",
+        default_input_modes=["text", "text/plain"],
+        default_output_modes=["text", "text/plain"],
+        capabilities=capabilities,
+        skills=[skill],
+    )
+
+    request_handler = DefaultRequestHandler(
+        agent_executor=ExpenseAgentExecutor(base_url=base_url, ocr_results=ocr_results),
+        task_store=InMemoryTaskStore(),
+    )
+    server = A2AStarletteApplication(
+        agent_card=agent_card, http_handler=request_handler
+    )
+    return server.build()
+
+
+class _LazyA2AApp:
+    """ASGI app that builds the A2A application when it is first needed."""
+
+    def __init__(self, base_url: str, ocr_results: OcrResultStore):
+        self._base_url = base_url
+        self._ocr_results = ocr_results
+        self._app: Starlette | None = None
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+    def load(self) -> Starlette:
+        """Builds the app in the calling thread; warm-up calls this directly."""
+        with self._lock:
+            if self._app is None:
+                self._app = _build_a2a_app(self._base_url, self._ocr_results)
+            return self._app
+
+    async def load_async(self) -> Starlette:
+        """Builds the app in a worker thread, keeping the event loop free.
+
+        Concurrent requests wait on the asyncio lock; the thread lock in load()
+        covers a build that warm-up has already started.
+        """
+        async with self._async_lock:
+            if self._app is None:
+                await run_in_threadpool(self.load)
+            return self._app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._app is not None:
+            await self._app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        await (await self.load_async())(scope, receive, send)
+        if scope["type"] == "http":
+            FIRST_REQUEST_SECONDS.set(time.perf_counter() - start, route="A2A")
+
+
+def _has_bearer_token(request: Request, token: str | None) -> bool:
+    """Whether the request carries "Authorization: Bearer <token>"; never when token is unset."""
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}")
+
+
+def build_app(
+    base_url: str,
+    ocr_results: OcrResultStore | None = None,
+    warmup: bool | None = None,
+) -> Starlette:
+    """Builds the server; warmup defaults to the WARMUP environment variable."""
+    if ocr_results is None:
+        ocr_results = OcrResultStore()
+    if warmup is None:
+        warmup = warmup_enabled()
+    a2a_app = _LazyA2AApp(base_url, ocr_results)
+    readiness = Readiness(ready=not warmup)
+    warmup_steps = [
+        ("a2a", a2a_app.load),
+        ("a2ui_schema", a2ui_repair.warm_up),
+        ("ocr", ocr.warm_up),
+        ("openai", ui_builder.warm_up),
+        ("claims", storage.claim_summary),
+        ("claim_table", storage.claim_table),
+    ]
+
+    ocr_jobs = OcrJobQueue(result_store=ocr_results)
+    QUEUE_DEPTH.set_function(ocr_jobs.pending, queue="ocr_jobs")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        if warmup:
+            start_warmup(warmup_steps, readiness)
+        try:
+            yield
+        finally:
+            # Queued jobs are dropped; running OCR subprocesses finish on their own.
+            ocr_jobs.shutdown()
+
+    app = Starlette(lifespan=lifespan)
+
+    @track_request("/ocr")
+    @traced_handler("POST /ocr")
+    @PROFILER.wrap_handler("ocr")
+    async def ocr_endpoint(request: Request) -> JSONResponse:
+        try:
+            payload = await request.json()
+        except Exception:
+            return JSONResponse({"error": "Invalid JSON payload"}, status_code=400)
+
+        file_base64 = payload.get("fileBase64")
+        file_name = payload.get("fileName", "receipt")
+        file_type = payload.get("fileType", "image/png")
+        if not file_base64:
+            return JSONResponse({"error": "fileBase64 is required"}, status_code=400)
+
+        try:
+            result = await ocr_receipt(file_base64, file_type, file_name)
+        except (base64.binascii.Error, ValueError) as exc:
+            return JSONResponse(
+                {"error": f"Invalid receipt payload: {exc}"},
+                status_code=400,
+            )
+        except Exception as exc:
+            return JSONResponse(
+                {"error": f"OCR failed: {exc}"},
+                status_code=500,
+            )
+        with span("http.serialize"):
+            return JSONResponse(
+                {"ocrId": ocr_results.put(result), **ocr_result_payload(result)}
+            )
+
+    @track_request("/ocr/jobs")
+    async def ocr_jobs_endpoint(request: Request) -> JSONResponse:
+        try:
+            payload = await request.json()
+        except Exception:
+            return JSONResponse({"error": "Invalid JSON payload"}, status_code=400)
+
+        files = payload.get("files")
+        if not isinstance(files, list) or not files:
+            return JSONResponse({"error": "files is required"}, status_code=400)
+        if any(not isinstance(item, dict) or not item.get("fileBase64") for item in files):
+            return JSONResponse(
+                {"error": "fileBase64 is required for every file"}, status_code=400
+            )
+        if len(files) > ocr_jobs.max_files:
+            return JSONResponse(
+                {"error": f"At most {ocr_jobs.max_files} files per request"}, status_code=413
+            )
+        # Base64 carries 3 bytes in every 4 characters.
+        if sum(len(item["fileBase64"]) for item in files) * 3 // 4 > ocr_jobs.max_bytes:
+            return JSONResponse(
+                {"error": f"At most {ocr_jobs.max_bytes} bytes of files per request"},
+                status_code=413,
+            )
+
+        jobs = [
+            ocr_jobs.submit(
+                item["fileBase64"],
+                item.get("fileType", "image/png"),
+                item.get("fileName", "receipt"),
+            )
+            for item in files
+        ]
+        return JSONResponse(
+            {"jobs": [job_payload(job) for job in jobs]}, status_code=202
+        )
+
+    @track_request("/ocr/jobs/{job_id}")
+    async def ocr_job_endpoint(request: Request) -> JSONResponse:
+        job = ocr_jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+        return JSONResponse(job_payload(job))
+
+    async def ocr_job_events_endpoint(request: Request) -> Any:
+        from sse_starlette.sse import EventSourceResponse
+
+        job_ids = [
+            job_id for job_id in request.query_params.get("ids", "").split(",") if job_id
+        ]
+
+        async def events():
+            for job_id in job_ids:
+                job = ocr_jobs.get(job_id)
+                if job is None:
+                    yield {"event": "missing", "data": json.dumps({"jobId": job_id})}
+                elif job.finished_at is None:
+                    yield {
+                        "event": "status",
+                        "data": json.dumps(job_payload(job), ensure_ascii=False),
+                    }
+            async for job in ocr_jobs.watch(job_ids):
+                yield {
+                    "event": "status",
+                    "data": json.dumps(job_payload(job), ensure_ascii=False),
+                }
+            yield {"event": "end", "data": "{}"}
+
+        return EventSourceResponse(events())
+
+    @track_request("/review")
+    @traced_handler("POST /review")
+    @PROFILER.wrap_handler("review")
+    async def review_endpoint(request: Request) -> JSONResponse:
+        try:
+            payload = await request.json()
+        except Exception:
+            return JSONResponse({"error": "Invalid JSON payload"}, status_code=400)
+
+        ocr_id = payload.get("ocrId")
+        file_base64 = payload.get("fileBase64")
+        file_name = payload.get("fileName", "receipt")
+        file_type = payload.get("fileType", "image/png")
+        if ocr_id:
+            result = ocr_results.get(ocr_id)
+            if result is None:
+                return JSONResponse(
+                    {"error": "ocrId not found or expired"}, status_code=404
+                )
+        elif not file_base64:
+            return JSONResponse(
+                {"error": "ocrId or fileBase64 is required"}, status_code=400
+            )
+        else:
+            try:
+                result = await ocr_receipt(file_base64, file_type, file_name)
+            except (base64.binascii.Error, ValueError) as exc:
+                return JSONResponse(
+                    {"error": f"Invalid receipt payload: {exc}"},
+                    status_code=400,
+                )
+            except Exception as exc:
+                return JSONResponse(
+                    {"error": f"OCR failed: {exc}"},
+                    status_code=500,
+                )
+
+        messages = await review_receipt(review_form_data(result))
+        with span("http.serialize"):
+            return JSONResponse(messages)
+
+    @track_request("/entries")
+    @traced_handler("GET /entries")
+    @PROFILER.wrap_handler("entries")
+    async def entries_endpoint(request: Request) -> JSONResponse:
+        payload = load_entries()
+        layout = payload.get("layout", {})
+        params = request.query_params
+        mode = params.get("mode")
+        fields = params.get("fields")
+        theme = params.get("theme")
+        if mode:
+            layout = {**layout, "mode": mode}
+        if fields:
+            layout = {**layout, "showFields": [f for f in fields.split(",") if f]}
+        if theme:
+            layout = {**layout, "theme": theme}
+        messages = build_entries_screen(payload.get("entries", []), layout)
+        with span("http.serialize"):
+            return JSONResponse(messages)
+
+    @track_request("/claims/export")
+    async def claims_export_endpoint(request: Request) -> Response:
+        # Every user's claims, including memos and amounts: admins only.
+        if not _has_bearer_token(request, os.getenv("CLAIMS_EXPORT_TOKEN")):
+            return JSONResponse({"error": "Forbidden"}, status_code=403)
+        from claim_export import FORMATS, export_chunks, in_period
+        from claim_table import parse_date
+
+        params = request.query_params
+        fmt = params.get("format", "csv")
+        if fmt not in FORMATS:
+            return JSONResponse(
+                {"error": f"format must be one of {', '.join(FORMATS)}"}, status_code=400
+            )
+        bounds = []
+        for name in ("from", "to"):
+            value = params.get(name)
+            parsed = parse_date(value) if value else None
+            if value and parsed is None:
+                return JSONResponse(
+                    {"error": f"{name} must be a date (YYYY-MM-DD)"}, status_code=400
+                )
+            bounds.append(parsed)
+        # Lazy: the snapshot is only mapped once the first batch is read.
+        chunks = export_chunks(in_period(storage.iter_claims(), *bounds), fmt)
+
+        async def stream() -> AsyncIterator[bytes]:
+            # Each batch is read and encoded in a worker thread; stop as soon
+            # as the client has gone instead of finishing the export.
+            try:
+                while not await request.is_disconnected():
+                    chunk = await run_in_threadpool(next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                chunks.close()
+
+        return StreamingResponse(
+            stream(),
+            media_type=FORMATS[fmt],
+            headers={"Content-Disposition": f'attachment; filename="claims.{fmt}"'},
+        )
+
+    async def profiling_admin_endpoint(request: Request) -> JSONResponse:
+        if not _has_bearer_token(request, os.getenv("PROFILE_ADMIN_TOKEN")):
+            return JSONResponse({"error": "Forbidden"}, status_code=403)
+        if request.method == "PUT":
+            try:
+                payload = await request.json()
+                sample_rate = float(payload["sampleRate"])
+            except Exception:
+                return JSONResponse(
+                    {"error": "sampleRate (0.0-1.0) is required"}, status_code=400
+                )
+            PROFILER.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        return JSONResponse(
+            {
+                "enabled": PROFILER.enabled,
+                "directory": str(PROFILER.directory or ""),
+                "sampleRate": PROFILER.sample_rate,
+            }
+        )
+
+    async def health_endpoint(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok"})
+
+    async def readiness_endpoint(request: Request) -> JSONResponse:
+        return JSONResponse(readiness.payload(), status_code=200 if readiness.ready else 503)
+
+    async def metrics_endpoint(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(
+            REGISTRY.render(), media_type="text/plain; version=0.0.4"
+        )
+
+    app.add_route("/ocr", ocr_endpoint, methods=["POST"])
+    app.add_route("/ocr/jobs", ocr_jobs_endpoint, methods=["POST"])
+    app.add_route("/ocr/jobs/events", ocr_job_events_endpoint, methods=["GET"])
+    app.add_route("/ocr/jobs/{job_id}", ocr_job_endpoint, methods=["GET"])
+    app.add_route("/review", review_endpoint, methods=["POST"])
+    app.add_route("/entries", entries_endpoint, methods=["GET"])
+    app.add_route("/claims/export", claims_export_endpoint, methods=["GET"])
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"])
+    app.add_route("/healthz", health_endpoint, methods=["GET"])
+    app.add_route("/readyz", readiness_endpoint, methods=["GET"])
+    app.add_route(
+        "/admin/profiling", profiling_admin_endpoint, methods=["GET", "PUT"]
+    )
+    # Everything else, "/" and the agent card, belongs to the A2A application.
+    app.mount("", a2a_app)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origin_regex=r"https?://.*",
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
@@ -0,0 +1,148 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Micro-benchmark: single-pass field scanner vs. the original regex extractors.
+
+Usage:
+    python benchmarks/bench_field_scanner.py [--number 2000]
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import timeit
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ocr import _scan_fields  # noqa: E402
+
+
+# The extractors as they were before the single-pass scanner, kept verbatim so
+# the comparison stays meaningful after ocr.py moves on.
+def _legacy_detect_currency(text: str) -> str:
+    if "USD" in text or "$" in text:
+        return "USD"
+    if "EUR" in text or "€" in text:
+        return "EUR"
+    if "¥" in text or "￥" in text:
+        return "JPY"
+    return "JPY"
+
+
+def _legacy_extract_date(text: str) -> str:
+    patterns = [
+        r"\b(20\d{2}[/-]\d{1,2}[/-]\d{1,2})\b",
+        r"\b(20\d{2}\.\d{1,2}\.\d{1,2})\b",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            return match.group(1).replace(".", "/")
+    return ""
+
+
+def _legacy_extract_amount(text: str) -> str:
+    matches = re.findall(r"(?:¥|￥|\$|€)?\s?([\d,]+(?:\.\d{1,2})?)", text)
+    amounts = []
+    for raw in matches:
+        normalized = raw.replace(",", "")
+        try:
+            amounts.append(float(normalized))
+        except ValueError:
+            continue
+    if not amounts:
+        return ""
+    return f"{max(amounts):.2f}"
+
+
+def _legacy_extract_merchant(text: str) -> str:
+    for line in text.splitlines():
+        cleaned = line.strip()
+        if not cleaned:
+            continue
+        if re.fullmatch(r"[\d\W]+", cleaned):
+            continue
+        return cleaned
+    return ""
+
+
+def _legacy_extract(text: str) -> tuple[str, str, str, str]:
+    return (
+        _legacy_extract_merchant(text),
+        _legacy_extract_date(text),
+        _legacy_extract_amount(text),
+        _legacy_detect_currency(text),
+    )
+
+
+def _scanner_extract(text: str) -> tuple[str, str, str, str]:
+    fields = _scan_fields(text)
+    return fields.merchant, fields.date, fields.amount, fields.currency
+
+
+SAMPLES = {
+    "jp_convenience": (
+        "セブンイレブン 渋谷道玄坂店\n"
+        "東京都渋谷区道玄坂1-2-3\n"
+        "TEL 03-1234-5678\n"
+        "2025年12月3日(水) 12:34\n"
+        "登録番号 T1234567890123\n"
+        "おにぎり 鮭 ¥150\n"
+        "緑茶 500ml ¥130\n"
+        "サンドイッチ ¥398\n"
+        "小計 ¥678\n"
+        "(税込 8% 対象 ¥678)\n"
+        "合計 ¥732\n"
+        "お預り ¥1,000\n"
+        "お釣り ¥268\n"
+    ),
+    "us_invoice": (
+        "Microsoft Corporation\n"
+        "Invoice G127046712 Account 7201040109224 5\n"
+        "Invoice date 2025-12-03\n"
+        "Subscription  1  $20.00\n"
+        "Subtotal $20.00\n"
+        "Tax $2.00\n"
+        "Total $22.00\n"
+    ),
+    "eu_cafe": (
+        "Café Central\n"
+        "25.12.2024 09:41\n"
+        "Latte 4,50\n"
+        "Croissant 3,20\n"
+        "TOTAL\n"
+        "7.70 EUR\n"
+    ),
+}
+
+
+@click.command()
+@click.option("--number", default=2000, help="Iterations per sample.")
+def main(number: int) -> None:
+    for name, text in SAMPLES.items():
+        legacy = min(timeit.repeat(lambda: _legacy_extract(text), number=number, repeat=5))
+        scanner = min(
+            timeit.repeat(lambda: _scanner_extract(text), number=number, repeat=5)
+        )
+        print(f"{name}:")
+        print(f"  legacy  {legacy / number * 1e6:8.2f} us/op  -> {_legacy_extract(text)}")
+        print(f"  scanner {scanner / number * 1e6:8.2f} us/op  -> {_scanner_extract(text)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures agent cold start: time to listen, time to ready, first requests.
+
+Starts `__main__.py` in a fresh process for each run, with and without
+warm-up, and records how long it takes until /healthz answers (listening)
+and /readyz returns 200 (ready), then the latency of the first GET /entries,
+agent card and A2A search_expense request. These requests only read
+agent/data; OPENAI_API_KEY is cleared so no run reaches the network.
+
+Usage:
+    python benchmarks/cold_start.py [--runs 5] [--output cold_start.json]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import click
+import httpx
+
+_AGENT_DIR = Path(__file__).resolve().parent.parent
+A2UI_EXTENSION_URI = "https://a2ui.org/a2a-extension/a2ui/v0.8"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(client: httpx.Client, path: str, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} did not answer 200 in time")
+
+
+def _search_message() -> dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": str(uuid4()),
+        "method": "message/send",
+        "params": {
+            "message": {
+                "kind": "message",
+                "messageId": str(uuid4()),
+                "role": "user",
+                "parts": [
+                    {"kind": "data", "data": {"userAction": {"name": "search_expense", "context": {"query": ""}}}}
+                ],
+            }
+        },
+    }
+
+
+def measure(warmup: bool, timeout: float) -> dict[str, float]:
+    port = _free_port()
+    env = {**os.environ, "WARMUP": "1" if warmup else "0", "OPENAI_API_KEY": ""}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "__main__.py", "--port", str(port)],
+        cwd=_AGENT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://localhost:{port}", timeout=timeout) as client:
+            deadline = started + timeout
+            result = {"listening": _wait_for(client, "/healthz", deadline) - started}
+            result["ready"] = _wait_for(client, "/readyz", deadline) - started
+            requests = {
+                "GET /entries": lambda: client.get("/entries"),
+                "GET agent card": lambda: client.get("/.well-known/agent-card.json"),
+                "A2A search_expense": lambda: client.post(
+                    "/", json=_search_message(), headers={"X-A2A-Extensions": A2UI_EXTENSION_URI}
+                ),
+            }
+            for name, send in requests.items():
+                start = time.perf_counter()
+                send().raise_for_status()
+                result[f"first {name}"] = time.perf_counter() - start
+            return result
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@click.command()
+@click.option("--runs", default=5, help="Processes started per mode.")
+@click.option("--timeout", default=60.0, help="Seconds to wait for a process to become ready.")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), default=None)
+def main(runs: int, timeout: float, output: Path | None) -> None:
+    report: dict[str, dict[str, float]] = {}
+    for warmup in (False, True):
+        mode = "warmup" if warmup else "lazy"
+        samples = [measure(warmup, timeout) for _ in range(runs)]
+        report[mode] = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+        click.echo(f"{mode} (median of {runs})")
+        for key, value in report[mode].items():
+            click.echo(f"  {key:28s} {value * 1000:9.1f} ms")
+    if output:
+        output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
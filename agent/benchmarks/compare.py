@@ -0,0 +1,67 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares two run_benchmarks.py reports by median time.
+
+Usage:
+    python benchmarks/compare.py base.json head.json [--threshold 1.2]
+
+Exits with status 1 when any benchmark got slower than the threshold ratio.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import click
+
+
+def _key(result: dict[str, Any]) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['group']}/{result['name']}" + (f" [{params}]" if params else "")
+
+
+def _load(path: Path) -> tuple[str, dict[str, dict[str, Any]]]:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    results = {_key(result): result for result in report["results"] if not result["skipped"]}
+    return report.get("commit", path.stem), results
+
+
+@click.command()
+@click.argument("base", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("head", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--threshold", default=1.2, help="Slowdown ratio reported as a regression.")
+def main(base: Path, head: Path, threshold: float) -> None:
+    base_commit, base_results = _load(base)
+    head_commit, head_results = _load(head)
+    click.echo(f"{'benchmark':60s} {base_commit:>12s} {head_commit:>12s}  ratio")
+    regressions = []
+    for key in sorted(base_results.keys() & head_results.keys()):
+        before = base_results[key]["median_s"]
+        after = head_results[key]["median_s"]
+        ratio = after / before if before else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        click.echo(f"{key:60s} {before * 1000:10.3f}ms {after * 1000:10.3f}ms  {ratio:5.2f}x{flag}")
+        if flag:
+            regressions.append(key)
+    for key in sorted(base_results.keys() ^ head_results.keys()):
+        click.echo(f"{key:60s} only in {'base' if key in base_results else 'head'}")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic synthetic receipts, claims and entries for the benchmarks."""
+
+from __future__ import annotations
+
+import base64
+import io
+import random
+from dataclasses import dataclass
+
+from PIL import Image, ImageDraw, ImageFont
+
+_MERCHANTS = (
+    "Blue Bottle Coffee",
+    "Tokyo Station Kiosk",
+    "Cafe Central",
+    "Office Depot",
+    "Yamada Denki",
+    "Lawson Shibuya",
+    "Uber Technologies",
+    "Hotel Gracery",
+)
+_ITEMS = (
+    "Latte", "Croissant", "Sandwich", "Green tea", "USB cable", "Notebook",
+    "Taxi fare", "Room charge", "Parking", "Lunch set",
+)
+_CURRENCIES = (("JPY", "¥", 0), ("USD", "$", 2), ("EUR", "EUR ", 2))
+_CATEGORIES = ("交通費", "会議費", "消耗品費", "交際費", "宿泊費")
+_PAYMENTS = ("現金", "法人カード", "立替")
+
+
+@dataclass(frozen=True)
+class SyntheticReceipt:
+    text: str
+    merchant: str
+    date: str
+    amount: str
+    currency: str
+
+
+def receipts(count: int, seed: int = 0) -> list[SyntheticReceipt]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        merchant = rng.choice(_MERCHANTS)
+        year, month, day = rng.randint(2023, 2025), rng.randint(1, 12), rng.randint(1, 28)
+        date_text = rng.choice(
+            (f"{year}/{month:02d}/{day:02d}", f"{year}-{month:02d}-{day:02d}", f"{year}.{month}.{day}")
+        )
+        currency, symbol, decimals = rng.choice(_CURRENCIES)
+        lines = [merchant, f"TEL 03-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}", date_text]
+        total = 0.0
+        for _ in range(rng.randint(2, 12)):
+            price = round(rng.uniform(1, 80) if decimals else rng.randint(100, 3000), decimals)
+            total += price
+            lines.append(f"{rng.choice(_ITEMS)} {symbol}{price:,.{decimals}f}")
+        lines.append(f"Total {symbol}{total:,.{decimals}f}")
+        corpus.append(
+            SyntheticReceipt(
+                text="\n".join(lines),
+                merchant=merchant,
+                date=f"{year}/{month:02d}/{day:02d}",
+                amount=f"{total:.2f}",
+                currency=currency,
+            )
+        )
+    return corpus
+
+
+def render_png(receipt: SyntheticReceipt, font_size: int = 28) -> bytes:
+    """Renders the receipt text black on white, roughly like a phone scan."""
+    font = ImageFont.load_default(size=font_size)
+    lines = receipt.text.splitlines()
+    line_height = int(font_size * 1.5)
+    image = Image.new("L", (900, line_height * (len(lines) + 2)), color=255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines, start=1):
+        draw.text((40, index * line_height), line, fill=0, font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_base64(receipt: SyntheticReceipt) -> str:
+    return base64.b64encode(render_png(receipt)).decode("ascii")
+
+
+def claims(count: int, seed: int = 0) -> list[dict[str, str]]:
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        receipt = receipts(1, seed=seed * 1_000_003 + index)[0]
+        records.append(
+            {
+                "id": f"claim-{index:07d}",
+                "createdAt": f"2025-01-01T00:00:{index % 60:02d}",
+                "receiptName": f"receipt-{index}.png",
+                "merchant": receipt.merchant,
+                "date": receipt.date,
+                "amount": receipt.amount,
+                "currency": receipt.currency,
+                "category": rng.choice(_CATEGORIES),
+                "paymentMethod": rng.choice(_PAYMENTS),
+                "memo": rng.choice(_ITEMS),
+            }
+        )
+    return records
+
+
+def entries(count: int, seed: int = 0) -> list[dict[str, str]]:
+    return [
+        {
+            "id": claim["id"],
+            "title": claim["merchant"],
+            "date": claim["date"],
+            "amount": claim["amount"],
+            "currency": claim["currency"],
+            "memo": claim["memo"],
+        }
+        for claim in claims(count, seed)
+    ]
@@ -0,0 +1,207 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline stand-in for the OpenAI Responses API.
+
+Answers POST /v1/responses after a sampled latency with a canned A2UI review
+built from the request's Data section: valid, malformed (truncated JSON) or
+fenced (wrapped in a markdown code fence), in configurable proportions, and
+fails a configurable share of requests with 500 or 429. GET /stats returns
+the counts served so far.
+
+Usage:
+    python benchmarks/fake_openai.py --port 8011 --latency-ms 800 \\
+        --latency-dist lognormal --error-rate 0.02 --mix valid=0.8,malformed=0.1,fenced=0.1
+
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://localhost:8011/v1 python __main__.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import click
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ui_builder import build_review_fallback  # noqa: E402
+
+OUTPUT_KINDS = ("valid", "malformed", "fenced")
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class LatencyModel:
+    """Samples a delay in seconds whose mean is mean_ms.
+
+    uniform spans [0, 2 * mean]; lognormal uses sigma as the spread of the
+    underlying normal, so larger values give a heavier tail.
+    """
+
+    def __init__(self, distribution: str, mean_ms: float, sigma: float, rng: random.Random):
+        self.distribution = distribution
+        self.mean = mean_ms / 1000
+        self.sigma = sigma
+        self._rng = rng
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return self._rng.uniform(0, 2 * self.mean)
+        if self.distribution == "exponential":
+            return self._rng.expovariate(1 / self.mean)
+        if self.distribution == "lognormal":
+            mu = math.log(self.mean) - self.sigma**2 / 2
+            return self._rng.lognormvariate(mu, self.sigma)
+        return self.mean
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OUTPUT_KINDS:
+            raise click.BadParameter(f"unknown output kind {name!r}; use {', '.join(OUTPUT_KINDS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _request_data(payload: dict[str, Any]) -> dict[str, Any]:
+    """Recovers the form data the agent appends after "Data:" in its prompt."""
+    for message in reversed(payload.get("input") or []):
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str) and "Data:\n" in content:
+            try:
+                return json.loads(content.rsplit("Data:\n", 1)[1])
+            except json.JSONDecodeError:
+                break
+    return {}
+
+
+def canned_output(kind: str, data: dict[str, Any]) -> str:
+    text = json.dumps(build_review_fallback(data), ensure_ascii=False)
+    if kind == "malformed":
+        return text[: len(text) * 2 // 3]
+    if kind == "fenced":
+        return f"```json\n{text}\n```"
+    return text
+
+
+def _response_body(model: str, text: str) -> dict[str, Any]:
+    return {
+        "id": f"resp_{uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": model,
+        "output": [
+            {
+                "id": f"msg_{uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": 0,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": len(text) // 4,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": len(text) // 4,
+        },
+    }
+
+
+def build_fake_app(
+    latency: LatencyModel,
+    error_rate: float,
+    mix: dict[str, float],
+    rng: random.Random,
+) -> Starlette:
+    stats: Counter[str] = Counter()
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+
+    async def responses(request: Request) -> JSONResponse:
+        payload = await request.json()
+        await asyncio.sleep(latency.sample())
+        stats["requests"] += 1
+        if rng.random() < error_rate:
+            status = rng.choice((429, 500))
+            stats[f"error_{status}"] += 1
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "server_error", "code": None}},
+                status_code=status,
+            )
+        kind = rng.choices(kinds, weights)[0]
+        stats[kind] += 1
+        text = canned_output(kind, _request_data(payload))
+        return JSONResponse(_response_body(payload.get("model", "fake"), text))
+
+    async def stats_endpoint(request: Request) -> JSONResponse:
+        return JSONResponse(dict(stats))
+
+    return Starlette(
+        routes=[
+            Route("/v1/responses", responses, methods=["POST"]),
+            Route("/stats", stats_endpoint, methods=["GET"]),
+        ]
+    )
+
+
+@click.command()
+@click.option("--host", default="localhost")
+@click.option("--port", default=8011)
+@click.option("--latency-ms", default=800.0, help="Mean response latency.")
+@click.option("--latency-dist", type=click.Choice(LATENCY_DISTRIBUTIONS), default="lognormal")
+@click.option("--sigma", default=0.6, help="Spread of the lognormal distribution.")
+@click.option("--error-rate", default=0.0, help="Share of requests failed with 429/500.")
+@click.option("--mix", default="valid=1", help="Output weights, e.g. valid=0.8,malformed=0.1,fenced=0.1.")
+@click.option("--seed", default=None, type=int)
+def main(
+    host: str,
+    port: int,
+    latency_ms: float,
+    latency_dist: str,
+    sigma: float,
+    error_rate: float,
+    mix: str,
+    seed: int | None,
+) -> None:
+    import uvicorn
+
+    rng = random.Random(seed)
+    app = build_fake_app(LatencyModel(latency_dist, latency_ms, sigma, rng), error_rate, parse_mix(mix), rng)
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Closed-loop load generator for a running agent.
+
+--concurrency workers each pick an operation from the weighted --mix, send
+it and immediately pick the next one, until --duration elapses or
+--requests have been sent. Latency percentiles, throughput and errors are
+reported per route.
+
+Operations: the A2A upload_receipt, submit_expense, search_expense and
+show_summary actions (message/send with the A2UI extension) and the /ocr,
+/review and /entries routes. submit_expense and upload_receipt write to the server's
+claim store, so point this at a disposable instance.
+
+Usage:
+    python benchmarks/loadgen.py --url http://localhost:10002 --concurrency 32 \\
+        --duration 60 --mix entries=4,search=3,review=1,ocr=1,upload=1,submit=1
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+import click
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+
+A2UI_EXTENSION_URI = "https://a2ui.org/a2a-extension/a2ui/v0.8"
+
+_ROUTES = {
+    "upload": "A2A upload_receipt",
+    "submit": "A2A submit_expense",
+    "search": "A2A search_expense",
+    "summary": "A2A show_summary",
+    "ocr": "POST /ocr",
+    "review": "POST /review",
+    "entries": "GET /entries",
+}
+
+
+class Workload:
+    def __init__(self, distinct_receipts: int, seed: int):
+        self.rng = random.Random(seed)
+        # A handful of distinct files: identical concurrent uploads coalesce on
+        # the server, which a single repeated file would overstate.
+        self.receipts = corpus.receipts(distinct_receipts, seed=seed)
+        self.images = [corpus.render_base64(receipt) for receipt in self.receipts]
+        self.claims = corpus.claims(64, seed=seed)
+
+    def receipt_payload(self) -> dict[str, str]:
+        index = self.rng.randrange(len(self.images))
+        return {
+            "fileBase64": self.images[index],
+            "fileName": f"load-{index}.png",
+            "fileType": "image/png",
+        }
+
+    def a2a_message(self, action: str, context: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "id": str(uuid4()),
+            "method": "message/send",
+            "params": {
+                "message": {
+                    "kind": "message",
+                    "messageId": str(uuid4()),
+                    "role": "user",
+                    "parts": [
+                        {"kind": "data", "data": {"userAction": {"name": action, "context": context}}}
+                    ],
+                }
+            },
+        }
+
+    async def upload(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await self._a2a(client, "upload_receipt", self.receipt_payload())
+
+    async def submit(self, client: httpx.AsyncClient) -> httpx.Response:
+        claim = self.rng.choice(self.claims)
+        context = {key: value for key, value in claim.items() if key not in ("id", "createdAt")}
+        return await self._a2a(client, "submit_expense", context)
+
+    async def search(self, client: httpx.AsyncClient) -> httpx.Response:
+        query = self.rng.choice(("", self.rng.choice(self.claims)["merchant"].split()[0]))
+        return await self._a2a(client, "search_expense", {"query": query})
+
+    async def summary(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await self._a2a(client, "show_summary", {})
+
+    async def ocr(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/ocr", json=self.receipt_payload())
+
+    async def review(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/review", json=self.receipt_payload())
+
+    async def entries(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/entries")
+
+    async def _a2a(
+        self, client: httpx.AsyncClient, action: str, context: dict[str, Any]
+    ) -> httpx.Response:
+        return await client.post(
+            "/",
+            json=self.a2a_message(action, context),
+            headers={"X-A2A-Extensions": A2UI_EXTENSION_URI},
+        )
+
+
+def _failed(response: httpx.Response) -> str:
+    if response.status_code >= 400:
+        return f"HTTP {response.status_code}"
+    if response.request.url.path == "/":
+        body = response.json()
+        if "error" in body:
+            return f"JSON-RPC {body['error'].get('code')}"
+    return ""
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in _ROUTES:
+            raise click.BadParameter(f"unknown operation {name!r}; use {', '.join(_ROUTES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def run_load(
+    url: str,
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    max_requests: int | None,
+    timeout: float,
+    workload: Workload,
+) -> tuple[dict[str, list[float]], dict[str, dict[str, int]], float]:
+    operations: dict[str, Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]] = {
+        name: getattr(workload, name) for name in mix
+    }
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal sent
+        while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+            sent += 1
+            name = workload.rng.choices(names, weights)[0]
+            route = _ROUTES[name]
+            began = time.perf_counter()
+            try:
+                response = await operations[name](client)
+                error = _failed(response)
+            except httpx.HTTPError as exc:
+                error = type(exc).__name__
+            latencies[route].append(time.perf_counter() - began)
+            if error:
+                errors[route][error] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+@click.command()
+@click.option("--url", default="http://localhost:10002")
+@click.option("--concurrency", default=16, help="Requests in flight at any time.")
+@click.option("--duration", default=30.0, help="Seconds to run.")
+@click.option("--requests", "max_requests", default=None, type=int, help="Stop after this many.")
+@click.option(
+    "--mix",
+    default="entries=4,search=3,review=1,ocr=1,upload=1,submit=1",
+    help=f"Operation weights; operations: {', '.join(_ROUTES)}.",
+)
+@click.option("--distinct-receipts", default=20, help="Synthetic receipt images to rotate through.")
+@click.option("--timeout", default=120.0, help="Per-request timeout in seconds.")
+@click.option("--seed", default=0)
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), default=None)
+def main(
+    url: str,
+    concurrency: int,
+    duration: float,
+    max_requests: int | None,
+    mix: str,
+    distinct_receipts: int,
+    timeout: float,
+    seed: int,
+    output: Path | None,
+) -> None:
+    workload = Workload(distinct_receipts, seed)
+    latencies, errors, elapsed = asyncio.run(
+        run_load(url, parse_mix(mix), concurrency, duration, max_requests, timeout, workload)
+    )
+
+    report = {"url": url, "concurrency": concurrency, "elapsedSeconds": elapsed, "routes": {}}
+    click.echo(
+        f"{'route':22s} {'count':>7s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>7s}"
+    )
+    for route in sorted(latencies):
+        values = sorted(latencies[route])
+        summary = {
+            "count": len(values),
+            "throughput": len(values) / elapsed,
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+            "errors": dict(errors.get(route, {})),
+        }
+        report["routes"][route] = summary
+        click.echo(
+            f"{route:22s} {summary['count']:7d} {summary['throughput']:8.2f} "
+            f"{summary['p50'] * 1000:9.1f} {summary['p95'] * 1000:9.1f} {summary['p99'] * 1000:9.1f} "
+            f"{sum(summary['errors'].values()):7d}"
+        )
+    total = sum(len(values) for values in latencies.values())
+    click.echo(f"total {total} requests in {elapsed:.1f}s ({total / elapsed:.2f} req/s)")
+    for route, counts in sorted(errors.items()):
+        click.echo(f"  {route}: {json.dumps(dict(counts))}")
+    if output:
+        output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
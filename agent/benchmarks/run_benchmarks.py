@@ -0,0 +1,367 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks for the agent hot paths, written as JSON for comparison.
+
+Covers the OCR field extractors on a synthetic corpus (and tesseract itself
+when it is installed), the ui_builder surfaces, storage add/search and the
+/ocr, /review and /entries routes through a Starlette TestClient. Claims and
+entries are written to a temporary directory, never to agent/data.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 10,1000,100000] [--group ui]
+        [--output benchmarks/results/<commit>.json]
+    python benchmarks/compare.py base.json head.json
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import corpus  # noqa: E402
+from claim_store import ClaimStore  # noqa: E402
+import entries  # noqa: E402
+import fx  # noqa: E402
+import storage  # noqa: E402
+from ocr import OcrResult, _scan_fields, extract_from_base64  # noqa: E402
+from ui_builder import (  # noqa: E402
+    build_ai_review,
+    build_entries_screen,
+    build_search_results,
+)
+
+_BENCH_DIR = Path(__file__).resolve().parent
+_SAMPLE_RATES = _BENCH_DIR.parent / "data" / "fx_rates.sample.csv"
+_GROUPS = ("ocr", "ui", "storage", "http")
+
+
+@dataclass
+class BenchResult:
+    group: str
+    name: str
+    params: dict[str, Any] = field(default_factory=dict)
+    runs: int = 0
+    median_s: float = 0.0
+    mean_s: float = 0.0
+    min_s: float = 0.0
+    max_s: float = 0.0
+    stdev_s: float = 0.0
+    extra: dict[str, Any] = field(default_factory=dict)
+    skipped: str = ""
+
+
+def _measure(
+    group: str,
+    name: str,
+    func: Callable[[], Any],
+    runs: int,
+    params: dict[str, Any] | None = None,
+    warmup: int = 1,
+) -> BenchResult:
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return BenchResult(
+        group=group,
+        name=name,
+        params=params or {},
+        runs=runs,
+        median_s=statistics.median(timings),
+        mean_s=statistics.fmean(timings),
+        min_s=min(timings),
+        max_s=max(timings),
+        stdev_s=statistics.stdev(timings) if runs > 1 else 0.0,
+    )
+
+
+def _runs_for(size: int) -> int:
+    if size >= 100_000:
+        return 3
+    if size >= 10_000:
+        return 5
+    return 20
+
+
+@contextlib.contextmanager
+def _data_dir() -> Iterator[Path]:
+    """Points storage and entries at a scratch directory."""
+    saved = (storage.DATA_DIR, storage.CLAIMS_PATH, entries.DATA_DIR, entries.ENTRIES_PATH)
+    with tempfile.TemporaryDirectory(prefix="expense-bench-") as tmp:
+        path = Path(tmp)
+        storage.DATA_DIR = entries.DATA_DIR = path
+        storage.CLAIMS_PATH = path / "claims.json"
+        entries.ENTRIES_PATH = path / "entries.json"
+        try:
+            yield path
+        finally:
+            storage.DATA_DIR, storage.CLAIMS_PATH, entries.DATA_DIR, entries.ENTRIES_PATH = saved
+
+
+@contextlib.contextmanager
+def _offline_llm() -> Iterator[None]:
+    """Forces the review fallback so results do not depend on the network."""
+    saved = os.environ.pop("OPENAI_API_KEY", None)
+    try:
+        yield
+    finally:
+        if saved is not None:
+            os.environ["OPENAI_API_KEY"] = saved
+
+
+@contextlib.contextmanager
+def _export_token() -> Iterator[dict[str, str]]:
+    """Sets CLAIMS_EXPORT_TOKEN and yields the headers that pass it."""
+    saved = os.environ.get("CLAIMS_EXPORT_TOKEN")
+    os.environ["CLAIMS_EXPORT_TOKEN"] = "bench"
+    try:
+        yield {"Authorization": "Bearer bench"}
+    finally:
+        if saved is None:
+            del os.environ["CLAIMS_EXPORT_TOKEN"]
+        else:
+            os.environ["CLAIMS_EXPORT_TOKEN"] = saved
+
+
+def _accuracy(results: list[OcrResult], expected: list[corpus.SyntheticReceipt]) -> dict[str, float]:
+    accuracy = {}
+    for name in ("merchant", "date", "amount", "currency"):
+        hits = sum(getattr(got, name) == getattr(want, name) for got, want in zip(results, expected))
+        accuracy[name] = round(hits / len(expected), 4)
+    return accuracy
+
+
+def bench_ocr(sizes: list[int]) -> Iterator[BenchResult]:
+    receipts = corpus.receipts(200)
+    result = _measure("ocr", "scan_fields", lambda: [_scan_fields(r.text) for r in receipts], 20)
+    result.params = {"receipts": len(receipts)}
+    yield result
+
+    sample = corpus.receipts(10, seed=1)
+    images = [corpus.render_base64(receipt) for receipt in sample]
+    if shutil.which("tesseract") is None:
+        for mode in ("full", "regions"):
+            yield BenchResult("ocr", f"tesseract_{mode}", skipped="tesseract is not installed")
+        return
+    for mode in ("full", "regions"):
+        outputs: list[OcrResult] = []
+
+        def run(mode: str = mode) -> None:
+            outputs[:] = [
+                extract_from_base64(image, "image/png", "bench.png", mode=mode) for image in images
+            ]
+
+        result = _measure("ocr", f"tesseract_{mode}", run, runs=3)
+        result.params = {"receipts": len(images)}
+        result.extra = {"accuracy": _accuracy(outputs, sample)}
+        yield result
+
+
+def bench_ui(sizes: list[int]) -> Iterator[BenchResult]:
+    layout = {"mode": "grid", "showFields": ["title", "date", "amount", "currency", "memo"]}
+    for size in sizes:
+        claims = corpus.claims(size)
+        items = corpus.entries(size)
+        yield _measure(
+            "ui", "build_search_results", lambda: build_search_results(claims), _runs_for(size), {"items": size}
+        )
+        yield _measure(
+            "ui",
+            "build_entries_screen",
+            lambda: build_entries_screen(items, layout),
+            _runs_for(size),
+            {"items": size},
+        )
+    form = {
+        "receiptName": "bench.png", "merchant": "Cafe Central", "date": "2025/01/02",
+        "amount": "7.70", "currency": "EUR", "category": "", "paymentMethod": "", "memo": "",
+    }
+    with _offline_llm():
+        yield _measure("ui", "build_ai_review_fallback", lambda: build_ai_review(form), 200)
+
+
+def bench_storage(sizes: list[int]) -> Iterator[BenchResult]:
+    payload = {key: value for key, value in corpus.claims(1)[0].items() if key not in ("id", "createdAt")}
+    for size in sizes:
+        with _data_dir():
+            storage.save_claims(corpus.claims(size))
+            runs = _runs_for(size)
+            yield _measure("storage", "add_claim", lambda: storage.add_claim(payload), runs, {"claims": size})
+            yield _measure(
+                "storage", "search_claims", lambda: storage.search_claims("coffee"), runs, {"claims": size}
+            )
+            yield _measure("storage", "search_claims_all", lambda: storage.search_claims(""), runs, {"claims": size})
+            directory = storage.DATA_DIR
+            yield _measure("storage", "open_store", lambda: len(ClaimStore(directory)), runs, {"claims": size})
+            yield _measure(
+                "storage", "load_claims_cold", lambda: ClaimStore(directory).claims(), runs, {"claims": size}
+            )
+            table = storage.claim_table()
+            year = table.select(start=date(2025, 1, 1), end=date(2025, 12, 31))
+            yield _measure(
+                "storage", "totals_by_month_category", lambda: table.totals(("month", "category"), year), runs,
+                {"claims": size},
+            )
+            rates = fx.RateTable.load(_SAMPLE_RATES, "JPY")
+            yield _measure(
+                "storage",
+                "converted_totals_by_month",
+                lambda: table.converted_totals(rates, "JPY", ("month",), year),
+                runs,
+                {"claims": size},
+            )
+
+
+def bench_http(sizes: list[int]) -> Iterator[BenchResult]:
+    from starlette.testclient import TestClient
+
+    from app import build_app
+    from ocr_store import OcrResultStore
+
+    receipt = corpus.receipts(1, seed=2)[0]
+    ocr_results = OcrResultStore()
+    ocr_id = ocr_results.put(
+        OcrResult(
+            receipt_name="bench.png",
+            text=receipt.text,
+            merchant=receipt.merchant,
+            date=receipt.date,
+            amount=receipt.amount,
+            currency=receipt.currency,
+        )
+    )
+    with _data_dir() as data_dir, _offline_llm(), _export_token() as export_headers:
+        client = TestClient(build_app("http://bench", ocr_results=ocr_results))
+
+        def check(response: Any) -> None:
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text}")
+
+        for size in sizes:
+            if size > 10_000:
+                # One JSON response with 100k rows measures json.dumps, not the route.
+                continue
+            (data_dir / "entries.json").write_text(
+                json.dumps({"entries": corpus.entries(size), "layout": {}}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            yield _measure(
+                "http", "GET /entries", lambda: check(client.get("/entries")), _runs_for(size), {"items": size}
+            )
+        for size in sizes:
+            storage.save_claims(corpus.claims(size))
+            yield _measure(
+                "http",
+                "GET /claims/export (csv)",
+                lambda: check(client.get("/claims/export?format=csv", headers=export_headers)),
+                _runs_for(size),
+                {"claims": size},
+            )
+        yield _measure(
+            "http", "POST /review (ocrId)", lambda: check(client.post("/review", json={"ocrId": ocr_id})), 50
+        )
+        if shutil.which("tesseract") is None:
+            yield BenchResult("http", "POST /ocr", skipped="tesseract is not installed")
+            return
+        image = corpus.render_base64(receipt)
+
+        def post_ocr() -> None:
+            check(client.post("/ocr", json={"fileBase64": image, "fileName": "bench.png"}))
+
+        yield _measure("http", "POST /ocr", post_ocr, 5)
+
+
+_BENCHES: dict[str, Callable[[list[int]], Iterator[BenchResult]]] = {
+    "ocr": bench_ocr,
+    "ui": bench_ui,
+    "storage": bench_storage,
+    "http": bench_http,
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=_BENCH_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@click.command()
+@click.option("--sizes", default="10,1000,100000", help="Item counts for ui/storage/http.")
+@click.option(
+    "--group",
+    "groups",
+    multiple=True,
+    type=click.Choice(_GROUPS),
+    help="Benchmark groups to run (default: all).",
+)
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), default=None)
+def main(sizes: str, groups: tuple[str, ...], output: Path | None) -> None:
+    # The review fallback warns on every call without an API key.
+    logging.disable(logging.WARNING)
+    size_list = [int(size) for size in sizes.split(",") if size]
+    commit = _git_commit()
+    results: list[BenchResult] = []
+    for group in groups or _GROUPS:
+        for result in _BENCHES[group](size_list):
+            results.append(result)
+            label = f"{result.group}/{result.name} {result.params or ''}".strip()
+            if result.skipped:
+                click.echo(f"{label:60s} skipped: {result.skipped}")
+            else:
+                click.echo(f"{label:60s} median {result.median_s * 1000:10.3f} ms  (n={result.runs})")
+
+    output = output or _BENCH_DIR / "results" / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "commit": commit,
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": [asdict(result) for result in results],
+    }
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    click.echo(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
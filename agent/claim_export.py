@@ -0,0 +1,95 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""CSV and JSON Lines export of claims, produced in batches of rows."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import re
+from datetime import date
+from typing import Any, Iterable, Iterator
+
+from claim_table import parse_date
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+CSV_FIELDS = (
+    "id",
+    "createdAt",
+    "submittedBy",
+    "receiptName",
+    "merchant",
+    "date",
+    "amount",
+    "currency",
+    "category",
+    "paymentMethod",
+    "memo",
+)
+BATCH_ROWS = 500
+# Spreadsheets run cells starting with these as formulas; such cells get a
+# leading apostrophe, except plain numbers such as "-300".
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+def in_period(claims: Iterable[dict[str, Any]], start: date | None, end: date | None) -> Iterator[dict[str, Any]]:
+    """Claims dated within [start, end]; claims without a readable date only when unbounded."""
+    if start is None and end is None:
+        yield from claims
+        return
+    for claim in claims:
+        claim_date = parse_date(str(claim.get("date", "")))
+        if claim_date is None:
+            continue
+        if (start is None or claim_date >= start) and (end is None or claim_date <= end):
+            yield claim
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES) and not _NUMBER_RE.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def export_chunks(claims: Iterable[dict[str, Any]], fmt: str, batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """Encodes claims as UTF-8 CSV (with a header row) or JSON Lines.
+
+    Each chunk holds up to batch_rows rows. CSV has the CSV_FIELDS columns,
+    ignores other keys and escapes cells a spreadsheet would run as formulas.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}")
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+    rows = 0
+    for claim in claims:
+        if writer is not None:
+            writer.writerow({name: _csv_cell(claim[name]) for name in CSV_FIELDS if name in claim})
+        else:
+            buffer.write(json.dumps(claim, ensure_ascii=False))
+            buffer.write("\n")
+        rows += 1
+        if rows >= batch_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
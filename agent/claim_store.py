@@ -0,0 +1,465 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Claim persistence: a columnar binary snapshot plus an append-only tail log.
+
+Snapshot (claims.snapshot), little-endian:
+  header     magic b"XCLM", version u16, column count u16, record count u32,
+             then the id of the tail log it was written from and the log
+             position up to which it holds that log's claims, u64 each
+  directory  per column: name length u16, name (UTF-8), then the position of
+             its kinds section, the position of its text and the text
+             length, u64 each
+  kinds      one byte per record: 0 missing, 1 string, 2 JSON-encoded value
+  text       the column's values joined by NUL, UTF-8; strings containing NUL
+             are stored JSON-encoded, where NUL is escaped
+
+Opening a store maps the snapshot and reads only the header and directory,
+then replays the tail log, so it takes about the same time for any number of
+claims. Columns are decoded the first time the claims are read, with one
+UTF-8 decode and one split per column.
+
+Tail log (claims.log): magic b"XCLG" and the log id, u64, then one frame per
+added claim, length u32, CRC-32 u32 and compact JSON. A torn last frame, e.g.
+from a crash mid-write, is cut off on replay. Once the log holds
+compact_after claims it is folded into a new snapshot, written to a temporary
+file and renamed over the old one; a new, empty log with the next id is then
+renamed over the old log. Until that second rename the snapshot's log id and
+position tell replay to skip the claims it already holds, so a crash between
+the two renames does not duplicate them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME = "claims.snapshot"
+LOG_NAME = "claims.log"
+
+_MAGIC = b"XCLM"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHIQQ")
+_NAME_LENGTH = struct.Struct("<H")
+_COLUMN = struct.Struct("<QQQ")
+_FRAME = struct.Struct("<II")
+_LOG_MAGIC = b"XCLG"
+_LOG_HEADER = struct.Struct("<4sQ")
+_MISSING, _STRING, _JSON = 0, 1, 2
+_SEPARATOR = "\x00"
+_DEFAULT_COMPACT_AFTER = 1000
+
+
+class _Column:
+    __slots__ = ("name", "kinds_pos", "text_pos", "text_length")
+
+    def __init__(self, name: str, kinds_pos: int, text_pos: int, text_length: int):
+        self.name = name
+        self.kinds_pos = kinds_pos
+        self.text_pos = text_pos
+        self.text_length = text_length
+
+
+class _Snapshot:
+    """A mapped snapshot file whose records are decoded on demand."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self._map = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+        header = _HEADER.unpack_from(self._map, 0)
+        magic, version, column_count, self.count, self.log_id, self.log_offset = header
+        if magic != _MAGIC or version != _VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {_VERSION} claim snapshot")
+        position = _HEADER.size
+        self.columns = []
+        for _ in range(column_count):
+            (length,) = _NAME_LENGTH.unpack_from(self._map, position)
+            position += _NAME_LENGTH.size
+            name = self._map[position : position + length].decode("utf-8")
+            position += length
+            self.columns.append(_Column(name, *_COLUMN.unpack_from(self._map, position)))
+            position += _COLUMN.size
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _values(self, column: _Column) -> list[Any]:
+        count = self.count
+        if not count:
+            return []
+        text = self._map[column.text_pos : column.text_pos + column.text_length].decode("utf-8")
+        values: list[Any] = text.split(_SEPARATOR)
+        kinds = self._map[column.kinds_pos : column.kinds_pos + count]
+        if kinds.count(_STRING) != count:
+            for index, kind in enumerate(kinds):
+                if kind == _MISSING:
+                    values[index] = _MISSING_VALUE
+                elif kind == _JSON:
+                    values[index] = json.loads(values[index])
+        return values
+
+    def _iter_values(self, column: _Column, block_size: int) -> Iterator[Any]:
+        """Decodes one column block by block; NUL never occurs inside UTF-8 text."""
+        kinds = iter(self._map[column.kinds_pos : column.kinds_pos + self.count])
+        position, end = column.text_pos, column.text_pos + column.text_length
+        pending = b""
+        while position < end:
+            block = self._map[position : min(position + block_size, end)]
+            position += len(block)
+            parts = (pending + block).split(b"\x00")
+            pending = parts.pop()
+            for part in parts:
+                yield _decode_value(next(kinds), part)
+        yield _decode_value(next(kinds), pending)
+
+    def iter_records(self, block_size: int = 1 << 16) -> Iterator[dict[str, Any]]:
+        """Yields the records in order, holding about block_size bytes per column."""
+        if not self.count:
+            return
+        names = [column.name for column in self.columns]
+        if not names:
+            yield from ({} for _ in range(self.count))
+            return
+        columns = [self._iter_values(column, block_size) for column in self.columns]
+        for row in zip(*columns):
+            yield {name: value for name, value in zip(names, row) if value is not _MISSING_VALUE}
+
+    def records(self) -> list[dict[str, Any]]:
+        if not self.columns:
+            return [{} for _ in range(self.count)]
+        names = [column.name for column in self.columns]
+        columns = [self._values(column) for column in self.columns]
+        if not any(_MISSING_VALUE in values for values in columns):
+            return [dict(zip(names, row)) for row in zip(*columns)]
+        return [
+            {name: value for name, value in zip(names, row) if value is not _MISSING_VALUE}
+            for row in zip(*columns)
+        ]
+
+
+_MISSING_VALUE = object()
+
+
+def _decode_value(kind: int, data: bytes) -> Any:
+    if kind == _STRING:
+        return data.decode("utf-8")
+    if kind == _JSON:
+        return json.loads(data)
+    return _MISSING_VALUE
+
+
+def write_snapshot(path: Path, records: list[dict[str, Any]], log_id: int = 0, log_offset: int = 0) -> None:
+    """Writes records as a snapshot, atomically replacing path.
+
+    log_id and log_offset name the tail log position the records include.
+    """
+    names = list(dict.fromkeys(key for record in records for key in record))
+    sections = []
+    for name in names:
+        kinds = bytearray(len(records))
+        parts = []
+        for index, record in enumerate(records):
+            if name not in record:
+                value = ""
+            else:
+                value = record[name]
+                if isinstance(value, str) and _SEPARATOR not in value:
+                    kinds[index] = _STRING
+                else:
+                    kinds[index] = _JSON
+                    value = json.dumps(value, ensure_ascii=False)
+            parts.append(value)
+        sections.append((name.encode("utf-8"), bytes(kinds), _SEPARATOR.join(parts).encode("utf-8")))
+
+    position = _HEADER.size + sum(_NAME_LENGTH.size + len(name) + _COLUMN.size for name, *_ in sections)
+    directory = []
+    for name, kinds, text in sections:
+        kinds_pos = position
+        text_pos = kinds_pos + len(kinds)
+        position = text_pos + len(text)
+        directory.append(_NAME_LENGTH.pack(len(name)) + name + _COLUMN.pack(kinds_pos, text_pos, len(text)))
+
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(sections), len(records), log_id, log_offset))
+        file.writelines(directory)
+        for _, kinds, text in sections:
+            file.write(kinds)
+            file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def write_log(path: Path, log_id: int) -> None:
+    """Starts an empty tail log, atomically replacing path."""
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        file.write(_LOG_HEADER.pack(_LOG_MAGIC, log_id))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def _read_log_id(path: Path) -> int | None:
+    """The id of the tail log at path, or None if there is none yet."""
+    try:
+        with open(path, "rb") as file:
+            header = file.read(_LOG_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < _LOG_HEADER.size:
+        return None
+    magic, log_id = _LOG_HEADER.unpack(header)
+    if magic != _LOG_MAGIC:
+        raise ValueError(f"{path} is not a claim log")
+    return log_id
+
+
+def _frame(record: dict[str, Any]) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(data: bytes) -> tuple[list[dict[str, Any]], int]:
+    """Decodes complete frames; returns the records and the end of the last one."""
+    records = []
+    position = 0
+    while position + _FRAME.size <= len(data):
+        length, checksum = _FRAME.unpack_from(data, position)
+        end = position + _FRAME.size + length
+        payload = data[position + _FRAME.size : end]
+        if end > len(data) or zlib.crc32(payload) != checksum:
+            break
+        records.append(json.loads(payload))
+        position = end
+    return records, position
+
+
+def _signature(path: Path) -> tuple[int, int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class ClaimStore:
+    """Claims of one data directory, kept in memory between calls.
+
+    Only one process may write a data directory: the files are not locked,
+    and replay cuts off an incomplete last frame as torn. Every access checks
+    the files, so a snapshot or log replaced on disk (e.g. restored from a
+    backup) is picked up. generation changes whenever the claims are replaced
+    rather than appended to, so views built from claims() can tell whether
+    extending them is enough.
+    """
+
+    def __init__(self, directory: Path, legacy_json: Path | None = None, compact_after: int | None = None):
+        if compact_after is None:
+            compact_after = int(os.getenv("CLAIMS_LOG_COMPACT_AFTER", _DEFAULT_COMPACT_AFTER))
+        self.directory = directory
+        self.snapshot_path = directory / SNAPSHOT_NAME
+        self.log_path = directory / LOG_NAME
+        self._legacy_json = legacy_json
+        self._compact_after = compact_after
+        self._lock = threading.RLock()
+        self._snapshot: _Snapshot | None = None
+        self._snapshot_signature: tuple[int, int, int] | None = None
+        self._snapshot_records: list[dict[str, Any]] | None = None
+        self._tail: list[dict[str, Any]] = []
+        self._log_id = 0
+        self._log_inode = 0
+        self._log_offset = 0
+        self.generation = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return (self._snapshot.count if self._snapshot else 0) + len(self._tail)
+
+    def claims(self) -> list[dict[str, Any]]:
+        """All claims in insertion order, as a new list of the stored dicts."""
+        with self._lock:
+            self._refresh()
+            if self._snapshot_records is None:
+                self._snapshot_records = self._snapshot.records() if self._snapshot else []
+            return self._snapshot_records + self._tail
+
+    def claims_since(self, generation: int, start: int) -> tuple[int, list[dict[str, Any]]]:
+        """Returns the current generation and the claims added after the first start.
+
+        If the claims were replaced since generation, all claims are returned.
+        Only the requested claims are copied, and the snapshot is not decoded
+        when they all come from the tail log.
+        """
+        with self._lock:
+            self._refresh()
+            if generation != self.generation:
+                start = 0
+            snapshot_count = self._snapshot.count if self._snapshot else 0
+            if start >= snapshot_count:
+                return self.generation, self._tail[start - snapshot_count :]
+            return self.generation, self.claims()[start:]
+
+    def iter_claims(self) -> Iterator[dict[str, Any]]:
+        """Yields all claims in insertion order without decoding them all at once.
+
+        Nothing is read until the first claim is requested. The claims are
+        those present at that point; the iterator reads its own mapping of the
+        snapshot, closed when it is exhausted or closed, so later writes do
+        not affect it.
+        """
+        with self._lock:
+            self._refresh()
+            tail = list(self._tail)
+            head = self._snapshot_records
+            snapshot = _Snapshot(self.snapshot_path) if head is None else None
+        try:
+            yield from head if snapshot is None else snapshot.iter_records()
+            yield from tail
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+
+    def append(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._refresh()
+            frame = _frame(record)
+            with open(self.log_path, "ab") as log:
+                log.write(frame)
+            self._tail.append(record)
+            self._log_offset += len(frame)
+            if len(self._tail) >= self._compact_after:
+                self.compact()
+
+    def replace(self, records: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self._write(records)
+            self.generation += 1
+
+    def compact(self) -> None:
+        """Folds the tail log into a new snapshot."""
+        with self._lock:
+            self._write(self.claims())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot.close()
+            self._snapshot = None
+            self._snapshot_signature = None
+            self._snapshot_records = None
+            self._tail = []
+            self._log_id = 0
+            self._log_inode = 0
+            self._log_offset = 0
+
+    def _refresh(self) -> None:
+        signature = _signature(self.snapshot_path)
+        if signature is None:
+            self._create()
+            return
+        if signature != self._snapshot_signature:
+            self._reopen()
+            self.generation += 1
+            return
+        try:
+            log = self.log_path.stat()
+        except FileNotFoundError:
+            log = None
+        if log is None or log.st_ino != self._log_inode or log.st_size < self._log_offset:
+            self._reopen()
+            self.generation += 1
+        elif log.st_size > self._log_offset:
+            self._replay()
+
+    def _create(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        records: list[dict[str, Any]] = []
+        if self._legacy_json is not None and self._legacy_json.exists():
+            records = json.loads(self._legacy_json.read_text(encoding="utf-8"))
+            logger.info(
+                "Migrated %d claims from %s to %s; the JSON file is no longer read.",
+                len(records),
+                self._legacy_json.name,
+                SNAPSHOT_NAME,
+            )
+        # Claims appended after a snapshot that has since gone are kept.
+        log_id = _read_log_id(self.log_path)
+        if log_id is not None:
+            data = self.log_path.read_bytes()[_LOG_HEADER.size :]
+            logged, end = _read_frames(data)
+            if logged:
+                logger.warning("Rebuilding %s with %d claims from %s.", SNAPSHOT_NAME, len(logged), LOG_NAME)
+            records = [*records, *logged]
+            self._log_id, self._log_offset = log_id, _LOG_HEADER.size + end
+        self.replace(records)
+
+    def _write(self, records: list[dict[str, Any]]) -> None:
+        records = list(records)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # The snapshot supersedes the current log up to its end; the log is
+        # only replaced once the snapshot is in place.
+        write_snapshot(self.snapshot_path, records, self._log_id, self._log_offset)
+        write_log(self.log_path, self._log_id + 1)
+        self._reopen()
+        # The snapshot holds exactly these records; keep them decoded.
+        self._snapshot_records = records
+
+    def _reopen(self) -> None:
+        self.close()
+        self._snapshot_signature = _signature(self.snapshot_path)
+        self._snapshot = _Snapshot(self.snapshot_path)
+        log_id = _read_log_id(self.log_path)
+        if log_id is None:
+            log_id = self._snapshot.log_id + 1
+            write_log(self.log_path, log_id)
+        self._log_id = log_id
+        self._log_inode = self.log_path.stat().st_ino
+        if log_id == self._snapshot.log_id:
+            # Written before the log was replaced: skip what the snapshot holds.
+            self._log_offset = max(self._snapshot.log_offset, _LOG_HEADER.size)
+        else:
+            self._log_offset = _LOG_HEADER.size
+        self._replay()
+
+    def _replay(self) -> None:
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, "rb") as log:
+            log.seek(self._log_offset)
+            data = log.read()
+        records, end = _read_frames(data)
+        self._tail.extend(records)
+        self._log_offset += end
+        if end < len(data):
+            logger.warning(
+                "Dropping %d bytes of incomplete claim log at offset %d.",
+                len(data) - end,
+                self._log_offset,
+            )
+            with open(self.log_path, "r+b") as log:
+                log.truncate(self._log_offset)
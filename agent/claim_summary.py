@@ -0,0 +1,124 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Expense totals maintained as claims are added.
+
+A summary keeps one cell per (user, month, category, currency) with the
+claim count and the amount in hundredths. Adding a claim updates one cell;
+queries add up cells, so their cost depends on the number of distinct
+groups, not on the number of claims.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from claim_table import parse_amount, parse_date
+
+GROUP_KEYS = ("user", "month", "category", "currency")
+# Claims submitted without an authenticated user.
+ANONYMOUS = ""
+
+
+def claim_cell(claim: dict[str, Any]) -> tuple[str, str, str, str]:
+    parsed = parse_date(str(claim.get("date", "")))
+    return (
+        str(claim.get("submittedBy", ANONYMOUS)),
+        f"{parsed.year}-{parsed.month:02d}" if parsed else "",
+        str(claim.get("category", "")).strip(),
+        str(claim.get("currency", "")).strip().upper(),
+    )
+
+
+class ClaimSummary:
+    """Totals by user, month ("YYYY-MM", "" if unknown), category and currency."""
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self.claims = 0
+        # Claims whose amount could not be parsed; they are not in any cell.
+        self.unparsed = 0
+        self._cells: dict[tuple[str, str, str, str], list[int]] = {}
+
+    def __len__(self) -> int:
+        return self.claims
+
+    def add(self, claim: dict[str, Any]) -> None:
+        self.claims += 1
+        amount = parse_amount(str(claim.get("amount", "")))
+        if amount is None:
+            self.unparsed += 1
+            return
+        cell = self._cells.get(key := claim_cell(claim))
+        if cell is None:
+            self._cells[key] = [1, amount]
+        else:
+            cell[0] += 1
+            cell[1] += amount
+
+    def extend(self, claims: Iterable[dict[str, Any]]) -> None:
+        for claim in claims:
+            self.add(claim)
+
+    def totals(
+        self,
+        by: Iterable[str] = ("currency",),
+        user: str | None = None,
+        start_month: str | None = None,
+        end_month: str | None = None,
+        category: str | None = None,
+        currency: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Adds up the cells matching the filters, grouped by the given keys.
+
+        Args:
+            by: Keys out of GROUP_KEYS to group by. "currency" is always
+                added last, since amounts in different currencies are never
+                added together.
+            user: Only claims submitted by this user; None for everyone.
+            start_month: First month ("YYYY-MM") to include. Claims with an
+                unknown month are excluded when a month bound is given.
+            end_month: Last month to include.
+            category: Only claims in this category.
+            currency: Only claims in this currency.
+
+        Returns:
+            One row per group with the key values, "count" and "amount" in
+            hundredths, sorted by the key values.
+        """
+        keys = list(dict.fromkeys([*by, "currency"]))
+        for key in keys:
+            if key not in GROUP_KEYS:
+                raise ValueError(f"Cannot group claims by {key!r}")
+        positions = [GROUP_KEYS.index(key) for key in keys]
+        groups: dict[tuple[str, ...], list[int]] = {}
+        for cell, (count, amount) in self._cells.items():
+            cell_user, month, cell_category, cell_currency = cell
+            if user is not None and cell_user != user:
+                continue
+            if start_month is not None and not (month and month >= start_month):
+                continue
+            if end_month is not None and not (month and month <= end_month):
+                continue
+            if category is not None and cell_category != category:
+                continue
+            if currency is not None and cell_currency != currency:
+                continue
+            group = groups.setdefault(tuple(cell[position] for position in positions), [0, 0])
+            group[0] += count
+            group[1] += amount
+        return [
+            {**dict(zip(keys, group)), "count": count, "amount": amount}
+            for group, (count, amount) in sorted(groups.items())
+        ]
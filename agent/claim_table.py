@@ -0,0 +1,383 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar copy of the claims for aggregations.
+
+Claims store amounts and dates as the strings the user confirmed. The table
+parses them once per claim into NumPy columns:
+
+  amount    int64 in hundredths (AMOUNT_SCALE), exact for decimal amounts
+  date      int32 proleptic Gregorian ordinal, 0 when the date is unreadable
+  month     int32 year * 12 + month - 1, -1 when the date is unreadable
+  currency  int32 code into the table's `currencies` string table
+  category  int32 code into the table's `categories` string table
+  user      int32 code into the table's `users` string table (submittedBy)
+
+Claims whose amount cannot be parsed are kept with amount 0 and
+amount_valid False, so row positions always match the claim list.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from fx import RateTable
+
+AMOUNT_SCALE = 100
+_QUANTUM = Decimal(1) / AMOUNT_SCALE
+# Keeps sums of up to a million amounts within int64.
+_MAX_AMOUNT = Decimal(2**63 // 1_000_000 // AMOUNT_SCALE)
+_PLAIN_AMOUNT_RE = re.compile(r"-?(\d+)(?:\.(\d{1,2}))?")
+_MAX_PLAIN_DIGITS = len(str(_MAX_AMOUNT)) - 1
+_DATE_RE = re.compile(r"\s*(\d{4})[/\-.年]\s*(\d{1,2})[/\-.月]\s*(\d{1,2})")
+_MONTH_RE = re.compile(r"\s*(\d{4})-(\d{1,2})\s*")
+_INITIAL_CAPACITY = 1024
+# Above this many dense group slots, group codes are compacted with np.unique.
+_MAX_DENSE_GROUPS = 1 << 20
+_GROUP_KEYS = ("currency", "category", "month", "user")
+
+
+def parse_amount(text: str) -> int | None:
+    """Parses an amount such as "1,234.5" into hundredths, or None."""
+    text = text.replace(",", "").strip()
+    match = _PLAIN_AMOUNT_RE.fullmatch(text)
+    if match and len(match.group(1)) <= _MAX_PLAIN_DIGITS:
+        units, fraction = match.groups()
+        scaled = int(units) * AMOUNT_SCALE + int((fraction or "").ljust(2, "0"))
+        return -scaled if text.startswith("-") else scaled
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not value.is_finite() or abs(value) >= _MAX_AMOUNT:
+        return None
+    return int(value.quantize(_QUANTUM, rounding=ROUND_HALF_EVEN) * AMOUNT_SCALE)
+
+
+def format_amount(scaled: int) -> str:
+    """Formats hundredths as a plain decimal string, e.g. 123456 -> "1234.56"."""
+    return str((Decimal(int(scaled)) / AMOUNT_SCALE).quantize(_QUANTUM))
+
+
+def parse_date(text: str) -> date | None:
+    """Parses YYYY/MM/DD, YYYY-MM-DD, YYYY.M.D or YYYY年M月D日."""
+    match = _DATE_RE.match(text)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+def _parse_month(text: str) -> tuple[int, int]:
+    match = _MONTH_RE.fullmatch(text)
+    if match is None or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"{text!r} is not a month (YYYY-MM)")
+    return int(match.group(1)), int(match.group(2))
+
+
+def month_range(start_month: str | None, end_month: str | None) -> tuple[date | None, date | None]:
+    """First day of start_month and last day of end_month ("YYYY-MM").
+
+    Raises:
+        ValueError: If a month is given but is not "YYYY-MM".
+    """
+    start = end = None
+    if start_month:
+        year, month = _parse_month(start_month)
+        start = date(year, month, 1)
+    if end_month:
+        year, month = _parse_month(end_month)
+        end = date.fromordinal(date(year + month // 12, month % 12 + 1, 1).toordinal() - 1)
+    return start, end
+
+
+def month_code(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+def month_label(code: int) -> str:
+    year, month = divmod(int(code), 12)
+    return f"{year}-{month + 1:02d}"
+
+
+class StringTable:
+    """Interns strings to dense int codes."""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def intern(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> int | None:
+        return self._codes.get(value)
+
+
+class ClaimTable:
+    """Claims as parallel NumPy columns; rows are appended, never changed."""
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self.currencies = StringTable()
+        self.categories = StringTable()
+        self.users = StringTable()
+        # Claims share few distinct dates; parse each once.
+        self._dates: dict[str, tuple[int, int]] = {}
+        # Per-row conversion factors of the last (rates, target) pair.
+        self._factors: dict[tuple[int, str], tuple[np.ndarray, int, RateTable]] = {}
+        self._size = 0
+        self._amount = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._amount_valid = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._date = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._month = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._currency = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._category = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._user = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+
+    @classmethod
+    def from_claims(cls, claims: Iterable[dict[str, Any]], generation: int = 0) -> ClaimTable:
+        table = cls(generation)
+        table.extend(claims)
+        return table
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self._amount[: self._size]
+
+    @property
+    def amount_valid(self) -> np.ndarray:
+        return self._amount_valid[: self._size]
+
+    @property
+    def date(self) -> np.ndarray:
+        return self._date[: self._size]
+
+    @property
+    def month(self) -> np.ndarray:
+        return self._month[: self._size]
+
+    @property
+    def currency(self) -> np.ndarray:
+        return self._currency[: self._size]
+
+    @property
+    def category(self) -> np.ndarray:
+        return self._category[: self._size]
+
+    @property
+    def user(self) -> np.ndarray:
+        return self._user[: self._size]
+
+    def append(self, claim: dict[str, Any]) -> None:
+        self.extend((claim,))
+
+    def extend(self, claims: Iterable[dict[str, Any]]) -> None:
+        rows = [self._parse(claim) for claim in claims]
+        if not rows:
+            return
+        self._reserve(self._size + len(rows))
+        start, end = self._size, self._size + len(rows)
+        amount, valid, ordinal, month, currency, category, user = zip(*rows)
+        self._amount[start:end] = amount
+        self._amount_valid[start:end] = valid
+        self._date[start:end] = ordinal
+        self._month[start:end] = month
+        self._currency[start:end] = currency
+        self._category[start:end] = category
+        self._user[start:end] = user
+        self._size = end
+
+    def select(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        currency: str | None = None,
+        category: str | None = None,
+        user: str | None = None,
+    ) -> np.ndarray:
+        """Boolean mask of rows with a parsed amount matching every filter.
+
+        start and end are inclusive; rows without a readable date are excluded
+        when either is given.
+        """
+        mask = self.amount_valid.copy()
+        if start is not None:
+            mask &= self.date >= start.toordinal()
+        if end is not None:
+            mask &= (self.date <= end.toordinal()) & (self.date > 0)
+        if currency is not None:
+            code = self.currencies.code(currency)
+            mask &= self.currency == (-1 if code is None else code)
+        if category is not None:
+            code = self.categories.code(category)
+            mask &= self.category == (-1 if code is None else code)
+        if user is not None:
+            code = self.users.code(user)
+            mask &= self.user == (-1 if code is None else code)
+        return mask
+
+    def totals(
+        self, by: Iterable[str] = ("currency",), mask: np.ndarray | None = None
+    ) -> list[dict[str, Any]]:
+        """Sums amounts per group of the given keys.
+
+        Amounts in different currencies are never added together, so
+        "currency" is always part of the grouping, after the given keys. Each
+        row has the key values (months as "YYYY-MM"), "count" and "amount" in
+        hundredths; rows are sorted by the key values in that order.
+        """
+        keys = list(dict.fromkeys([*by, "currency"]))
+        for key in keys:
+            if key not in _GROUP_KEYS:
+                raise ValueError(f"Cannot group claims by {key!r}")
+        selected = self.amount_valid if mask is None else mask
+        return self._group(keys, selected, self.amount)
+
+    def converted(self, rates: RateTable, target: str) -> tuple[np.ndarray, np.ndarray]:
+        """Amounts converted to hundredths of target at each claim's date.
+
+        Returns the amounts and a mask of the rows that could be converted:
+        rows with a parsed amount, a readable date and known rates for both
+        currencies on that date. Other rows have amount 0. The per-row factors
+        are cached for rates and target and only computed for new rows.
+        """
+        key = (id(rates), target.upper())
+        factors, done, _ = self._factors.get(key, (np.empty(0), 0, rates))
+        if done < self._size:
+            rows = slice(done, self._size)
+            source = rates.rates_for(self.currencies.values, self.currency[rows], self.date[rows])
+            target_codes = np.zeros(self._size - done, dtype=np.int32)
+            target_rates = rates.rates_for([key[1]], target_codes, self.date[rows])
+            factors = np.concatenate([factors, source / target_rates])
+            # Holding rates keeps its id() from being reused by another table.
+            self._factors = {key: (factors, self._size, rates)}
+        convertible = self.amount_valid & ~np.isnan(factors)
+        amounts = np.zeros(self._size, dtype=np.int64)
+        amounts[convertible] = np.rint(self.amount[convertible] * factors[convertible])
+        return amounts, convertible
+
+    def converted_totals(
+        self, rates: RateTable, target: str, by: Iterable[str] = (), mask: np.ndarray | None = None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Sums amounts converted to target per group of the given keys.
+
+        Returns rows like totals() with "currency" set to target, and the
+        number of selected rows that could not be converted and are left out.
+        """
+        keys = list(dict.fromkeys(by))
+        for key in keys:
+            if key not in _GROUP_KEYS or key == "currency":
+                raise ValueError(f"Cannot group converted claims by {key!r}")
+        selected = self.amount_valid if mask is None else mask
+        amounts, convertible = self.converted(rates, target)
+        skipped = int(np.count_nonzero(selected & ~convertible))
+        rows = self._group(keys, selected & convertible, amounts)
+        for row in rows:
+            row["currency"] = target.upper()
+        return rows, skipped
+
+    def _group(self, keys: list[str], selected: np.ndarray, values: np.ndarray) -> list[dict[str, Any]]:
+        if "month" in keys:
+            selected = selected & (self.month >= 0)
+        columns = {key: getattr(self, key)[selected].astype(np.int64) for key in keys}
+        amounts = values[selected]
+        if not len(amounts):
+            return []
+
+        offsets = {key: int(column.min()) for key, column in columns.items()}
+        sizes = {key: int(column.max()) - offsets[key] + 1 for key, column in columns.items()}
+        group = np.zeros(len(amounts), dtype=np.int64)
+        for key in keys:
+            group = group * sizes[key] + (columns[key] - offsets[key])
+        dense = 1
+        for size in sizes.values():
+            dense *= size
+        if dense <= _MAX_DENSE_GROUPS:
+            counts = np.bincount(group, minlength=dense)
+            groups = np.flatnonzero(counts)
+            sums = np.zeros(dense, dtype=np.int64)
+            np.add.at(sums, group, amounts)
+            sums, counts = sums[groups], counts[groups]
+        else:
+            groups, inverse, counts = np.unique(group, return_inverse=True, return_counts=True)
+            sums = np.zeros(len(groups), dtype=np.int64)
+            np.add.at(sums, inverse, amounts)
+
+        labels = {
+            "currency": lambda code: self.currencies.values[code],
+            "category": lambda code: self.categories.values[code],
+            "user": lambda code: self.users.values[code],
+            "month": month_label,
+        }
+        rows = []
+        for group_code, count, total in zip(groups.tolist(), counts.tolist(), sums.tolist()):
+            row: dict[str, Any] = {}
+            for key in reversed(keys):
+                group_code, code = divmod(group_code, sizes[key])
+                row[key] = labels[key](code + offsets[key])
+            rows.append({**{key: row[key] for key in keys}, "count": count, "amount": total})
+        rows.sort(key=lambda row: tuple(row[key] for key in keys))
+        return rows
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._amount)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_amount", "_amount_valid", "_date", "_month", "_currency", "_category", "_user"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            setattr(self, name, grown)
+
+    def _parse_date(self, text: str) -> tuple[int, int]:
+        cached = self._dates.get(text)
+        if cached is None:
+            parsed = parse_date(text)
+            cached = (parsed.toordinal(), month_code(parsed.year, parsed.month)) if parsed else (0, -1)
+            self._dates[text] = cached
+        return cached
+
+    def _parse(self, claim: dict[str, Any]) -> tuple[int, bool, int, int, int, int, int]:
+        amount = parse_amount(str(claim.get("amount", "")))
+        ordinal, month = self._parse_date(str(claim.get("date", "")))
+        return (
+            0 if amount is None else amount,
+            amount is not None,
+            ordinal,
+            month,
+            self.currencies.intern(str(claim.get("currency", "")).strip().upper()),
+            self.categories.intern(str(claim.get("category", "")).strip()),
+            self.users.intern(str(claim.get("submittedBy", ""))),
+        )
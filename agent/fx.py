@@ -0,0 +1,170 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline currency conversion from a local, date-indexed rate file.
+
+Conversion is off unless FX_RATES_PATH names a CSV with the columns date
+(YYYY-MM-DD), currency and rate: units of FX_BASE_CURRENCY (default JPY) per
+unit of currency. A rate applies from its date until the next row for the
+same currency, for at most FX_RATE_MAX_AGE_DAYS days (default 45); dates
+before a currency's first row or past that age have no rate, and the base
+currency always converts at 1. data/fx_rates.sample.csv shows the format.
+
+Per currency the table keeps sorted date ordinals and rates as NumPy arrays,
+so a rate is a binary search. rate() caches its answer per (date, currency);
+rates_for() looks up a whole column of claims at once.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from claim_table import parse_date
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_DAYS = 45
+
+
+class RateTable:
+    """Rates of each currency against a base currency, by date."""
+
+    def __init__(
+        self, base: str, rows: Sequence[tuple[date, str, float]] = (), max_age_days: int | None = None
+    ):
+        self.base = base.upper()
+        # Rates older than this many days on the looked-up date are unknown.
+        self.max_age_days = max_age_days
+        by_currency: dict[str, dict[int, float]] = {}
+        for day, currency, rate in rows:
+            if rate <= 0:
+                raise ValueError(f"FX rate for {currency} on {day} must be positive")
+            by_currency.setdefault(currency.upper(), {})[day.toordinal()] = rate
+        self._dates: dict[str, np.ndarray] = {}
+        self._rates: dict[str, np.ndarray] = {}
+        for currency, rates in by_currency.items():
+            ordinals = sorted(rates)
+            self._dates[currency] = np.array(ordinals, dtype=np.int32)
+            self._rates[currency] = np.array([rates[ordinal] for ordinal in ordinals], dtype=np.float64)
+        self._cache: dict[tuple[int, str], float | None] = {}
+
+    @classmethod
+    def load(cls, path: Path, base: str, max_age_days: int | None = None) -> RateTable:
+        rows = []
+        with open(path, newline="", encoding="utf-8") as file:
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                day = parse_date(row.get("date") or "")
+                if day is None:
+                    raise ValueError(f"{path}:{line}: unreadable date {row.get('date')!r}")
+                rows.append((day, (row.get("currency") or "").strip(), float(row["rate"])))
+        return cls(base, rows, max_age_days)
+
+    @property
+    def currencies(self) -> list[str]:
+        return [self.base, *(currency for currency in self._dates if currency != self.base)]
+
+    def rate(self, currency: str, on: date) -> float | None:
+        """Units of the base currency per unit of currency on a date."""
+        key = (on.toordinal(), currency)
+        if key not in self._cache:
+            self._cache[key] = self._lookup(currency.upper(), key[0])
+        return self._cache[key]
+
+    def convert(self, amount: float, currency: str, target: str, on: date) -> float | None:
+        """Converts one amount, or returns None when either rate is unknown."""
+        source_rate = self.rate(currency, on)
+        target_rate = self.rate(target, on)
+        if source_rate is None or target_rate is None:
+            return None
+        return amount * source_rate / target_rate
+
+    def rates_for(self, currencies: Sequence[str], codes: np.ndarray, ordinals: np.ndarray) -> np.ndarray:
+        """Base-currency rates for many rows at once, NaN where unknown.
+
+        Args:
+            currencies: Currency of each code, e.g. a StringTable's values.
+            codes: Currency code of each row.
+            ordinals: Date ordinal of each row; 0 means unknown.
+        """
+        result = np.full(len(codes), np.nan)
+        for code, currency in enumerate(currencies):
+            rows = np.flatnonzero(codes == code)
+            if not len(rows):
+                continue
+            currency = currency.upper()
+            if currency == self.base:
+                result[rows] = 1.0
+                continue
+            dates = self._dates.get(currency)
+            if dates is None:
+                continue
+            positions = np.searchsorted(dates, ordinals[rows], side="right") - 1
+            known = positions >= 0
+            if self.max_age_days is not None:
+                known &= ordinals[rows] - dates[np.maximum(positions, 0)] <= self.max_age_days
+            result[rows[known]] = self._rates[currency][positions[known]]
+        result[ordinals <= 0] = np.nan
+        return result
+
+    def _lookup(self, currency: str, ordinal: int) -> float | None:
+        if currency == self.base:
+            return 1.0
+        dates = self._dates.get(currency)
+        if dates is None:
+            return None
+        position = int(np.searchsorted(dates, ordinal, side="right")) - 1
+        if position < 0:
+            return None
+        if self.max_age_days is not None and ordinal - int(dates[position]) > self.max_age_days:
+            return None
+        return float(self._rates[currency][position])
+
+
+_table: RateTable | None = None
+_table_signature: tuple[Path, str, int | None, int] | None = None
+_table_lock = threading.Lock()
+
+
+def rate_table() -> RateTable | None:
+    """The rate table from FX_RATES_PATH, reloaded when the file changes.
+
+    Returns None when FX_RATES_PATH is unset or names no file.
+    """
+    global _table, _table_signature
+    if not os.getenv("FX_RATES_PATH"):
+        return None
+    path = Path(os.environ["FX_RATES_PATH"])
+    base = os.getenv("FX_BASE_CURRENCY", "JPY").upper()
+    max_age = os.getenv("FX_RATE_MAX_AGE_DAYS", str(DEFAULT_MAX_AGE_DAYS))
+    # An empty or non-positive age means rates never expire.
+    max_age_days = int(max_age) if max_age and int(max_age) > 0 else None
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _table_lock:
+        signature = (path, base, max_age_days, mtime)
+        if signature != _table_signature:
+            _table = RateTable.load(path, base, max_age_days)
+            _table_signature = signature
+            logger.info("Loaded FX rates for %s from %s", ", ".join(_table.currencies), path)
+        return _table
@@ -0,0 +1,66 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Root logging setup for the server, driven by environment variables.
+
+LOG_LEVEL            root level (default INFO)
+LOG_FORMAT           "text" (default) or "json", one object per line
+LOG_SAMPLE_RATES     share of records below WARNING kept per logger,
+                     e.g. "a2ui=0.1,agent_executor=0.5"
+LOG_PAYLOAD_LIMITS   characters of logged payloads kept per logger,
+                     e.g. "=300,ui_builder=2000" ("" is the default, 0 = all)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+from a2ui.a2ui_logging import DEFAULT_PAYLOAD_LIMIT, JsonFormatter, LogPolicyFilter
+
+_TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+
+def _parse_settings(value: str, cast: type) -> dict[str, float | int]:
+    settings = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, setting = item.rpartition("=")
+        settings[name.strip()] = cast(setting)
+    return settings
+
+
+def configure_logging() -> bool:
+    """Installs the root handler; returns True in JSON mode.
+
+    In JSON mode uvicorn should be started with log_config=None so its loggers
+    propagate to this handler instead of using their own text handlers.
+    """
+    structured = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    payload_limits = {"": DEFAULT_PAYLOAD_LIMIT}
+    payload_limits.update(_parse_settings(os.getenv("LOG_PAYLOAD_LIMITS", ""), int))
+
+    handler = logging.StreamHandler()
+    handler.addFilter(
+        LogPolicyFilter(
+            sample_rates=_parse_settings(os.getenv("LOG_SAMPLE_RATES", ""), float),
+            payload_limits=payload_limits,
+        )
+    )
+    handler.setFormatter(JsonFormatter() if structured else logging.Formatter(_TEXT_FORMAT))
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(), handlers=[handler], force=True
+    )
+    return structured
@@ -0,0 +1,348 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Recording is a dict lookup, a bisect and a few additions under a lock, cheap
+enough to leave on in production. Rendering only happens when /metrics is
+scraped.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+_DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(
+    labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = ""
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._functions: dict[tuple[str, ...], Callable[[], float]] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels: Any) -> None:
+        """Reads the value from function at scrape time, e.g. a queue length."""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            values[key] = function()
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts, +Inf last, then sum.
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = ([0] * (len(self._buckets) + 1), [0.0])
+                self._values[key] = entry
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+STAGE_SECONDS = histogram(
+    "expense_stage_duration_seconds",
+    "Time spent in each stage of the receipt pipeline.",
+    ("stage",),
+)
+REVIEW_TOTAL = counter(
+    "expense_review_total",
+    "Review surfaces built, by outcome (ai or fallback) and fallback reason.",
+    ("outcome", "reason"),
+)
+MODEL_SECONDS = histogram(
+    "expense_review_model_duration_seconds",
+    "Latency of each review model attempt, including validation and repair.",
+    ("model",),
+)
+MODEL_TOTAL = counter(
+    "expense_review_model_total",
+    "Review model attempts by outcome (ok, repaired, timeout, request_failed, "
+    "invalid_json, unrepairable).",
+    ("model", "outcome"),
+)
+ACTION_SECONDS = histogram(
+    "expense_action_duration_seconds",
+    "ExpenseAgentExecutor action latency.",
+    ("action",),
+)
+ACTION_TOTAL = counter(
+    "expense_action_total",
+    "ExpenseAgentExecutor actions handled, by result.",
+    ("action", "result"),
+)
+ACTIONS_IN_FLIGHT = gauge(
+    "expense_actions_in_flight",
+    "ExpenseAgentExecutor actions currently running.",
+    ("action",),
+)
+HTTP_SECONDS = histogram(
+    "expense_http_request_duration_seconds",
+    "HTTP handler latency.",
+    ("route",),
+)
+HTTP_TOTAL = counter(
+    "expense_http_requests_total",
+    "HTTP requests handled, by route and status code.",
+    ("route", "status"),
+)
+HTTP_IN_FLIGHT = gauge(
+    "expense_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    ("route",),
+)
+QUEUE_DEPTH = gauge(
+    "expense_queue_depth",
+    "Work waiting or running in internal queues.",
+    ("queue",),
+)
+STARTUP_SECONDS = gauge(
+    "expense_startup_seconds",
+    "Time spent in each startup phase: imports and app construction, then each "
+    "warm-up step.",
+    ("phase",),
+)
+FIRST_REQUEST_SECONDS = gauge(
+    "expense_first_request_seconds",
+    "Latency of the first request to each route since the process started.",
+    ("route",),
+)
+
+
+def track_request(
+    route: str,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Records in-flight count, latency and status code of a Starlette handler.
+
+    The latency of the first request is also kept in expense_first_request_seconds,
+    which shows what lazy imports and warm-up cost the first caller. For a
+    streaming response the request ends when its body has been sent, or the
+    stream was abandoned, not when the handler returns.
+    """
+
+    def decorator(handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        first_recorded = False
+
+        def finish(start: float, status: int) -> None:
+            nonlocal first_recorded
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(route=route)
+            HTTP_SECONDS.observe(elapsed, route=route)
+            HTTP_TOTAL.inc(route=route, status=status)
+            if not first_recorded:
+                first_recorded = True
+                FIRST_REQUEST_SECONDS.set(elapsed, route=route)
+
+        async def timed_body(body: AsyncIterator[Any], start: float, status: int) -> AsyncIterator[Any]:
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                finish(start, status)
+
+        @functools.wraps(handler)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            status = 500
+            start = time.perf_counter()
+            HTTP_IN_FLIGHT.inc(route=route)
+            try:
+                response = await handler(*args, **kwargs)
+                status = getattr(response, "status_code", 200)
+            except BaseException:
+                finish(start, status)
+                raise
+            body = getattr(response, "body_iterator", None)
+            if body is None:
+                finish(start, status)
+            else:
+                response.body_iterator = timed_body(body, start, status)
+            return response
+
+        return wrapper
+
+    return decorator
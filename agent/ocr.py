@@ -15,14 +15,41 @@
 from __future__ import annotations
 
 import base64
+import bisect
 import io
+import os
 import re
-from dataclasses import dataclass
-from typing import Iterable
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import TYPE_CHECKING, Any, Iterable
 
-from pdf2image import convert_from_bytes
-from PIL import Image
-import pytesseract
+from tracing import span, stage
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+OCR_MODE_FULL = "full"
+OCR_MODE_REGIONS = "regions"
+
+_LAYOUT_DPI = 100
+_REGION_DPI = 300
+_REGION_PADDING = 8
+# A single text line per crop: "merchant", "date" and "amount" are all one-liners.
+_REGION_TESSERACT_CONFIG = "--psm 7"
+
+
+@dataclass
+class OcrField:
+    """Where a field was read on the receipt and how confident tesseract was.
+
+    bbox is (left, top, width, height) in pixels of the high resolution page.
+    confidence is tesseract's mean word confidence for the crop, 0-100.
+    """
+
+    page: int
+    bbox: tuple[int, int, int, int]
+    confidence: float
 
 
 @dataclass
@@ -33,6 +60,31 @@ class OcrResult:
     date: str
     amount: str
     currency: str
+    fields: dict[str, OcrField] = field(default_factory=dict)
+
+
+def ocr_result_payload(result: OcrResult) -> dict[str, Any]:
+    return {
+        "text": result.text,
+        "merchant": result.merchant,
+        "date": result.date,
+        "amount": result.amount,
+        "currency": result.currency,
+        "fields": {name: asdict(ocr_field) for name, ocr_field in result.fields.items()},
+    }
+
+
+def review_form_data(result: OcrResult) -> dict[str, str]:
+    return {
+        "receiptName": result.receipt_name,
+        "merchant": result.merchant,
+        "date": result.date,
+        "amount": result.amount,
+        "currency": result.currency,
+        "category": "",
+        "paymentMethod": "",
+        "memo": "",
+    }
 
 
 def _strip_data_url(data: str) -> str:
@@ -41,80 +93,429 @@ def _strip_data_url(data: str) -> str:
     return data
 
 
-def _images_from_bytes(file_bytes: bytes, file_type: str) -> Iterable[Image.Image]:
-    if file_type.lower().endswith("pdf"):
-        return convert_from_bytes(file_bytes)
-    image = Image.open(io.BytesIO(file_bytes))
-    return [image]
+def _is_pdf(file_type: str) -> bool:
+    return file_type.lower().endswith("pdf")
+
+
+# PIL, pdf2image and pytesseract are imported on first use: the server starts
+# and serves /entries without loading them.
+
+
+def _open_image(file_bytes: bytes) -> Image.Image:
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        return Image.open(io.BytesIO(file_bytes))
+    except UnidentifiedImageError as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def _rasterize_pdf(file_bytes: bytes, **options: Any) -> list[Image.Image]:
+    from pdf2image import convert_from_bytes
+
+    return convert_from_bytes(file_bytes, **options)
+
+
+def _images_from_bytes(
+    file_bytes: bytes, file_type: str, dpi: int | None = None
+) -> Iterable[Image.Image]:
+    if _is_pdf(file_type):
+        if dpi is None:
+            return _rasterize_pdf(file_bytes)
+        return _rasterize_pdf(file_bytes, dpi=dpi)
+    return [_open_image(file_bytes)]
+
+
+def warm_up() -> None:
+    """Imports the OCR libraries and checks that tesseract can be started."""
+    import pdf2image  # noqa: F401
+    import pytesseract
+    from PIL import Image
+
+    Image.init()
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        pass
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<newline>\n)
+    | (?P<date_jp>
+        (?:(?P<jp_year>20\d{2})|令和\s*(?P<reiwa_year>\d{1,2}|元))\s*年
+        \s*(?P<jp_month>\d{1,2})\s*月\s*(?P<jp_day>\d{1,2})\s*日
+      )
+    | (?P<date_ymd>
+        (?<!\d)(?P<ymd_year>20\d{2})(?P<ymd_sep>[/.\-])(?P<ymd_month>\d{1,2})
+        (?P=ymd_sep)(?P<ymd_day>\d{1,2})(?!\d)
+      )
+    | (?P<date_western>
+        (?<!\d)(?P<western_first>\d{1,2})(?P<western_sep>[/.\-])
+        (?P<western_second>\d{1,2})(?P=western_sep)(?P<western_year>20\d{2})(?!\d)
+      )
+    | (?P<keyword>
+        合計|税込|お会計|ご請求額
+        | (?<![A-Za-z])(?i:(?:grand\s+)?total|amount\s+due)(?![A-Za-z])
+      )
+    | (?P<currency>[¥￥$€円]|(?<![A-Za-z])(?:USD|EUR|JPY)(?![A-Za-z]))
+    | (?P<amount>
+        (?<![\d.,])(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{1,2})?(?![\d,])
+      )
+    | (?P<word>[^\W\d_]+)
+    """,
+    re.VERBOSE,
+)
+# Kana/kanji runs are one word token, so "お買上合計" hides its keyword.
+_JP_KEYWORD_RE = re.compile(r"合計|税込|お会計|ご請求額")
+
+_CURRENCY_CODES = {
+    "$": "USD",
+    "€": "EUR",
+    "¥": "JPY",
+    "￥": "JPY",
+    "円": "JPY",
+    "USD": "USD",
+    "EUR": "EUR",
+    "JPY": "JPY",
+}
+# Same precedence as the original substring checks: USD, then EUR, then JPY.
+_CURRENCY_PRIORITY = ("USD", "EUR", "JPY")
+# Longer digit runs are phone numbers, registration or card numbers, not totals.
+_MAX_AMOUNT_DIGITS = 8
+# A number followed by one of these counts items ("Total 3 items", "合計 5点").
+_COUNT_SUFFIX_RE = re.compile(r"[ \t]*(?:(?i:items?|pcs|qty)(?![A-Za-z])|点|個|品|件)")
+
+
+@dataclass
+class _FieldScan:
+    merchant: str = ""
+    date: str = ""
+    amount: str = ""
+    currency: str = "JPY"
+    # (start, end) offsets into the scanned text for merchant, date and amount.
+    spans: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+
+@dataclass
+class _AmountToken:
+    value: float
+    start: int
+    end: int
+    currency: str = ""
+
+
+def _format_date(year: int, month: int, day: int) -> str:
+    try:
+        parsed = date(year, month, day)
+    except ValueError:
+        return ""
+    return parsed.strftime("%Y/%m/%d")
+
+
+def _date_from_match(match: re.Match[str]) -> str:
+    kind = match.lastgroup
+    if kind == "date_jp":
+        if match.group("jp_year"):
+            year = int(match.group("jp_year"))
+        else:
+            reiwa = match.group("reiwa_year")
+            year = 2018 + (1 if reiwa == "元" else int(reiwa))
+        return _format_date(
+            year, int(match.group("jp_month")), int(match.group("jp_day"))
+        )
+    if kind == "date_ymd":
+        return _format_date(
+            int(match.group("ymd_year")),
+            int(match.group("ymd_month")),
+            int(match.group("ymd_day")),
+        )
+    first = int(match.group("western_first"))
+    second = int(match.group("western_second"))
+    year = int(match.group("western_year"))
+    # US receipts write MM/DD/YYYY; fall back to DD/MM/YYYY when that is impossible.
+    if first > 12:
+        return _format_date(year, second, first)
+    return _format_date(year, first, second)
+
+
+def _parse_amount(raw: str) -> float | None:
+    normalized = raw.replace(",", "")
+    if len(normalized.split(".", 1)[0]) > _MAX_AMOUNT_DIGITS:
+        return None
+    try:
+        return float(normalized)
+    except ValueError:
+        return None
+
+
+def _scan_fields(text: str) -> _FieldScan:
+    """Extracts merchant, date, amount and currency in a single pass over text."""
+    result = _FieldScan()
+    line_no = 0
+    line_start = 0
+    keyword_line: int | None = None
+    last_currency: tuple[str, int] | None = None
+    last_amount: _AmountToken | None = None
+    total_candidates: list[_AmountToken] = []
+    other_candidates: list[_AmountToken] = []
+    seen_currencies: set[str] = set()
+
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "newline":
+            line_no += 1
+            line_start = match.end()
+            if keyword_line is not None and line_no - keyword_line > 1:
+                keyword_line = None
+        elif kind == "word":
+            if _JP_KEYWORD_RE.search(match.group()):
+                keyword_line = line_no
+            elif not result.merchant:
+                line_end = text.find("\n", match.start())
+                if line_end == -1:
+                    line_end = len(text)
+                result.merchant = text[line_start:line_end].strip()
+                result.spans["merchant"] = (line_start, line_end)
+        elif kind == "keyword":
+            keyword_line = line_no
+        elif kind == "currency":
+            code = _CURRENCY_CODES[match.group()]
+            seen_currencies.add(code)
+            last_currency = (code, match.end())
+            # Suffix markers such as "1,200円" or "12.50 USD".
+            if (
+                last_amount is not None
+                and not last_amount.currency
+                and not text[last_amount.end : match.start()].strip()
+            ):
+                last_amount.currency = code
+        elif kind == "amount":
+            value = _parse_amount(match.group())
+            if value is None or _COUNT_SUFFIX_RE.match(text, match.end()):
+                continue
+            token = _AmountToken(value=value, start=match.start(), end=match.end())
+            if last_currency is not None and not text[
+                last_currency[1] : match.start()
+            ].strip():
+                token.currency = last_currency[0]
+            last_amount = token
+            if keyword_line is not None:
+                total_candidates.append(token)
+                keyword_line = None
+            else:
+                other_candidates.append(token)
+        elif not result.date:
+            result.date = _date_from_match(match)
+            if result.date:
+                result.spans["date"] = match.span()
+
+    # Prefer amounts that follow a total keyword, then amounts that carry a
+    # currency marker, and only then any plausible number on the receipt.
+    candidates = (
+        total_candidates
+        or [token for token in other_candidates if token.currency]
+        or other_candidates
+    )
+    best = max(candidates, key=lambda token: token.value, default=None)
+    if best is not None:
+        result.amount = f"{best.value:.2f}"
+        result.spans["amount"] = (best.start, best.end)
+    if best is not None and best.currency:
+        result.currency = best.currency
+    else:
+        result.currency = next(
+            (code for code in _CURRENCY_PRIORITY if code in seen_currencies), "JPY"
+        )
+    return result
 
 
 def _detect_currency(text: str) -> str:
-    if "USD" in text or "$" in text:
-        return "USD"
-    if "EUR" in text or "€" in text:
-        return "EUR"
-    if "¥" in text or "￥" in text:
-        return "JPY"
-    return "JPY"
+    return _scan_fields(text).currency
 
 
 def _extract_date(text: str) -> str:
-    patterns = [
-        r"\b(20\d{2}[/-]\d{1,2}[/-]\d{1,2})\b",
-        r"\b(20\d{2}\.\d{1,2}\.\d{1,2})\b",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return match.group(1).replace(".", "/")
-    return ""
+    return _scan_fields(text).date
 
 
 def _extract_amount(text: str) -> str:
-    matches = re.findall(r"(?:¥|￥|\$|€)?\s?([\d,]+(?:\.\d{1,2})?)", text)
-    amounts = []
-    for raw in matches:
-        normalized = raw.replace(",", "")
-        try:
-            amounts.append(float(normalized))
-        except ValueError:
-            continue
-    if not amounts:
-        return ""
-    return f"{max(amounts):.2f}"
+    return _scan_fields(text).amount
 
 
 def _extract_merchant(text: str) -> str:
-    for line in text.splitlines():
-        cleaned = line.strip()
-        if not cleaned:
-            continue
-        if re.fullmatch(r"[\d\W]+", cleaned):
+    return _scan_fields(text).merchant
+
+
+@dataclass
+class _LayoutLine:
+    page: int
+    text: str
+    bbox: tuple[int, int, int, int]
+
+
+def _layout_lines(image: Image.Image, page: int) -> list[_LayoutLine]:
+    import pytesseract
+
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    words_by_line: dict[tuple[int, int, int], list[int]] = {}
+    for index, word in enumerate(data["text"]):
+        if not word.strip():
             continue
-        return cleaned
-    return ""
+        key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        words_by_line.setdefault(key, []).append(index)
+
+    lines = []
+    for indexes in words_by_line.values():
+        left = min(data["left"][i] for i in indexes)
+        top = min(data["top"][i] for i in indexes)
+        right = max(data["left"][i] + data["width"][i] for i in indexes)
+        bottom = max(data["top"][i] + data["height"][i] for i in indexes)
+        text = " ".join(data["text"][i].strip() for i in indexes)
+        lines.append(
+            _LayoutLine(page=page, text=text, bbox=(left, top, right - left, bottom - top))
+        )
+    return lines
+
+
+def _region_image(
+    decoded: bytes, file_type: str, page: int, cache: dict[int, Image.Image]
+) -> Image.Image:
+    if page not in cache:
+        if _is_pdf(file_type):
+            cache[page] = _rasterize_pdf(
+                decoded, dpi=_REGION_DPI, first_page=page + 1, last_page=page + 1
+            )[0]
+        else:
+            cache[page] = _open_image(decoded)
+    return cache[page]
+
+
+def _read_region(
+    image: Image.Image, bbox: tuple[int, int, int, int]
+) -> tuple[str, float, tuple[int, int, int, int]]:
+    import pytesseract
+
+    left, top, width, height = bbox
+    left = max(left - _REGION_PADDING, 0)
+    top = max(top - _REGION_PADDING, 0)
+    right = min(left + width + 2 * _REGION_PADDING, image.width)
+    bottom = min(top + height + 2 * _REGION_PADDING, image.height)
+    crop = image.crop((left, top, right, bottom))
+    data = pytesseract.image_to_data(
+        crop, config=_REGION_TESSERACT_CONFIG, output_type=pytesseract.Output.DICT
+    )
+    words = []
+    confidences = []
+    for word, conf in zip(data["text"], data["conf"]):
+        if word.strip():
+            words.append(word.strip())
+            confidences.append(float(conf))
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return " ".join(words), confidence, (left, top, right - left, bottom - top)
+
+
+def _layout_images(decoded: bytes, file_type: str) -> list[Image.Image]:
+    if _is_pdf(file_type):
+        return list(_images_from_bytes(decoded, file_type, dpi=_LAYOUT_DPI))
+    image = _open_image(decoded)
+    factor = _REGION_DPI // _LAYOUT_DPI
+    if min(image.width, image.height) // factor < 400:
+        # Already small; downscaling further would lose the layout pass too.
+        return [image]
+    return [image.reduce(factor)]
+
+
+def _extract_regions(decoded: bytes, file_type: str, receipt_name: str) -> OcrResult:
+    """Low resolution layout pass, then high resolution OCR of the field lines only."""
+    with stage("ocr.rasterize"):
+        layout_images = _layout_images(decoded, file_type)
+    lines: list[_LayoutLine] = []
+    with stage("ocr.tesseract", pages=len(layout_images)):
+        for page, image in enumerate(layout_images):
+            with span("ocr.page", page=page):
+                lines.extend(_layout_lines(image, page))
+
+    # Offsets of each line in the joined text, to map scanner spans back to boxes.
+    starts = []
+    offset = 0
+    for line in lines:
+        starts.append(offset)
+        offset += len(line.text) + 1
+
+    text = "\n".join(line.text for line in lines)
+    with stage("ocr.extract"):
+        scan = _scan_fields(text)
+    values = {
+        "merchant": scan.merchant,
+        "date": scan.date,
+        "amount": scan.amount,
+    }
+
+    high_res: dict[int, Image.Image] = {}
+    fields: dict[str, OcrField] = {}
+    for name, (start, _end) in scan.spans.items():
+        line = lines[bisect.bisect_right(starts, start) - 1]
+        with stage("ocr.rasterize_region", field=name, page=line.page):
+            image = _region_image(decoded, file_type, line.page, high_res)
+        scale = image.width / layout_images[line.page].width
+        bbox = tuple(round(value * scale) for value in line.bbox)
+        with stage("ocr.tesseract_region", field=name, page=line.page):
+            region_text, confidence, region_bbox = _read_region(image, bbox)
+        fields[name] = OcrField(page=line.page, bbox=region_bbox, confidence=confidence)
+
+        # Keep the layout pass value when the crop yields nothing usable.
+        region_scan = _scan_fields(region_text)
+        values[name] = getattr(region_scan, name) or values[name]
+
+    return OcrResult(
+        receipt_name=receipt_name,
+        text=text,
+        merchant=values["merchant"],
+        date=values["date"],
+        amount=values["amount"],
+        currency=scan.currency,
+        fields=fields,
+    )
 
 
 def extract_from_base64(
-    file_base64: str, file_type: str, receipt_name: str
+    file_base64: str,
+    file_type: str,
+    receipt_name: str,
+    mode: str | None = None,
 ) -> OcrResult:
-    decoded = base64.b64decode(_strip_data_url(file_base64))
-    images = _images_from_bytes(decoded, file_type)
+    """OCRs a base64 receipt.
+
+    mode defaults to the OCR_MODE environment variable. "full" OCRs every page
+    as one string; "regions" runs a low resolution word layout pass and then
+    re-OCRs only the merchant, date and amount lines at high resolution,
+    recording a confidence and bounding box for each of them.
+    """
+    with stage("ocr.decode") as current:
+        decoded = base64.b64decode(_strip_data_url(file_base64))
+        if current is not None:
+            current.set_attribute("bytes", len(decoded))
+    if (mode or os.getenv("OCR_MODE", OCR_MODE_FULL)) == OCR_MODE_REGIONS:
+        return _extract_regions(decoded, file_type, receipt_name)
+    with stage("ocr.rasterize", file_type=file_type):
+        images = list(_images_from_bytes(decoded, file_type))
+    import pytesseract
+
     text_parts = []
-    for image in images:
-        text_parts.append(pytesseract.image_to_string(image))
+    with stage("ocr.tesseract", pages=len(images)):
+        for page, image in enumerate(images):
+            with span("ocr.page", page=page):
+                text_parts.append(pytesseract.image_to_string(image))
     text = "\n".join([part.strip() for part in text_parts if part.strip()])
 
-    merchant = _extract_merchant(text)
-    date = _extract_date(text)
-    amount = _extract_amount(text)
-    currency = _detect_currency(text)
+    with stage("ocr.extract"):
+        fields = _scan_fields(text)
 
     return OcrResult(
         receipt_name=receipt_name,
         text=text,
-        merchant=merchant,
-        date=date,
-        amount=amount,
-        currency=currency,
+        merchant=fields.merchant,
+        date=fields.date,
+        amount=fields.amount,
+        currency=fields.currency,
     )
@@ -0,0 +1,172 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+from uuid import uuid4
+
+from ocr import OcrResult, extract_from_base64, ocr_result_payload
+from ocr_store import OcrResultStore
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_DEFAULT_TTL_SECONDS = 3600.0
+_DEFAULT_MAX_FILES = 100
+_DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+@dataclass
+class OcrJob:
+    id: str
+    file_name: str
+    status: str = JOB_QUEUED
+    result: OcrResult | None = None
+    ocr_id: str = ""
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    future: Future | None = field(default=None, repr=False)
+
+
+def job_payload(job: OcrJob) -> dict[str, Any]:
+    payload: dict[str, Any] = {
+        "jobId": job.id,
+        "fileName": job.file_name,
+        "status": job.status,
+    }
+    if job.result is not None:
+        payload["result"] = ocr_result_payload(job.result)
+        if job.ocr_id:
+            payload["result"]["ocrId"] = job.ocr_id
+    if job.error:
+        payload["error"] = job.error
+    return payload
+
+
+class OcrJobQueue:
+    """Runs OCR jobs on a thread pool and keeps their results for polling.
+
+    tesseract and pdftoppm run as subprocesses, so threads are enough to keep
+    several of them busy; throughput scales with the worker count up to the
+    number of cores.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        ttl_seconds: float | None = None,
+        result_store: OcrResultStore | None = None,
+        max_files: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        if workers is None:
+            workers = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("OCR_JOB_TTL_SECONDS", _DEFAULT_TTL_SECONDS))
+        if max_files is None:
+            max_files = int(os.getenv("OCR_JOB_MAX_FILES", _DEFAULT_MAX_FILES))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("OCR_JOB_MAX_BYTES", _DEFAULT_MAX_BYTES))
+        self.workers = max(workers, 1)
+        # Limits for one POST /ocr/jobs request; max_bytes counts decoded file bytes.
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._ttl_seconds = ttl_seconds
+        self._result_store = result_store
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="ocr-job"
+        )
+        self._jobs: dict[str, OcrJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_base64: str, file_type: str, file_name: str) -> OcrJob:
+        job = OcrJob(id=str(uuid4()), file_name=file_name)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        # Run in a copy of the caller's context so tracing spans nest under it.
+        job.future = self._executor.submit(
+            contextvars.copy_context().run,
+            self._run,
+            job,
+            file_base64,
+            file_type,
+            file_name,
+        )
+        return job
+
+    def get(self, job_id: str) -> OcrJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(
+                1 for job in self._jobs.values() if job.status in (JOB_QUEUED, JOB_RUNNING)
+            )
+
+    async def watch(self, job_ids: list[str]) -> AsyncIterator[OcrJob]:
+        """Yields each job once it has finished, in completion order."""
+        pending: dict[asyncio.Future, OcrJob] = {}
+        for job_id in job_ids:
+            job = self.get(job_id)
+            if job is not None and job.future is not None:
+                pending[asyncio.wrap_future(job.future)] = job
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: OcrJob, file_base64: str, file_type: str, file_name: str) -> None:
+        job.status = JOB_RUNNING
+        try:
+            with span("ocr.job", job_id=job.id):
+                job.result = extract_from_base64(file_base64, file_type, file_name)
+            if self._result_store is not None:
+                job.ocr_id = self._result_store.put(job.result)
+            job.status = JOB_DONE
+        except Exception as exc:
+            logger.warning("OCR job %s failed: %s", job.id, exc)
+            job.error = str(exc)
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._ttl_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,74 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from ocr import OcrResult
+
+_DEFAULT_TTL_SECONDS = 900.0
+_DEFAULT_MAX_ENTRIES = 1000
+
+
+class OcrResultStore:
+    """Short-lived OCR results, so /review and upload_receipt can refer to an
+    earlier /ocr call by id instead of uploading and OCRing the file again."""
+
+    def __init__(
+        self, ttl_seconds: float | None = None, max_entries: int | None = None
+    ):
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("OCR_RESULT_TTL_SECONDS", _DEFAULT_TTL_SECONDS))
+        if max_entries is None:
+            max_entries = int(os.getenv("OCR_RESULT_MAX_ENTRIES", _DEFAULT_MAX_ENTRIES))
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._results: OrderedDict[str, tuple[float, OcrResult]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, result: OcrResult) -> str:
+        ocr_id = uuid4().hex
+        with self._lock:
+            self._results[ocr_id] = (time.monotonic() + self._ttl_seconds, result)
+            self._evict()
+        return ocr_id
+
+    def get(self, ocr_id: str) -> OcrResult | None:
+        with self._lock:
+            entry = self._results.get(ocr_id)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._results[ocr_id]
+                return None
+            return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+    def _evict(self) -> None:
+        # Entries share one TTL, so insertion order is also expiry order.
+        now = time.monotonic()
+        while self._results:
+            ocr_id, (expires_at, _) = next(iter(self._results.items()))
+            if expires_at >= now and len(self._results) <= self._max_entries:
+                break
+            del self._results[ocr_id]
@@ -0,0 +1,180 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Opt-in cProfile capture of individual requests.
+
+A request is profiled when profiling is enabled (PROFILE_DIR is set) and
+either it carries the PROFILE_HEADER header or it is picked by the sampling
+rate, which starts at PROFILE_SAMPLE_RATE and can be changed at runtime
+through /admin/profiling. Each profile is written as a .prof file (load it
+with pstats or snakeviz) into PROFILE_DIR, which is trimmed to the newest
+PROFILE_MAX_FILES files and PROFILE_MAX_BYTES bytes.
+
+When PROFILE_DIR is unset the wrappers cost one attribute check per call.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import contextvars
+import functools
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-expense-profile"
+
+_DEFAULT_MAX_FILES = 50
+_DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Profiles of thread pool work done on behalf of the request being profiled.
+_thread_profiles: contextvars.ContextVar[list[cProfile.Profile] | None] = (
+    contextvars.ContextVar("thread_profiles", default=None)
+)
+
+
+def capture_thread(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Profiles func when it runs in a worker thread for a profiled request.
+
+    run_in_threadpool copies the caller's context, so the worker sees the
+    request's profile list and its samples end up in the same file.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profiles = _thread_profiles.get()
+        if profiles is None:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows a single active profiler per process.
+            return func(*args, **kwargs)
+        profiles.append(profile)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    return wrapper
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        directory: str | None = None,
+        sample_rate: float | None = None,
+        max_files: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        if directory is None:
+            directory = os.getenv("PROFILE_DIR") or None
+        if sample_rate is None:
+            sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        if max_files is None:
+            max_files = int(os.getenv("PROFILE_MAX_FILES", _DEFAULT_MAX_FILES))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("PROFILE_MAX_BYTES", _DEFAULT_MAX_BYTES))
+        self.directory = Path(directory) if directory else None
+        self.enabled = self.directory is not None
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        # cProfile hooks the whole interpreter thread; two overlapping profiles
+        # on the event loop thread would corrupt each other.
+        self._active = threading.Lock()
+
+    def should_profile(self, forced: bool = False) -> bool:
+        if not self.enabled:
+            return False
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def wrap_handler(
+        self, name: str
+    ) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+        """Profiles a Starlette handler when sampled or asked to by header."""
+
+        def decorator(handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            @functools.wraps(handler)
+            async def wrapper(request: Any, *args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return await handler(request, *args, **kwargs)
+                forced = request.headers.get(PROFILE_HEADER) == "1"
+                return await self.run(name, forced, handler, request, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    async def run(
+        self,
+        name: str,
+        forced: bool,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        if not self.should_profile(forced) or not self._active.acquire(blocking=False):
+            return await func(*args, **kwargs)
+        profiles = [cProfile.Profile()]
+        token = _thread_profiles.set(profiles)
+        try:
+            # Coroutines of other requests interleaved on the event loop may
+            # show up in the profile as well.
+            profiles[0].enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiles[0].disable()
+        finally:
+            _thread_profiles.reset(token)
+            self._active.release()
+            # Dumping stats and trimming the directory block on disk I/O.
+            await run_in_threadpool(self._write, name, profiles)
+
+    def _write(self, name: str, profiles: list[cProfile.Profile]) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+            path = self.directory / f"{time.time_ns()}-{safe_name}.prof"
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(str(path))
+            self._trim()
+        except (OSError, TypeError) as exc:
+            # TypeError: pstats refuses a profile that recorded no calls.
+            logger.warning("Failed to write profile for %s: %s", name, exc)
+
+    def _trim(self) -> None:
+        files = sorted(self.directory.glob("*.prof"), key=lambda path: path.name)
+        sizes = [path.stat().st_size for path in files]
+        total = sum(sizes)
+        while files and (len(files) > self.max_files or total > self.max_bytes):
+            total -= sizes.pop(0)
+            files.pop(0).unlink(missing_ok=True)
+
+
+PROFILER = RequestProfiler()
@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Receipt OCR and review shared by the HTTP handlers and the A2A executor."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any
+
+from metrics import QUEUE_DEPTH, REVIEW_TOTAL
+from ocr import OcrResult, extract_from_base64
+from profiling import capture_thread
+from singleflight import SingleFlight
+from ui_builder import build_review_fallback, try_ai_review
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_LATE_REVIEW_TTL_SECONDS = 600.0
+_LATE_REVIEW_MAX_ENTRIES = 256
+
+_ocr_calls: SingleFlight[OcrResult] = SingleFlight()
+_review_calls: SingleFlight[list[dict[str, Any]] | None] = SingleFlight()
+QUEUE_DEPTH.set_function(_ocr_calls.in_flight, queue="ocr_in_flight")
+QUEUE_DEPTH.set_function(_review_calls.in_flight, queue="review_in_flight")
+
+# AI layouts that finished after their request had already been answered with
+# the fallback, kept for the next request with the same data. Only touched
+# from the event loop.
+_late_reviews: OrderedDict[str, tuple[float, list[dict[str, Any]]]] = OrderedDict()
+
+
+def _digest(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def ocr_receipt(file_base64: str, file_type: str, receipt_name: str) -> OcrResult:
+    """OCRs a receipt off the event loop, sharing work with identical requests."""
+    # The receipt name does not affect OCR, so retries under another name coalesce too.
+    result = await _ocr_calls.run(
+        _digest(file_base64, file_type),
+        capture_thread(extract_from_base64),
+        file_base64,
+        file_type,
+        receipt_name,
+    )
+    if result.receipt_name != receipt_name:
+        result = dataclasses.replace(result, receipt_name=receipt_name)
+    return result
+
+
+def _review_budget() -> float:
+    return float(os.getenv("REVIEW_LLM_BUDGET_SECONDS", "0") or 0)
+
+
+def _late_review(key: str) -> list[dict[str, Any]] | None:
+    entry = _late_reviews.get(key)
+    if entry is None:
+        return None
+    expires_at, messages = entry
+    if expires_at < time.monotonic():
+        del _late_reviews[key]
+        return None
+    return messages
+
+
+def _keep_late_review(key: str, task: asyncio.Task[list[dict[str, Any]] | None]) -> None:
+    # Only AI layouts are kept; after a failed call the next request tries again.
+    if task.cancelled() or task.exception() is not None or task.result() is None:
+        return
+    ttl = float(
+        os.getenv("REVIEW_LATE_CACHE_TTL_SECONDS", _DEFAULT_LATE_REVIEW_TTL_SECONDS)
+    )
+    _late_reviews[key] = (time.monotonic() + ttl, task.result())
+    _late_reviews.move_to_end(key)
+    while len(_late_reviews) > _LATE_REVIEW_MAX_ENTRIES:
+        _late_reviews.popitem(last=False)
+
+
+async def review_receipt(form_data: dict[str, Any]) -> list[dict[str, Any]]:
+    """Builds the review surface, sharing work with identical requests.
+
+    With REVIEW_LLM_BUDGET_SECONDS set, a request waits at most that long for
+    the AI layout and is answered with the static fallback otherwise. The AI
+    call keeps running and, if it produces an AI layout, that layout is
+    served to the next request for the same data.
+    """
+    key = _digest(json.dumps(form_data, sort_keys=True, ensure_ascii=False))
+    messages = _late_review(key)
+    if messages is None:
+        task = _review_calls.start(key, capture_thread(try_ai_review), form_data)
+        budget = _review_budget()
+        if budget > 0:
+            # asyncio.wait leaves the task running when the budget runs out.
+            done, _ = await asyncio.wait({task}, timeout=budget)
+            if not done:
+                logger.info("AI review exceeded %.2fs budget; sending fallback.", budget)
+                task.add_done_callback(lambda done_task: _keep_late_review(key, done_task))
+                REVIEW_TOTAL.inc(outcome="fallback", reason="budget_exceeded")
+                return build_review_fallback(form_data)
+        messages = await asyncio.shield(task)
+        if messages is None:
+            return build_review_fallback(form_data)
+    # Callers may mutate their messages; each gets its own copy.
+    return copy.deepcopy(messages)
@@ -0,0 +1,52 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Generic, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls that share a key into one computation.
+
+    The first caller for a key starts func in the thread pool; callers that
+    arrive while it is running await the same result instead of starting
+    their own. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Task[T]] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def start(self, key: str, func: Callable[..., T], *args: Any) -> asyncio.Task[T]:
+        """Returns the running task for key, starting func if there is none."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(func, *args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return task
+
+    async def run(self, key: str, func: Callable[..., T], *args: Any) -> T:
+        task = self.start(key, func, *args)
+        # A caller that goes away (client disconnect) must not cancel the
+        # computation the other callers are waiting on.
+        return await asyncio.shield(task)
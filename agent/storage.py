@@ -14,47 +14,117 @@
 
 from __future__ import annotations
 
-import json
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Iterator
 from uuid import uuid4
 
+from claim_store import ClaimStore
+from tracing import traced_stage
+
+if TYPE_CHECKING:
+    from claim_summary import ClaimSummary
+    from claim_table import ClaimTable
 
 DATA_DIR = Path(__file__).resolve().parent / "data"
+# Pre-snapshot store; migrated into DATA_DIR/claims.snapshot on first use.
 CLAIMS_PATH = DATA_DIR / "claims.json"
 
+_stores: dict[Path, ClaimStore] = {}
+_stores_lock = threading.Lock()
+_tables: dict[Path, ClaimTable] = {}
+_tables_lock = threading.Lock()
+_summaries: dict[Path, ClaimSummary] = {}
+_summaries_lock = threading.Lock()
+
+
+def claim_store() -> ClaimStore:
+    """The store for the current DATA_DIR, opened once per process."""
+    with _stores_lock:
+        store = _stores.get(DATA_DIR)
+        if store is None:
+            store = _stores[DATA_DIR] = ClaimStore(DATA_DIR, legacy_json=CLAIMS_PATH)
+        return store
+
+
+def _synced_view(views: dict[Path, Any], lock: threading.Lock, factory: Callable[[int], Any]) -> Any:
+    """Brings the view of the current DATA_DIR up to date with the store.
+
+    Views are append-only copies of the claims with a `generation` and a
+    length; they are extended with new claims and recreated by factory when
+    the claims were replaced.
+    """
+    with lock:
+        view = views.get(DATA_DIR)
+        if view is None:
+            generation, claims = claim_store().claims_since(-1, 0)
+        else:
+            generation, claims = claim_store().claims_since(view.generation, len(view))
+        if view is None or view.generation != generation:
+            view = views[DATA_DIR] = factory(generation)
+        view.extend(claims)
+        return view
+
+
+@traced_stage("storage.claim_table")
+def claim_table() -> ClaimTable:
+    """The columnar table of all claims, extended with claims added since the last call.
+
+    The table is rebuilt only when the claims were replaced (save_claims or
+    the snapshot being replaced on disk).
+    """
+    from claim_table import ClaimTable
 
-def _ensure_storage() -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not CLAIMS_PATH.exists():
-        CLAIMS_PATH.write_text("[]", encoding="utf-8")
+    return _synced_view(_tables, _tables_lock, ClaimTable)
 
 
+@traced_stage("storage.claim_summary")
+def claim_summary() -> ClaimSummary:
+    """Totals of all claims, kept up to date by add_claim once built.
+
+    The first call in a process reads every claim; later calls and
+    add_claim only fold in the claims added since.
+    """
+    return _synced_view(_summaries, _summaries_lock, _new_summary)
+
+
+def _new_summary(generation: int) -> ClaimSummary:
+    from claim_summary import ClaimSummary
+
+    return ClaimSummary(generation)
+
+
+@traced_stage("storage.load_claims")
 def load_claims() -> list[dict[str, Any]]:
-    _ensure_storage()
-    return json.loads(CLAIMS_PATH.read_text(encoding="utf-8"))
+    return claim_store().claims()
+
 
+def iter_claims() -> Iterator[dict[str, Any]]:
+    """All claims in insertion order, decoded as they are consumed."""
+    return claim_store().iter_claims()
 
+
+@traced_stage("storage.save_claims")
 def save_claims(claims: list[dict[str, Any]]) -> None:
-    _ensure_storage()
-    CLAIMS_PATH.write_text(
-        json.dumps(claims, ensure_ascii=False, indent=2), encoding="utf-8"
-    )
+    claim_store().replace(claims)
 
 
+@traced_stage("storage.add_claim")
 def add_claim(payload: dict[str, Any]) -> dict[str, Any]:
-    claims = load_claims()
     record = {
         "id": str(uuid4()),
         "createdAt": datetime.utcnow().isoformat(),
         **payload,
     }
-    claims.append(record)
-    save_claims(claims)
+    claim_store().append(record)
+    # Keep a summary that is already built current; a write never builds one.
+    if DATA_DIR in _summaries:
+        _synced_view(_summaries, _summaries_lock, _new_summary)
     return record
 
 
+@traced_stage("storage.search_claims")
 def search_claims(query: str) -> list[dict[str, Any]]:
     claims = load_claims()
     if not query:
@@ -0,0 +1,166 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Remembers what each A2A context has been sent, to send only what changed.
+
+On the client, surfaceUpdate upserts components by id and a dataModelUpdate
+at a non-root path replaces only that key, so a surface that was already
+rendered can be brought up to date with the changed components and one
+update per changed top-level data key. A root ("/") dataModelUpdate
+replaces the whole data model, so it is still sent in full when keys were
+removed or most of them changed.
+
+Only clients that keep their surfaces between responses can use this; the
+executor enables it per message (metadata.a2uiDeltas).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+_DEFAULT_MAX_CONTEXTS = 1000
+_DEFAULT_TTL_SECONDS = 3600.0
+_VALUE_KEYS = ("valueString", "valueNumber", "valueBoolean", "valueMap")
+
+
+def _fingerprint(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+@dataclass
+class _SurfaceState:
+    begin: str = ""
+    components: dict[str, str] = field(default_factory=dict)
+    # Top-level data keys -> fingerprint of their entry; None when unknown,
+    # e.g. after an update at a nested path.
+    data: dict[str, str] | None = None
+
+
+class SurfaceStateTracker:
+    def __init__(self, max_contexts: int | None = None, ttl_seconds: float | None = None):
+        if max_contexts is None:
+            max_contexts = int(os.getenv("SURFACE_STATE_MAX_CONTEXTS", _DEFAULT_MAX_CONTEXTS))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("SURFACE_STATE_TTL_SECONDS", _DEFAULT_TTL_SECONDS))
+        self._max_contexts = max_contexts
+        self._ttl_seconds = ttl_seconds
+        self._contexts: OrderedDict[str, tuple[float, dict[str, _SurfaceState]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def forget(self, context_id: str) -> None:
+        with self._lock:
+            self._contexts.pop(context_id, None)
+
+    def diff(self, context_id: str, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Returns the messages needed to bring context_id's surfaces to messages.
+
+        The tracked state is updated as if the returned messages were delivered.
+        """
+        with self._lock:
+            surfaces = self._surfaces(context_id)
+            delta: list[dict[str, Any]] = []
+            for message in messages:
+                delta.extend(self._diff_message(surfaces, message))
+            return delta
+
+    def _surfaces(self, context_id: str) -> dict[str, _SurfaceState]:
+        now = time.monotonic()
+        while self._contexts:
+            oldest_id, (last_used, _) = next(iter(self._contexts.items()))
+            if len(self._contexts) <= self._max_contexts and last_used > now - self._ttl_seconds:
+                break
+            del self._contexts[oldest_id]
+        _, surfaces = self._contexts.pop(context_id, (now, {}))
+        self._contexts[context_id] = (now, surfaces)
+        return surfaces
+
+    def _diff_message(
+        self, surfaces: dict[str, _SurfaceState], message: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        if "deleteSurface" in message:
+            surfaces.pop(message["deleteSurface"].get("surfaceId"), None)
+            return [message]
+        name = next(iter(message), None)
+        body = message.get(name) if name else None
+        if not isinstance(body, dict) or not body.get("surfaceId"):
+            return [message]
+        state = surfaces.setdefault(body["surfaceId"], _SurfaceState())
+
+        if name == "beginRendering":
+            fingerprint = _fingerprint(body)
+            if fingerprint == state.begin:
+                return []
+            state.begin = fingerprint
+            return [message]
+
+        if name == "surfaceUpdate":
+            changed = []
+            for component in body.get("components", []):
+                fingerprint = _fingerprint(component)
+                if state.components.get(component.get("id")) != fingerprint:
+                    state.components[component.get("id")] = fingerprint
+                    changed.append(component)
+            if not changed:
+                return []
+            return [{"surfaceUpdate": {**body, "components": changed}}]
+
+        if name == "dataModelUpdate":
+            return self._diff_data(state, message, body)
+        return [message]
+
+    def _diff_data(
+        self, state: _SurfaceState, message: dict[str, Any], body: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        if body.get("path", "/") not in ("", "/"):
+            state.data = None
+            return [message]
+        entries = {
+            entry.get("key"): entry for entry in body.get("contents", []) if isinstance(entry, dict)
+        }
+        fingerprints = {key: _fingerprint(entry) for key, entry in entries.items()}
+        previous, state.data = state.data, fingerprints
+        if previous is None or previous.keys() - fingerprints.keys():
+            return [message]
+        changed = [key for key, fingerprint in fingerprints.items() if previous.get(key) != fingerprint]
+        if len(changed) * 2 > len(fingerprints):
+            return [message]
+
+        updates = []
+        for key in changed:
+            entry = entries[key]
+            value_key = next((name for name in _VALUE_KEYS if name in entry), None)
+            if value_key is None:
+                state.data = None
+                return [message]
+            contents = (
+                entry["valueMap"]
+                if value_key == "valueMap"
+                else [{"key": ".", value_key: entry[value_key]}]
+            )
+            updates.append(
+                {
+                    "dataModelUpdate": {
+                        "surfaceId": body["surfaceId"],
+                        "path": f"/{key}",
+                        "contents": contents,
+                    }
+                }
+            )
+        return updates
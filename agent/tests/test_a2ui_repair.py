@@ -0,0 +1,245 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the lenient A2UI parser and the surface repair."""
+
+import json
+
+import pytest
+
+from a2ui_repair import _close_truncated, parse_lenient, repair_messages
+
+SURFACE = "s"
+
+
+def _text(component_id: str, text: str = "x") -> dict:
+    return {"id": component_id, "component": {"Text": {"text": {"literalString": text}}}}
+
+
+def _column(component_id: str, children: list[str]) -> dict:
+    return {"id": component_id, "component": {"Column": {"children": {"explicitList": children}}}}
+
+
+def _card(component_id: str, child: str) -> dict:
+    return {"id": component_id, "component": {"Card": {"child": child}}}
+
+
+def _list(component_id: str, template: str) -> dict:
+    return {
+        "id": component_id,
+        "component": {"List": {"children": {"template": {"componentId": template, "dataBinding": "/rows"}}}},
+    }
+
+
+def _surface(*components: dict, root: str = "root") -> list[dict]:
+    return [
+        {"beginRendering": {"surfaceId": SURFACE, "root": root}},
+        {"surfaceUpdate": {"surfaceId": SURFACE, "components": list(components)}},
+    ]
+
+
+def _components(messages: list[dict]) -> dict[str, dict]:
+    update = next(message["surfaceUpdate"] for message in messages if "surfaceUpdate" in message)
+    return {component["id"]: component for component in update["components"]}
+
+
+MESSAGES = _surface(_column("root", ["title"]), _text("title", "明細"))
+
+
+# region parse_lenient
+
+
+def test_plain_json_array():
+    assert parse_lenient(json.dumps(MESSAGES)) == MESSAGES
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "```json\n" + json.dumps(MESSAGES) + "\n```",
+        "```\n" + json.dumps(MESSAGES) + "\n```",
+        "Here is the UI:\n" + json.dumps(MESSAGES) + "\nLet me know if you need changes.",
+        "Sure!\n```json\n" + json.dumps(MESSAGES, indent=2) + "\n```\nDone.",
+    ],
+)
+def test_code_fences_and_prose_are_ignored(raw):
+    assert parse_lenient(raw) == MESSAGES
+
+
+def test_single_message_is_wrapped_in_a_list():
+    message = MESSAGES[0]
+    assert parse_lenient(json.dumps(message)) == [message]
+    assert parse_lenient("Result: " + json.dumps(message) + " (end)") == [message]
+
+
+def test_array_truncated_mid_component_keeps_earlier_components():
+    raw = json.dumps(_surface(_text("a"), _text("b"), _text("c")))
+    cut = raw.index('"c"') + 2
+    parsed = parse_lenient(raw[:cut])
+    assert parsed[0] == {"beginRendering": {"surfaceId": SURFACE, "root": "root"}}
+    assert [component["id"] for component in parsed[1]["surfaceUpdate"]["components"]] == ["a", "b"]
+
+
+def test_truncated_single_message_is_wrapped():
+    raw = json.dumps(MESSAGES[1])
+    parsed = parse_lenient(raw[: raw.rindex('"title"') + 3])
+    assert len(parsed) == 1
+    assert [component["id"] for component in parsed[0]["surfaceUpdate"]["components"]] == ["root"]
+
+
+@pytest.mark.parametrize("raw", ["", "no json here", "[", '{"beginRendering": '])
+def test_nothing_parses(raw):
+    assert parse_lenient(raw) == []
+
+
+# endregion
+
+# region _close_truncated
+
+
+def test_close_truncated_ignores_brackets_inside_strings():
+    text = '[{"a": "[{\\"]"}, {"b": "}'
+    assert _close_truncated(text) == [{"a": '[{"]'}]
+
+
+def test_close_truncated_stops_at_the_end_of_the_value():
+    assert _close_truncated('[1, [2]] trailing ]') == [1, [2]]
+
+
+def test_close_truncated_without_a_complete_value():
+    assert _close_truncated('{"a": ') is None
+
+
+# endregion
+
+# region repair_messages
+
+
+def test_valid_surface_is_unchanged():
+    result = repair_messages(MESSAGES, SURFACE, [])
+    assert result.messages == MESSAGES
+    assert result.repairs == []
+    assert result.kept_components == 2
+
+
+def test_unknown_properties_are_stripped():
+    title = _text("title")
+    title["component"]["Text"]["color"] = "red"
+    title["component"]["Text"]["text"]["markdown"] = True
+    result = repair_messages(_surface(_column("root", ["title"]), title), SURFACE, [])
+    assert _components(result.messages)["title"] == _text("title")
+    assert result.kept_components == 2
+
+
+def test_invalid_components_are_dropped():
+    broken = {"id": "title", "component": {"Text": {"text": "not an object"}}}
+    unknown = {"id": "x", "component": {"Marquee": {}}}
+    messages = _surface(_column("root", ["title", "x"]), broken, unknown, {"no": "id"})
+    result = repair_messages(messages, SURFACE, [])
+    assert _components(result.messages)["root"] == _column("root", [])
+    assert result.kept_components == 1
+    assert any("unknown component type 'Marquee'" in repair for repair in result.repairs)
+
+
+def test_other_surfaces_and_unknown_messages_are_dropped():
+    messages = [
+        *MESSAGES,
+        {"surfaceUpdate": {"surfaceId": "other", "components": [_text("elsewhere")]}},
+        {"deleteEverything": {}},
+        "text",
+    ]
+    result = repair_messages(messages, SURFACE, [])
+    assert result.messages == MESSAGES
+    assert len(result.repairs) == 3
+
+
+def test_dangling_explicit_list_entries_are_removed():
+    result = repair_messages(_surface(_column("root", ["title", "ghost"]), _text("title")), SURFACE, [])
+    assert _components(result.messages)["root"] == _column("root", ["title"])
+    assert result.repairs == ["root: removed 1 missing children"]
+
+
+def test_dangling_child_drops_the_component():
+    result = repair_messages(_surface(_column("root", ["card"]), _card("card", "ghost")), SURFACE, [])
+    assert set(_components(result.messages)) == {"root"}
+    assert "card: dropped, missing child" in result.repairs
+
+
+def test_dangling_template_drops_the_component():
+    result = repair_messages(_surface(_column("root", ["rows"]), _list("rows", "ghost")), SURFACE, [])
+    assert set(_components(result.messages)) == {"root"}
+    assert "rows: dropped, missing children.template" in result.repairs
+
+
+def test_drops_cascade_to_parents():
+    # ghost is missing, so inner goes, then outer, then root's reference to outer.
+    messages = _surface(
+        _column("root", ["outer", "title"]),
+        _card("outer", "inner"),
+        _card("inner", "ghost"),
+        _text("title"),
+    )
+    result = repair_messages(messages, SURFACE, [])
+    assert set(_components(result.messages)) == {"root", "title"}
+    assert _components(result.messages)["root"] == _column("root", ["title"])
+    assert result.kept_components == 2
+
+
+def test_missing_components_and_children_come_from_the_fallback():
+    fallback = [
+        *_surface(
+            _column("root", ["title", "amount", "submit"]), _text("title"), _text("amount"), _text("submit")
+        ),
+        {"dataModelUpdate": {"surfaceId": SURFACE, "contents": [{"key": "amount", "valueString": "100"}]}},
+    ]
+    model = _surface(_column("root", ["amount", "note"]), _text("amount", "AI"), _text("note"))
+    result = repair_messages(model, SURFACE, fallback)
+
+    components = _components(result.messages)
+    # The model's order comes first; missing required children follow in fallback order.
+    assert components["root"] == _column("root", ["amount", "note", "title", "submit"])
+    assert components["amount"] == _text("amount", "AI")
+    assert components["title"] == _text("title")
+    assert result.kept_components == 3
+    assert result.messages[-1] == fallback[-1]
+    assert "title: added from fallback" in result.repairs
+    assert "root: appended 2 required children" in result.repairs
+
+
+def test_begin_rendering_from_the_fallback_when_the_root_is_missing():
+    fallback = _surface(_column("root", ["title"]), _text("title"))
+    model = _surface(_text("title", "AI"), root="nowhere")
+    result = repair_messages(model, SURFACE, fallback)
+    assert result.messages[0] == fallback[0]
+    assert "beginRendering taken from fallback" in result.repairs
+
+
+def test_empty_data_model_update_is_filled_from_the_fallback():
+    contents = [{"key": "amount", "valueString": "100"}]
+    fallback = [*MESSAGES, {"dataModelUpdate": {"surfaceId": SURFACE, "contents": contents}}]
+    model = [*MESSAGES, {"dataModelUpdate": {"surfaceId": SURFACE, "contents": []}}]
+    result = repair_messages(model, SURFACE, fallback)
+    assert result.messages[-1]["dataModelUpdate"]["contents"] == contents
+    assert result.repairs == ["empty dataModelUpdate filled from fallback"]
+
+
+def test_repair_does_not_modify_the_fallback():
+    fallback = _surface(_column("root", ["title"]), _text("title"))
+    snapshot = json.dumps(fallback)
+    result = repair_messages([], SURFACE, fallback)
+    _components(result.messages)["root"]["component"]["Column"]["children"]["explicitList"].append("x")
+    assert json.dumps(fallback) == snapshot
+    assert result.kept_components == 0
+
+
+# endregion
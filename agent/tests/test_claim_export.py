@@ -0,0 +1,150 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the claim export."""
+
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from starlette.testclient import TestClient
+
+import storage
+from app import build_app
+from claim_export import CSV_FIELDS, export_chunks, in_period
+
+CLAIMS = [
+    {"id": "1", "date": "2024/12/31", "amount": "100", "currency": "JPY"},
+    {"id": "2", "date": "2025/01/01", "amount": "200", "currency": "JPY", "extra": "x"},
+    {"id": "3", "date": "2025-01-31", "amount": "300", "currency": "JPY"},
+    {"id": "4", "date": "2025年2月1日", "amount": "400", "currency": "JPY"},
+    {"id": "5", "date": "", "amount": "500", "currency": "JPY"},
+]
+
+
+def _ids(claims) -> list[str]:
+    return [claim["id"] for claim in claims]
+
+
+# region in_period
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (None, None, ["1", "2", "3", "4", "5"]),
+        (date(2025, 1, 1), date(2025, 1, 31), ["2", "3"]),
+        (date(2025, 1, 1), None, ["2", "3", "4"]),
+        (None, date(2024, 12, 31), ["1"]),
+        (date(2025, 1, 31), date(2025, 1, 31), ["3"]),
+        (date(2025, 2, 2), None, []),
+    ],
+)
+def test_in_period_bounds_are_inclusive(start, end, expected):
+    assert _ids(in_period(CLAIMS, start, end)) == expected
+
+
+# endregion
+
+# region export_chunks
+
+
+def test_csv_export():
+    chunks = list(export_chunks(CLAIMS, "csv", batch_rows=2))
+    assert len(chunks) == 3
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert tuple(rows[0]) == CSV_FIELDS
+    assert [row["id"] for row in rows] == _ids(CLAIMS)
+    assert rows[3]["date"] == "2025年2月1日"
+
+
+def test_jsonl_export():
+    chunks = list(export_chunks(CLAIMS, "jsonl", batch_rows=10))
+    assert len(chunks) == 1
+    assert [json.loads(line) for line in chunks[0].decode("utf-8").splitlines()] == CLAIMS
+
+
+def test_empty_export():
+    assert b"".join(export_chunks([], "csv")).decode("utf-8").strip() == ",".join(CSV_FIELDS)
+    assert list(export_chunks([], "jsonl")) == []
+
+
+def test_csv_cells_are_not_formulas():
+    claims = [
+        {"memo": "=HYPERLINK(\"http://x\")", "merchant": "+cmd", "category": "@SUM(A1)", "receiptName": "-2+3"},
+        {"memo": "\tTAB", "merchant": "a=b", "amount": "-300", "date": "2025/01/01"},
+    ]
+    rows = list(csv.DictReader(io.StringIO(b"".join(export_chunks(claims, "csv")).decode("utf-8"))))
+    assert [rows[0][name] for name in ("memo", "merchant", "category", "receiptName")] == [
+        "'=HYPERLINK(\"http://x\")",
+        "'+cmd",
+        "'@SUM(A1)",
+        "'-2+3",
+    ]
+    assert [rows[1][name] for name in ("memo", "merchant", "amount")] == ["'\tTAB", "a=b", "-300"]
+
+
+def test_jsonl_is_not_escaped():
+    claims = [{"memo": "=1+1"}]
+    assert json.loads(b"".join(export_chunks(claims, "jsonl"))) == claims[0]
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        list(export_chunks(CLAIMS, "xml"))
+
+
+# endregion
+
+# region GET /claims/export
+
+
+@pytest.fixture
+def client(data_dir, monkeypatch):
+    monkeypatch.setenv("CLAIMS_EXPORT_TOKEN", "secret")
+    storage.save_claims(CLAIMS)
+    return TestClient(build_app("http://localhost", warmup=False), headers={"Authorization": "Bearer secret"})
+
+
+def test_export_endpoint(client):
+    response = client.get("/claims/export", params={"format": "jsonl", "from": "2025-01-01", "to": "2025/01/31"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == ["2", "3"]
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "secret"])
+def test_export_endpoint_requires_the_token(client, authorization):
+    headers = {"Authorization": authorization} if authorization else {}
+    if authorization is None:
+        client.headers.pop("Authorization")
+    response = client.get("/claims/export", headers=headers)
+    assert response.status_code == 403
+    assert "submittedBy" not in response.text
+
+
+def test_export_endpoint_is_off_without_a_token(client, monkeypatch):
+    monkeypatch.delenv("CLAIMS_EXPORT_TOKEN")
+    assert client.get("/claims/export").status_code == 403
+
+
+@pytest.mark.parametrize("params", [{"format": "xml"}, {"from": "2025-13-01"}, {"to": "tomorrow"}])
+def test_export_endpoint_rejects_bad_parameters(client, params):
+    assert client.get("/claims/export", params=params).status_code == 400
+
+
+# endregion
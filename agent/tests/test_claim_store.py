@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the claim snapshot and tail log."""
+
+import json
+
+import pytest
+
+import claim_store
+from claim_store import LOG_NAME, SNAPSHOT_NAME, ClaimStore
+
+
+def _claims(count: int, start: int = 0) -> list[dict]:
+    return [
+        {"id": str(index), "merchant": f"shop {index}", "amount": f"{index}.50", "tags": ["a", index]}
+        for index in range(start, start + count)
+    ]
+
+
+# region Round trip
+
+
+def test_snapshot_and_log_round_trip(tmp_path):
+    store = ClaimStore(tmp_path, compact_after=100)
+    store.replace(_claims(3))
+    for claim in _claims(2, start=3):
+        store.append(claim)
+
+    reopened = ClaimStore(tmp_path)
+    assert reopened.claims() == _claims(5)
+    assert list(reopened.iter_claims()) == _claims(5)
+    assert len(reopened) == 5
+
+
+def test_values_with_missing_keys_and_nul(tmp_path):
+    claims = [{"id": "1", "memo": "a\x00b"}, {"id": "2", "amount": 3}, {}]
+    ClaimStore(tmp_path).replace(claims)
+
+    reopened = ClaimStore(tmp_path)
+    assert reopened.claims() == claims
+    assert list(reopened.iter_claims()) == claims
+
+
+def test_compaction_folds_the_log_into_the_snapshot(tmp_path):
+    store = ClaimStore(tmp_path, compact_after=3)
+    for claim in _claims(4):
+        store.append(claim)
+
+    reopened = ClaimStore(tmp_path)
+    assert reopened.claims() == _claims(4)
+    assert reopened._snapshot.count == 3
+
+
+def test_legacy_json_is_migrated(tmp_path):
+    legacy = tmp_path / "claims.json"
+    legacy.write_text(json.dumps(_claims(2)), encoding="utf-8")
+
+    store = ClaimStore(tmp_path, legacy_json=legacy)
+    assert store.claims() == _claims(2)
+    assert (tmp_path / SNAPSHOT_NAME).exists()
+
+
+def test_claims_since_returns_only_new_claims(tmp_path):
+    store = ClaimStore(tmp_path, compact_after=100)
+    store.replace(_claims(2))
+    generation, claims = store.claims_since(-1, 0)
+    assert claims == _claims(2)
+
+    store.append(_claims(1, start=2)[0])
+    assert store.claims_since(generation, 2) == (generation, _claims(1, start=2))
+
+    store.replace(_claims(1))
+    new_generation, claims = store.claims_since(generation, 3)
+    assert new_generation != generation
+    assert claims == _claims(1)
+
+
+# endregion
+
+# region Crash recovery
+
+
+def test_torn_log_frame_is_dropped(tmp_path):
+    store = ClaimStore(tmp_path, compact_after=100)
+    for claim in _claims(2):
+        store.append(claim)
+    with open(tmp_path / LOG_NAME, "ab") as log:
+        log.write(claim_store._frame(_claims(1, start=2)[0])[:-3])
+
+    reopened = ClaimStore(tmp_path)
+    assert reopened.claims() == _claims(2)
+    reopened.append(_claims(1, start=2)[0])
+    assert ClaimStore(tmp_path).claims() == _claims(3)
+
+
+def test_crash_between_snapshot_and_log_rotation(tmp_path, monkeypatch):
+    store = ClaimStore(tmp_path, compact_after=100)
+    for claim in _claims(3):
+        store.append(claim)
+
+    def crash(path, log_id):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(claim_store, "write_log", crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.compact()
+    monkeypatch.undo()
+
+    reopened = ClaimStore(tmp_path, compact_after=100)
+    assert reopened.claims() == _claims(3)
+    reopened.append(_claims(1, start=3)[0])
+    reopened.compact()
+    assert ClaimStore(tmp_path).claims() == _claims(4)
+
+
+def test_missing_snapshot_keeps_logged_claims(tmp_path):
+    store = ClaimStore(tmp_path, compact_after=100)
+    store.replace(_claims(2))
+    for claim in _claims(2, start=2):
+        store.append(claim)
+    (tmp_path / SNAPSHOT_NAME).unlink()
+
+    assert ClaimStore(tmp_path).claims() == _claims(2, start=2)
+    assert ClaimStore(tmp_path).claims() == _claims(2, start=2)
+
+
+# endregion
@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the incrementally maintained expense summary."""
+
+import random
+
+import pytest
+
+import storage
+from claim_summary import ClaimSummary
+from claim_table import ClaimTable
+
+
+def _claims(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    claims = []
+    for _ in range(count):
+        claim = {
+            "date": rng.choice(["2024/12/31", "2025/01/01", "2025-01-15", "2025年2月3日", "", "不明"]),
+            "amount": rng.choice(["1,200", "12.50", "0.07", "-300", "abc", ""]),
+            "currency": rng.choice(["JPY", "usd", "EUR "]),
+            "category": rng.choice(["交通費", "会議費", " 交通費 "]),
+        }
+        if rng.random() < 0.7:
+            claim["submittedBy"] = rng.choice(["alice", "bob"])
+        claims.append(claim)
+    return claims
+
+
+QUERIES = [
+    {"by": ()},
+    {"by": ("month",)},
+    {"by": ("category", "user")},
+    {"by": ("month",), "start_month": "2025-01", "end_month": "2025-01"},
+    {"by": ("category",), "user": "alice"},
+    {"by": (), "user": "", "currency": "USD"},
+]
+
+
+# region ClaimSummary
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_incremental_updates_match_full_rebuild(query):
+    claims = _claims(300)
+    incremental = ClaimSummary()
+    for claim in claims:
+        incremental.add(claim)
+    rebuilt = ClaimSummary()
+    rebuilt.extend(claims)
+
+    assert incremental.totals(**query) == rebuilt.totals(**query)
+    assert (incremental.claims, incremental.unparsed) == (rebuilt.claims, rebuilt.unparsed)
+
+
+def test_totals_match_claim_table():
+    claims = _claims(300, seed=1)
+    summary = ClaimSummary()
+    summary.extend(claims)
+    table = ClaimTable.from_claims(claims)
+
+    assert summary.totals(("category",)) == table.totals(("category",))
+    # The table leaves out claims without a month when grouping by it.
+    assert [row for row in summary.totals(("month",)) if row["month"]] == table.totals(("month",))
+
+
+def test_month_bounds_exclude_unknown_months():
+    summary = ClaimSummary()
+    summary.extend(
+        [
+            {"date": "", "amount": "1", "currency": "JPY"},
+            {"date": "2025/01/02", "amount": "2", "currency": "JPY"},
+        ]
+    )
+
+    assert summary.totals(start_month="2025-01") == [{"currency": "JPY", "count": 1, "amount": 200}]
+    assert summary.totals() == [{"currency": "JPY", "count": 2, "amount": 300}]
+
+
+def test_totals_rejects_unknown_keys():
+    with pytest.raises(ValueError):
+        ClaimSummary().totals(("merchant",))
+
+
+# endregion
+
+# region storage.claim_summary
+
+
+def test_add_claim_keeps_the_summary_current(data_dir):
+    claims = _claims(50, seed=2)
+    storage.save_claims(claims[:20])
+    summary = storage.claim_summary()
+    for claim in claims[20:]:
+        storage.add_claim(claim)
+
+    rebuilt = ClaimSummary()
+    rebuilt.extend(claims)
+    assert storage.claim_summary() is summary
+    assert summary.totals(("month", "category", "user")) == rebuilt.totals(("month", "category", "user"))
+
+
+def test_replaced_claims_rebuild_the_summary(data_dir):
+    storage.save_claims(_claims(10))
+    storage.claim_summary()
+    storage.save_claims(_claims(5, seed=3))
+
+    rebuilt = ClaimSummary()
+    rebuilt.extend(_claims(5, seed=3))
+    assert storage.claim_summary().totals(("month",)) == rebuilt.totals(("month",))
+
+
+# endregion
@@ -0,0 +1,136 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the columnar claim table and its parsers."""
+
+from collections import defaultdict
+from datetime import date
+
+import pytest
+
+from claim_table import ClaimTable, format_amount, month_range, parse_amount, parse_date
+
+CLAIMS = [
+    {"date": "2025/01/31", "amount": "1,200", "currency": "JPY", "category": "交通費", "submittedBy": "alice"},
+    {"date": "2025-02-01", "amount": "12.5", "currency": "usd", "category": "会議費", "submittedBy": "bob"},
+    {"date": "2025年2月28日", "amount": "800", "currency": "JPY", "category": "交通費", "submittedBy": "alice"},
+    {"date": "2025.3.1", "amount": "7.70", "currency": "EUR", "category": "会議費"},
+    {"date": "unknown", "amount": "100", "currency": "JPY", "category": "交通費"},
+    {"date": "2025/03/15", "amount": "n/a", "currency": "JPY", "category": "交通費"},
+]
+
+
+def _brute_force(claims, key):
+    groups = defaultdict(lambda: [0, 0])
+    for claim in claims:
+        amount = parse_amount(claim["amount"])
+        if amount is None:
+            continue
+        parsed = parse_date(claim["date"])
+        if key == "month" and parsed is None:
+            # Grouping by month leaves out claims without a readable date.
+            continue
+        value = f"{parsed.year}-{parsed.month:02d}" if key == "month" else claim[key]
+        group = groups[(value, claim["currency"].upper())]
+        group[0] += 1
+        group[1] += amount
+    return [
+        {key: value, "currency": currency, "count": count, "amount": amount}
+        for (value, currency), (count, amount) in sorted(groups.items())
+    ]
+
+
+# region Parsers
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("1,234.5", 123450), ("-3", -300), (" 0.07 ", 7), ("1.005", 100), ("1e3", 100000), ("abc", None), ("", None)],
+)
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+def test_format_amount():
+    assert format_amount(123456) == "1234.56"
+    assert format_amount(-5) == "-0.05"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2025/01/02", date(2025, 1, 2)),
+        ("2025-1-2", date(2025, 1, 2)),
+        ("2025年1月2日", date(2025, 1, 2)),
+        ("2025/02/30", None),
+        ("01/02/2025", None),
+    ],
+)
+def test_parse_date(text, expected):
+    assert parse_date(text) == expected
+
+
+def test_month_range():
+    assert month_range("2024-02", "2024-02") == (date(2024, 2, 1), date(2024, 2, 29))
+    assert month_range(None, "2024-12") == (None, date(2024, 12, 31))
+    assert month_range("2025-1", None) == (date(2025, 1, 1), None)
+
+
+@pytest.mark.parametrize("month", ["2025/01", "2025-13", "2025-00", "January"])
+def test_month_range_rejects_invalid_months(month):
+    with pytest.raises(ValueError):
+        month_range(month, None)
+
+
+# endregion
+
+# region ClaimTable
+
+
+@pytest.mark.parametrize("key", ["month", "category"])
+def test_totals_match_brute_force(key):
+    table = ClaimTable.from_claims(CLAIMS)
+    assert table.totals((key,)) == _brute_force(CLAIMS, key)
+
+
+def test_incremental_append_matches_rebuild():
+    table = ClaimTable()
+    for claim in CLAIMS:
+        table.append(claim)
+    rebuilt = ClaimTable.from_claims(CLAIMS)
+    assert table.totals(("month", "category")) == rebuilt.totals(("month", "category"))
+
+
+def test_select_bounds_are_inclusive():
+    table = ClaimTable.from_claims(CLAIMS)
+    start, end = month_range("2025-02", "2025-02")
+    rows = table.totals((), table.select(start=start, end=end))
+    assert rows == [
+        {"currency": "JPY", "count": 1, "amount": 80000},
+        {"currency": "USD", "count": 1, "amount": 1250},
+    ]
+
+
+def test_select_by_user():
+    table = ClaimTable.from_claims(CLAIMS)
+    assert table.totals((), table.select(user="alice")) == [{"currency": "JPY", "count": 2, "amount": 200000}]
+    assert table.totals((), table.select(user="nobody")) == []
+
+
+def test_totals_rejects_unknown_keys():
+    with pytest.raises(ValueError):
+        ClaimTable().totals(("merchant",))
+
+
+# endregion
@@ -0,0 +1,205 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for offline currency conversion."""
+
+import os
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import fx
+from claim_table import ClaimTable
+from fx import RateTable
+
+ROWS = [
+    (date(2025, 1, 1), "USD", 150.0),
+    (date(2025, 3, 1), "USD", 140.0),
+    (date(2025, 2, 1), "EUR", 160.0),
+]
+
+
+@pytest.fixture
+def rates():
+    return RateTable("JPY", ROWS)
+
+
+# region RateTable
+
+
+@pytest.mark.parametrize(
+    "on, expected",
+    [
+        (date(2024, 12, 31), None),  # before the first rate
+        (date(2025, 1, 1), 150.0),  # on a rate date
+        (date(2025, 2, 28), 150.0),  # between rate dates
+        (date(2025, 3, 1), 140.0),
+        (date(2030, 1, 1), 140.0),  # after the last rate
+    ],
+)
+def test_rate_lookup(rates, on, expected):
+    assert rates.rate("USD", on) == expected
+    assert rates.rate("usd", on) == expected
+
+
+def test_base_and_unknown_currencies(rates):
+    assert rates.rate("JPY", date(1999, 1, 1)) == 1.0
+    assert rates.rate("GBP", date(2025, 6, 1)) is None
+    assert rates.currencies == ["JPY", "USD", "EUR"]
+
+
+def test_convert(rates):
+    assert rates.convert(10, "USD", "JPY", date(2025, 3, 2)) == 1400.0
+    assert rates.convert(160, "EUR", "USD", date(2025, 3, 2)) == pytest.approx(182.857142857)
+    # No EUR rate before February.
+    assert rates.convert(1, "EUR", "JPY", date(2025, 1, 31)) is None
+    assert rates.convert(1, "JPY", "EUR", date(2025, 1, 31)) is None
+
+
+def test_rates_for_matches_rate(rates):
+    currencies = ["JPY", "USD", "EUR", "GBP"]
+    days = [date(2024, 12, 31), date(2025, 1, 1), date(2025, 2, 1), date(2025, 2, 15), date(2025, 4, 1)]
+    codes = np.array([code for code in range(len(currencies)) for _ in days], dtype=np.int32)
+    ordinals = np.array([day.toordinal() for _ in currencies for day in days], dtype=np.int32)
+
+    result = rates.rates_for(currencies, codes, ordinals)
+    expected = [rates.rate(currencies[code], date.fromordinal(int(ordinal))) for code, ordinal in zip(codes, ordinals)]
+    assert [None if np.isnan(value) else value for value in result] == expected
+
+
+def test_rates_for_unknown_dates(rates):
+    result = rates.rates_for(["JPY"], np.zeros(1, dtype=np.int32), np.zeros(1, dtype=np.int32))
+    assert np.isnan(result[0])
+
+
+def test_rates_older_than_max_age_are_unknown():
+    rates = RateTable("JPY", ROWS, max_age_days=30)
+    assert rates.rate("USD", date(2025, 1, 31)) == 150.0
+    assert rates.rate("USD", date(2025, 2, 1)) is None  # 31 days old
+    assert rates.rate("USD", date(2025, 3, 31)) == 140.0
+    assert rates.rate("USD", date(2026, 1, 1)) is None
+    assert rates.rate("JPY", date(2026, 1, 1)) == 1.0
+
+    days = [date(2025, 1, 31), date(2025, 2, 1), date(2025, 3, 31), date(2026, 1, 1)]
+    result = rates.rates_for(
+        ["USD"], np.zeros(len(days), dtype=np.int32), np.array([day.toordinal() for day in days], dtype=np.int32)
+    )
+    assert [None if np.isnan(value) else value for value in result] == [150.0, None, 140.0, None]
+
+
+def test_stale_rates_are_counted_as_skipped():
+    rates = RateTable("JPY", ROWS, max_age_days=45)
+    table = ClaimTable.from_claims(
+        [
+            {"date": "2025/03/10", "amount": "10", "currency": "USD"},
+            {"date": "2026/01/10", "amount": "10", "currency": "USD"},
+        ]
+    )
+    rows, skipped = table.converted_totals(rates, "JPY")
+    assert rows == [{"currency": "JPY", "count": 1, "amount": 140000}]
+    assert skipped == 1
+
+
+def test_rates_must_be_positive():
+    with pytest.raises(ValueError):
+        RateTable("JPY", [(date(2025, 1, 1), "USD", 0.0)])
+
+
+# endregion
+
+# region rate_table
+
+
+def test_rate_table_reloads_when_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,currency,rate\n2025-01-01,USD,150\n", encoding="utf-8")
+    monkeypatch.setenv("FX_RATES_PATH", str(path))
+    monkeypatch.setenv("FX_BASE_CURRENCY", "jpy")
+
+    assert fx.rate_table().rate("USD", date(2025, 1, 2)) == 150.0
+    path.write_text("date,currency,rate\n2025-01-01,USD,155\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert fx.rate_table().rate("USD", date(2025, 1, 2)) == 155.0
+
+
+def test_rate_table_is_opt_in(monkeypatch):
+    monkeypatch.delenv("FX_RATES_PATH", raising=False)
+    assert fx.rate_table() is None
+
+
+def test_rate_table_max_age_from_the_environment(tmp_path, monkeypatch):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,currency,rate\n2025-01-01,USD,150\n", encoding="utf-8")
+    monkeypatch.setenv("FX_RATES_PATH", str(path))
+    monkeypatch.setenv("FX_RATE_MAX_AGE_DAYS", "10")
+    assert fx.rate_table().rate("USD", date(2025, 1, 20)) is None
+
+    monkeypatch.setenv("FX_RATE_MAX_AGE_DAYS", "0")
+    assert fx.rate_table().rate("USD", date(2026, 1, 20)) == 150.0
+
+
+def test_sample_rates_load():
+    rates = RateTable.load(Path(fx.__file__).parent / "data" / "fx_rates.sample.csv", "JPY")
+    assert {"USD", "EUR"} <= set(rates.currencies)
+
+
+def test_rate_table_without_a_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("FX_RATES_PATH", str(tmp_path / "missing.csv"))
+    assert fx.rate_table() is None
+
+
+def test_load_rejects_unreadable_dates(tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,currency,rate\nsoon,USD,150\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="rates.csv:2"):
+        RateTable.load(path, "JPY")
+
+
+# endregion
+
+# region ClaimTable conversion
+
+
+def test_converted_totals_match_per_claim_conversion(rates):
+    claims = [
+        {"date": "2025/01/15", "amount": "10", "currency": "USD"},
+        {"date": "2025/03/01", "amount": "10", "currency": "USD"},
+        {"date": "2025/03/01", "amount": "1,000", "currency": "JPY"},
+        {"date": "2025/03/02", "amount": "5", "currency": "EUR"},
+        {"date": "2025/01/15", "amount": "5", "currency": "EUR"},  # no rate yet
+        {"date": "", "amount": "5", "currency": "USD"},  # no date
+    ]
+    table = ClaimTable.from_claims(claims)
+
+    rows, skipped = table.converted_totals(rates, "JPY", ("month",))
+    assert skipped == 2
+    assert rows == [
+        {"month": "2025-01", "currency": "JPY", "count": 1, "amount": 150000},
+        {"month": "2025-03", "currency": "JPY", "count": 3, "amount": 320000},
+    ]
+
+    table.append({"date": "2025/03/05", "amount": "1", "currency": "USD"})
+    rows, _ = table.converted_totals(rates, "JPY")
+    assert rows == [{"currency": "JPY", "count": 5, "amount": 484000}]
+
+
+def test_converted_totals_rejects_grouping_by_currency(rates):
+    with pytest.raises(ValueError):
+        ClaimTable().converted_totals(rates, "JPY", ("currency",))
+
+
+# endregion
@@ -0,0 +1,224 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the in-process metrics and their exposition format."""
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_SECONDS,
+    HTTP_TOTAL,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    track_request,
+)
+
+
+def _lines(metric) -> list[str]:
+    return metric.render().splitlines()
+
+
+def _sample(metric, line_prefix: str) -> str:
+    """The value of the one rendered sample starting with line_prefix."""
+    (line,) = [line for line in _lines(metric) if line.startswith(line_prefix + " ")]
+    return line.rpartition(" ")[2]
+
+
+# region exposition
+
+
+def test_counter_exposition():
+    metric = Counter("reviews_total", "Reviews built.", ("outcome",))
+    metric.inc(outcome="ai")
+    metric.inc(2, outcome="ai")
+    metric.inc(0.5, outcome="fallback")
+    assert _lines(metric) == [
+        "# HELP reviews_total Reviews built.",
+        "# TYPE reviews_total counter",
+        'reviews_total{outcome="ai"} 3',
+        'reviews_total{outcome="fallback"} 0.5',
+    ]
+
+
+def test_unlabelled_metric_has_no_braces():
+    metric = Counter("ticks_total", "Ticks.")
+    metric.inc()
+    assert _lines(metric)[-1] == "ticks_total 1"
+
+
+def test_missing_labels_are_empty():
+    metric = Counter("reviews_total", "Reviews built.", ("outcome", "reason"))
+    metric.inc(outcome="ai")
+    assert _lines(metric)[-1] == 'reviews_total{outcome="ai",reason=""} 1'
+
+
+def test_histogram_buckets_are_cumulative():
+    metric = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        metric.observe(value, route="/ocr")
+    assert _lines(metric) == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/ocr",le="0.1"} 2',
+        'latency_seconds_bucket{route="/ocr",le="0.5"} 3',
+        'latency_seconds_bucket{route="/ocr",le="1"} 4',
+        'latency_seconds_bucket{route="/ocr",le="+Inf"} 5',
+        'latency_seconds_sum{route="/ocr"} 3.15',
+        'latency_seconds_count{route="/ocr"} 5',
+    ]
+
+
+def test_histogram_time():
+    metric = Histogram("work_seconds", "Work.", buckets=(60.0,))
+    with metric.time():
+        pass
+    assert _sample(metric, 'work_seconds_bucket{le="60"}') == "1"
+    assert _sample(metric, "work_seconds_count") == "1"
+
+
+def test_gauge_values_and_functions():
+    metric = Gauge("depth", "Depth.", ("queue",))
+    metric.set(3, queue="a")
+    metric.dec(queue="a")
+    depth = [7]
+    metric.set_function(lambda: depth[0], queue="b")
+    depth[0] = 9
+    with metric.track_inprogress(queue="c"):
+        assert _sample(metric, 'depth{queue="c"}') == "1"
+    assert _sample(metric, 'depth{queue="a"}') == "2"
+    assert _sample(metric, 'depth{queue="b"}') == "9"
+    assert _sample(metric, 'depth{queue="c"}') == "0"
+
+
+def test_label_values_are_escaped():
+    metric = Counter("odd_total", "Odd labels.", ("value",))
+    metric.inc(value='say "hi"\\now\nplease')
+    assert _lines(metric)[-1] == 'odd_total{value="say \\"hi\\"\\\\now\\nplease"} 1'
+
+
+def test_registry_renders_every_metric_once():
+    registry = Registry()
+    first = registry.register(Counter("a_total", "A."))
+    assert registry.register(Counter("a_total", "Another A.")) is first
+    registry.register(Gauge("b", "B."))
+    first.inc()
+    assert registry.render() == (
+        "# HELP a_total A.\n# TYPE a_total counter\na_total 1\n# HELP b B.\n# TYPE b gauge\n"
+    )
+
+
+def test_metrics_endpoint():
+    from app import build_app
+
+    with TestClient(build_app("http://testserver", warmup=False)) as client:
+        client.post("/review", json={})
+        response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE expense_http_requests_total counter" in lines
+    prefixes = (
+        'expense_http_requests_total{route="/review",status="400"} ',
+        'expense_http_request_duration_seconds_count{route="/review"} ',
+    )
+    for prefix in prefixes:
+        assert any(line.startswith(prefix) for line in lines), prefix
+
+
+# endregion
+
+# region track_request
+
+
+def _status_count(route: str, status: int) -> float:
+    return HTTP_TOTAL._values.get((route, str(status)), 0)
+
+
+def _request_count(route: str) -> int:
+    counts = HTTP_SECONDS._values.get((route,))
+    return sum(counts[0]) if counts else 0
+
+
+@pytest.fixture
+def client():
+    async def ok(request):
+        return JSONResponse({"ok": True}, status_code=201)
+
+    async def stream(request):
+        async def chunks():
+            yield b"a"
+            assert HTTP_IN_FLIGHT._values[("/test/stream",)] == 1
+            yield b"b"
+
+        return StreamingResponse(chunks(), status_code=206)
+
+    async def broken_stream(request):
+        async def chunks():
+            yield b"a"
+            raise RuntimeError("stream failed")
+
+        return StreamingResponse(chunks())
+
+    async def fail(request):
+        raise RuntimeError("handler failed")
+
+    app = Starlette()
+    app.add_route("/ok", track_request("/test/ok")(ok))
+    app.add_route("/stream", track_request("/test/stream")(stream))
+    app.add_route("/broken-stream", track_request("/test/broken-stream")(broken_stream))
+    app.add_route("/fail", track_request("/test/fail")(fail))
+    with TestClient(app, raise_server_exceptions=False) as client:
+        yield client
+
+
+def test_status_code_is_recorded(client):
+    before = _status_count("/test/ok", 201)
+    assert client.get("/ok").status_code == 201
+    assert _status_count("/test/ok", 201) == before + 1
+    assert HTTP_IN_FLIGHT._values[("/test/ok",)] == 0
+
+
+def test_streaming_response_is_recorded_when_the_body_is_sent(client):
+    before = (_status_count("/test/stream", 206), _request_count("/test/stream"))
+    assert client.get("/stream").content == b"ab"
+    assert (_status_count("/test/stream", 206), _request_count("/test/stream")) == (
+        before[0] + 1,
+        before[1] + 1,
+    )
+    assert HTTP_IN_FLIGHT._values[("/test/stream",)] == 0
+
+
+def test_failed_stream_is_recorded_once(client):
+    before = (_status_count("/test/broken-stream", 200), _request_count("/test/broken-stream"))
+    client.get("/broken-stream")
+    # The status line had already gone out, so the request counts as a 200.
+    assert (_status_count("/test/broken-stream", 200), _request_count("/test/broken-stream")) == (
+        before[0] + 1,
+        before[1] + 1,
+    )
+    assert HTTP_IN_FLIGHT._values[("/test/broken-stream",)] == 0
+
+
+def test_exception_is_recorded_as_500(client):
+    before = _status_count("/test/fail", 500)
+    assert client.get("/fail").status_code == 500
+    assert _status_count("/test/fail", 500) == before + 1
+    assert HTTP_IN_FLIGHT._values[("/test/fail",)] == 0
+
+
+# endregion
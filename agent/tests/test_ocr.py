@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the receipt field scanner."""
+
+import pytest
+
+from ocr import _scan_fields
+
+
+@pytest.mark.parametrize(
+    "text, amount, currency",
+    [
+        ("Cafe\nTotal 3 items\n¥1,200", "1200.00", "JPY"),
+        ("カフェ\n合計 5点\n1,980円", "1980.00", "JPY"),
+        ("Cafe\nLatte 4.50\nTotal 2 items 9.00 USD", "9.00", "USD"),
+        ("Cafe\nTotal $12.50", "12.50", "USD"),
+    ],
+)
+def test_item_counts_are_not_totals(text, amount, currency):
+    fields = _scan_fields(text)
+    assert (fields.amount, fields.currency) == (amount, currency)
+
+
+@pytest.mark.parametrize(
+    "text, amount",
+    [
+        ("スーパー\nお買上合計 650\nお預り 1000\nお釣り 350", "650.00"),
+        ("スーパー\n総合計 ¥2,480\nお預り ¥3,000", "2480.00"),
+        ("カフェ\n小計 100\n税込合計 110\nお預り 200", "110.00"),
+    ],
+)
+def test_total_keyword_inside_a_longer_word(text, amount):
+    assert _scan_fields(text).amount == amount
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("店\n令和6年4月1日\n合計 100", "2024/04/01"),
+        ("店\n令和元年5月1日\n合計 100", "2019/05/01"),
+        ("Diner\n04/05/2025\nTotal 10.00", "2025/04/05"),  # MM/DD/YYYY
+        ("Diner\n25/12/2025\nTotal 10.00", "2025/12/25"),  # DD/MM/YYYY when MM is impossible
+        ("Diner\n13/13/2025\nTotal 10.00", ""),
+    ],
+)
+def test_dates(text, expected):
+    assert _scan_fields(text).date == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "店\n登録番号 T12345678901234\n¥500",
+        "店\nカード 12345678901234\n合計 ¥500",
+    ],
+)
+def test_long_digit_runs_are_not_amounts(text):
+    assert _scan_fields(text).amount == "500.00"
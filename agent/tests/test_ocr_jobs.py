@@ -0,0 +1,234 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for batch OCR jobs and their endpoints."""
+
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from starlette.testclient import TestClient
+
+import app as app_module
+import ocr_jobs
+from app import build_app
+from ocr import OcrResult
+from ocr_jobs import JOB_DONE, JOB_FAILED, OcrJobQueue, job_payload
+from ocr_store import OcrResultStore
+
+
+class FakeOcr:
+    """Stands in for extract_from_base64; blocks while the gate is closed."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, file_base64, file_type, file_name):
+        assert self.gate.wait(5), "the test never opened the gate"
+        if file_base64 == "bad":
+            raise ValueError("not an image")
+        return OcrResult(
+            receipt_name=file_name, text="", merchant=file_base64, date="", amount="", currency=""
+        )
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    fake = FakeOcr()
+    monkeypatch.setattr(ocr_jobs, "extract_from_base64", fake)
+    return fake
+
+
+@pytest.fixture
+def queues(monkeypatch):
+    """The OcrJobQueue instances build_app creates."""
+    created = []
+
+    def record(**kwargs):
+        queue = OcrJobQueue(workers=2, **kwargs)
+        created.append(queue)
+        return queue
+
+    monkeypatch.setattr(app_module, "OcrJobQueue", record)
+    return created
+
+
+@pytest.fixture
+def client(fake_ocr, queues):
+    with TestClient(build_app("http://testserver", warmup=False)) as client:
+        yield client
+
+
+def _files(*names: str) -> dict:
+    return {"files": [{"fileBase64": name, "fileName": f"{name}.png"} for name in names]}
+
+
+def _wait(queue: OcrJobQueue, job_id: str) -> None:
+    queue.get(job_id).future.result(timeout=5)
+
+
+# region queue
+
+
+def test_job_lifecycle(fake_ocr):
+    store = OcrResultStore()
+    queue = OcrJobQueue(workers=1, result_store=store)
+    fake_ocr.gate.clear()
+    job = queue.submit("cafe", "image/png", "a.png")
+    assert queue.get(job.id) is job
+    assert queue.pending() == 1
+
+    fake_ocr.gate.set()
+    job.future.result(timeout=5)
+    payload = job_payload(job)
+    assert payload["status"] == JOB_DONE
+    assert payload["result"]["merchant"] == "cafe"
+    assert store.get(payload["result"]["ocrId"]).merchant == "cafe"
+    assert queue.pending() == 0
+    queue.shutdown()
+
+
+def test_failed_job(fake_ocr):
+    queue = OcrJobQueue(workers=1)
+    job = queue.submit("bad", "image/png", "a.png")
+    job.future.result(timeout=5)
+    assert job_payload(job) == {
+        "jobId": job.id,
+        "fileName": "a.png",
+        "status": JOB_FAILED,
+        "error": "not an image",
+    }
+    queue.shutdown()
+
+
+def test_finished_jobs_are_pruned_after_the_ttl(fake_ocr, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ocr_jobs, "time", SimpleNamespace(time=lambda: now[0]))
+    queue = OcrJobQueue(workers=1, ttl_seconds=60)
+    old = queue.submit("a", "image/png", "a.png")
+    old.future.result(timeout=5)
+
+    now[0] += 60
+    queue.submit("b", "image/png", "b.png").future.result(timeout=5)
+    assert queue.get(old.id) is old
+
+    now[0] += 1
+    recent = queue.submit("c", "image/png", "c.png")
+    assert queue.get(old.id) is None
+    assert queue.get(recent.id) is recent
+    queue.shutdown()
+
+
+def test_unfinished_jobs_are_not_pruned(fake_ocr, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ocr_jobs, "time", SimpleNamespace(time=lambda: now[0]))
+    queue = OcrJobQueue(workers=1, ttl_seconds=60)
+    fake_ocr.gate.clear()
+    running = queue.submit("a", "image/png", "a.png")
+    now[0] += 3600
+    queue.submit("b", "image/png", "b.png")
+    assert queue.get(running.id) is running
+    fake_ocr.gate.set()
+    queue.shutdown()
+
+
+def test_shutdown_drops_queued_jobs(fake_ocr):
+    queue = OcrJobQueue(workers=1)
+    fake_ocr.gate.clear()
+    running = queue.submit("a", "image/png", "a.png")
+    queued = queue.submit("b", "image/png", "b.png")
+    queue.shutdown()
+    fake_ocr.gate.set()
+    assert queued.future.cancelled()
+    running.future.result(timeout=5)
+
+
+# endregion
+
+# region endpoints
+
+
+def test_submit_and_poll(client, queues):
+    response = client.post("/ocr/jobs", json=_files("a", "b"))
+    assert response.status_code == 202
+    jobs = response.json()["jobs"]
+    assert [job["fileName"] for job in jobs] == ["a.png", "b.png"]
+
+    for job in jobs:
+        _wait(queues[0], job["jobId"])
+        polled = client.get(f"/ocr/jobs/{job['jobId']}").json()
+        assert polled["status"] == JOB_DONE
+        assert polled["result"]["ocrId"]
+    assert client.get("/ocr/jobs/unknown").status_code == 404
+
+
+def test_watch_events(client, fake_ocr):
+    fake_ocr.gate.clear()
+    jobs = client.post("/ocr/jobs", json=_files("a", "bad")).json()["jobs"]
+    job_ids = [job["jobId"] for job in jobs]
+    fake_ocr.gate.set()
+
+    events = []
+    with client.stream("GET", f"/ocr/jobs/events?ids={','.join(job_ids)},missing") as response:
+        event = ""
+        for line in response.iter_lines():
+            if line.startswith("event:"):
+                event = line.partition(":")[2].strip()
+            elif line.startswith("data:"):
+                events.append((event, json.loads(line.partition(":")[2])))
+
+    assert events[-1] == ("end", {})
+    assert ("missing", {"jobId": "missing"}) in events
+    # A job still running when the stream opened also gets an earlier event;
+    # its last one carries the outcome.
+    finished = {data["jobId"]: data["status"] for event, data in events if event == "status"}
+    assert finished == dict(zip(job_ids, [JOB_DONE, JOB_FAILED]))
+
+
+def test_lifespan_shuts_the_executor_down(fake_ocr, queues):
+    with TestClient(build_app("http://testserver", warmup=False)):
+        pass
+    with pytest.raises(RuntimeError):
+        queues[0].submit("a", "image/png", "a.png")
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [{}, {"files": []}, {"files": "a"}, {"files": [{"fileName": "a.png"}]}],
+)
+def test_invalid_batches(client, payload):
+    assert client.post("/ocr/jobs", json=payload).status_code == 400
+
+
+def test_too_many_files(fake_ocr, monkeypatch, queues):
+    monkeypatch.setenv("OCR_JOB_MAX_FILES", "2")
+    with TestClient(build_app("http://testserver", warmup=False)) as client:
+        assert client.post("/ocr/jobs", json=_files("a", "b")).status_code == 202
+        response = client.post("/ocr/jobs", json=_files("a", "b", "c"))
+    assert response.status_code == 413
+    assert response.json() == {"error": "At most 2 files per request"}
+
+
+def test_too_many_bytes(fake_ocr, monkeypatch, queues):
+    monkeypatch.setenv("OCR_JOB_MAX_BYTES", "6")
+    with TestClient(build_app("http://testserver", warmup=False)) as client:
+        # Eight base64 characters decode to six bytes.
+        assert client.post("/ocr/jobs", json=_files("aaaa", "bbbb")).status_code == 202
+        response = client.post("/ocr/jobs", json=_files("aaaa", "bbbb", "cccc"))
+    assert response.status_code == 413
+    assert response.json() == {"error": "At most 6 bytes of files per request"}
+
+
+# endregion
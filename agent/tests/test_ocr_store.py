@@ -0,0 +1,218 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the short-lived OCR result store and the requests that use it."""
+
+from types import SimpleNamespace
+
+import pytest
+from starlette.testclient import TestClient
+
+import agent_executor
+import ocr_store
+from agent_executor import ExpenseAgentExecutor
+from app import build_app
+from ocr import OcrResult
+from ocr_store import OcrResultStore
+
+
+def _result(merchant: str = "Cafe") -> OcrResult:
+    return OcrResult(
+        receipt_name="r.png",
+        text="",
+        merchant=merchant,
+        date="2025/04/01",
+        amount="1200.00",
+        currency="JPY",
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ocr_store, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(autouse=True)
+def no_model(monkeypatch):
+    # Reviews use the static fallback, which shows the OCR fields.
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("REVIEW_LLM_BUDGET_SECONDS", raising=False)
+
+
+def _merchant(messages: list[dict]) -> str:
+    contents = messages[-1]["dataModelUpdate"]["contents"]
+    return next(entry["valueString"] for entry in contents if entry["key"] == "merchant")
+
+
+# region store
+
+
+def test_put_and_get(clock):
+    store = OcrResultStore(ttl_seconds=60, max_entries=10)
+    ocr_id = store.put(_result())
+    assert store.get(ocr_id) == _result()
+    assert store.get("unknown") is None
+    assert len(store) == 1
+
+
+def test_results_expire(clock):
+    store = OcrResultStore(ttl_seconds=60, max_entries=10)
+    ocr_id = store.put(_result())
+    clock[0] += 60
+    assert store.get(ocr_id) == _result()
+    clock[0] += 1
+    assert store.get(ocr_id) is None
+    assert len(store) == 0
+
+
+def test_expired_results_are_evicted_on_put(clock):
+    store = OcrResultStore(ttl_seconds=60, max_entries=10)
+    store.put(_result())
+    clock[0] += 30
+    store.put(_result())
+    clock[0] += 31
+    store.put(_result())
+    assert len(store) == 2
+
+
+def test_oldest_results_are_evicted_over_max_entries(clock):
+    store = OcrResultStore(ttl_seconds=60, max_entries=2)
+    ids = [store.put(_result(str(index))) for index in range(3)]
+    assert store.get(ids[0]) is None
+    assert [store.get(ocr_id).merchant for ocr_id in ids[1:]] == ["1", "2"]
+    assert len(store) == 2
+
+
+def test_limits_from_the_environment(clock, monkeypatch):
+    monkeypatch.setenv("OCR_RESULT_TTL_SECONDS", "5")
+    monkeypatch.setenv("OCR_RESULT_MAX_ENTRIES", "1")
+    store = OcrResultStore()
+    first = store.put(_result())
+    second = store.put(_result())
+    assert store.get(first) is None
+    clock[0] += 6
+    assert store.get(second) is None
+
+
+# endregion
+
+# region /review
+
+
+@pytest.fixture
+def store(clock):
+    return OcrResultStore(ttl_seconds=60, max_entries=10)
+
+
+@pytest.fixture
+def client(store):
+    with TestClient(build_app("http://testserver", ocr_results=store, warmup=False)) as client:
+        yield client
+
+
+def test_review_by_ocr_id(client, store):
+    response = client.post("/review", json={"ocrId": store.put(_result("Cafe"))})
+    assert response.status_code == 200
+    assert _merchant(response.json()) == "Cafe"
+
+
+def test_review_with_unknown_ocr_id(client):
+    response = client.post("/review", json={"ocrId": "unknown"})
+    assert response.status_code == 404
+    assert response.json() == {"error": "ocrId not found or expired"}
+
+
+def test_review_with_expired_ocr_id(client, store, clock):
+    ocr_id = store.put(_result())
+    clock[0] += 61
+    response = client.post("/review", json={"ocrId": ocr_id})
+    assert response.status_code == 404
+
+
+def test_review_without_ocr_id_or_file(client):
+    assert client.post("/review", json={}).status_code == 400
+
+
+# endregion
+
+# region upload_receipt
+
+
+class _Events:
+    def __init__(self):
+        self.events = []
+
+    async def enqueue_event(self, event) -> None:
+        self.events.append(event)
+
+
+def _context() -> SimpleNamespace:
+    return SimpleNamespace(current_task=SimpleNamespace(id="task", context_id="ctx"), message=None)
+
+
+async def _upload(store: OcrResultStore, action_context: dict) -> list:
+    events = _Events()
+    executor = ExpenseAgentExecutor("http://testserver", ocr_results=store)
+    await executor._handle_action(_context(), events, True, "upload_receipt", action_context, "")
+    return events.events
+
+
+def _text(event) -> str:
+    return "".join(getattr(part.root, "text", "") for part in event.status.message.parts)
+
+
+def _data_parts(event) -> list[dict]:
+    return [part.root.data for part in event.status.message.parts if hasattr(part.root, "data")]
+
+
+@pytest.fixture
+def ocr_calls(monkeypatch):
+    calls = []
+
+    async def fake_ocr(file_base64, file_type, receipt_name):
+        calls.append(file_base64)
+        return _result("Uploaded")
+
+    monkeypatch.setattr(agent_executor, "ocr_receipt", fake_ocr)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_upload_by_ocr_id_skips_ocr(store, ocr_calls):
+    (event,) = await _upload(store, {"ocrId": store.put(_result("Cafe"))})
+    assert _merchant(_data_parts(event)) == "Cafe"
+    assert ocr_calls == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("expired", [False, True])
+async def test_upload_with_unknown_ocr_id_and_no_file(store, clock, ocr_calls, expired):
+    ocr_id = store.put(_result()) if expired else "unknown"
+    clock[0] += 61
+    (event,) = await _upload(store, {"ocrId": ocr_id})
+    assert _text(event) == "アップロードデータが見つかりませんでした。"
+    assert ocr_calls == []
+
+
+@pytest.mark.asyncio
+async def test_upload_with_expired_ocr_id_falls_back_to_the_file(store, clock, ocr_calls):
+    ocr_id = store.put(_result("Cafe"))
+    clock[0] += 61
+    (event,) = await _upload(store, {"ocrId": ocr_id, "fileBase64": "aGVsbG8="})
+    assert _merchant(_data_parts(event)) == "Uploaded"
+    assert ocr_calls == ["aGVsbG8="]
+
+
+# endregion
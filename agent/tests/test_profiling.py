@@ -0,0 +1,146 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for request profiling and its admin endpoint."""
+
+import pstats
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+import app as app_module
+from app import build_app
+from profiling import RequestProfiler, capture_thread
+
+
+def _busy() -> int:
+    return sum(range(1000))
+
+
+# region profiler
+
+
+@pytest.mark.asyncio
+async def test_profile_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    profiler = RequestProfiler(directory=str(tmp_path), sample_rate=0)
+    threads = []
+    write = profiler._write
+
+    def record_thread(name, profiles):
+        threads.append(threading.current_thread())
+        write(name, profiles)
+
+    monkeypatch.setattr(profiler, "_write", record_thread)
+
+    async def handler():
+        return _busy()
+
+    assert await profiler.run("review", True, handler) == _busy()
+    assert threads and threads[0] is not threading.current_thread()
+    (path,) = tmp_path.glob("*-review.prof")
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_work_is_in_the_same_profile(tmp_path):
+    from starlette.concurrency import run_in_threadpool
+
+    profiler = RequestProfiler(directory=str(tmp_path), sample_rate=0)
+
+    def threaded_work() -> int:
+        return _busy()
+
+    async def handler():
+        return await run_in_threadpool(capture_thread(threaded_work))
+
+    await profiler.run("ocr", True, handler)
+    (path,) = tmp_path.glob("*.prof")
+    functions = {function for _, _, function in pstats.Stats(str(path)).stats}
+    assert "threaded_work" in functions
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_are_not_profiled(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), sample_rate=0)
+
+    async def handler():
+        return 1
+
+    assert await profiler.run("review", False, handler) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_directory_is_trimmed(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), sample_rate=0, max_files=2)
+
+    async def handler():
+        return _busy()
+
+    for _ in range(4):
+        await profiler.run("review", True, handler)
+    assert len(list(tmp_path.glob("*.prof"))) == 2
+
+
+# endregion
+
+# region /admin/profiling
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    profiler = RequestProfiler(directory=str(tmp_path), sample_rate=0)
+    monkeypatch.setattr(app_module, "PROFILER", profiler)
+    return profiler
+
+
+@pytest.fixture
+def client(profiler, monkeypatch):
+    monkeypatch.setenv("PROFILE_ADMIN_TOKEN", "secret")
+    with TestClient(build_app("http://testserver", warmup=False)) as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        {"Authorization": "Bearer wrong"},
+        {"Authorization": "secret"},
+        {"Authorization": "Basic secret"},
+    ],
+)
+def test_admin_requires_the_token(client, profiler, headers):
+    assert client.get("/admin/profiling", headers=headers).status_code == 403
+    response = client.put("/admin/profiling", headers=headers, json={"sampleRate": 1})
+    assert response.status_code == 403
+    assert profiler.sample_rate == 0
+
+
+def test_admin_is_off_without_a_token(client, monkeypatch):
+    monkeypatch.delenv("PROFILE_ADMIN_TOKEN")
+    assert client.get("/admin/profiling").status_code == 403
+    assert client.get("/admin/profiling", headers={"Authorization": "Bearer "}).status_code == 403
+
+
+def test_admin_sets_the_sample_rate(client, tmp_path):
+    headers = {"Authorization": "Bearer secret"}
+    response = client.put("/admin/profiling", headers=headers, json={"sampleRate": 2})
+    assert response.json() == {"enabled": True, "directory": str(tmp_path), "sampleRate": 1.0}
+    assert client.get("/admin/profiling", headers=headers).json()["sampleRate"] == 1.0
+    response = client.put("/admin/profiling", headers=headers, json={"sampleRate": "often"})
+    assert response.status_code == 400
+
+
+# endregion
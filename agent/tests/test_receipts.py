@@ -0,0 +1,218 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for coalesced reviews, the review budget and the late AI review cache."""
+
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import receipts
+import ui_builder
+from ui_builder import build_review_fallback
+
+FORM = {"receiptName": "lunch.jpg", "date": "2025/04/01", "amount": "1200", "currency": "JPY"}
+
+
+def _ai_layout(data) -> list[dict]:
+    """The fallback with another title, so it passes repair unchanged but is recognisable."""
+    messages = build_review_fallback(data)
+    for component in messages[1]["surfaceUpdate"]["components"]:
+        if component["id"] == "review-title":
+            component["component"]["Text"]["text"]["literalString"] = "AI確認"
+    return messages
+
+
+class StubModel:
+    """Stands in for the OpenAI client; each call blocks until release() is called."""
+
+    def __init__(self, output):
+        self.output = output
+        self.calls = 0
+        self.started = threading.Event()
+        self._released = threading.Event()
+
+    def release(self) -> None:
+        self._released.set()
+
+    def with_options(self, **options):
+        return self
+
+    @property
+    def responses(self):
+        return self
+
+    def create(self, **request):
+        self.calls += 1
+        self.started.set()
+        assert self._released.wait(5), "the test never released the model"
+        if isinstance(self.output, Exception):
+            raise self.output
+        return SimpleNamespace(output_text=self.output)
+
+
+@pytest.fixture(autouse=True)
+def review_env(monkeypatch):
+    monkeypatch.setattr(receipts, "_late_reviews", type(receipts._late_reviews)())
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("REVIEW_LLM_BUDGET_SECONDS", "0.05")
+    monkeypatch.delenv("OPENAI_FAST_MODEL", raising=False)
+    monkeypatch.delenv("REVIEW_LATE_CACHE_TTL_SECONDS", raising=False)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    def install(output) -> StubModel:
+        model = StubModel(output)
+        monkeypatch.setattr(ui_builder, "_openai_client", lambda api_key, base_url: model)
+        return model
+
+    return install
+
+
+async def _settle() -> None:
+    """Waits for review calls that outlived their request."""
+    for _ in range(500):
+        if receipts._review_calls.in_flight() == 0:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("review call still running")
+
+
+def _title(messages) -> str:
+    components = messages[1]["surfaceUpdate"]["components"]
+    title = next(component for component in components if component["id"] == "review-title")
+    return title["component"]["Text"]["text"]["literalString"]
+
+
+# region budget
+
+
+@pytest.mark.asyncio
+async def test_late_ai_review_is_served_to_the_next_request(stub_model):
+    model = stub_model(json.dumps(_ai_layout(FORM), ensure_ascii=False))
+
+    assert await receipts.review_receipt(FORM) == build_review_fallback(FORM)
+    model.release()
+    await _settle()
+
+    messages = await receipts.review_receipt(FORM)
+    assert _title(messages) == "AI確認"
+    assert model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_late_review_is_retried(stub_model):
+    model = stub_model(RuntimeError("model unavailable"))
+
+    assert await receipts.review_receipt(FORM) == build_review_fallback(FORM)
+    model.release()
+    await _settle()
+    assert not receipts._late_reviews
+
+    # The fallback was not cached, so the next request asks the model again.
+    assert await receipts.review_receipt(FORM) == build_review_fallback(FORM)
+    assert model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_unusable_late_review_is_retried(stub_model):
+    model = stub_model("not json at all")
+
+    await receipts.review_receipt(FORM)
+    model.release()
+    await _settle()
+
+    assert await receipts.review_receipt(FORM) == build_review_fallback(FORM)
+    assert model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_late_review_expires(stub_model, monkeypatch):
+    monkeypatch.setenv("REVIEW_LATE_CACHE_TTL_SECONDS", "0.01")
+    model = stub_model(json.dumps(_ai_layout(FORM), ensure_ascii=False))
+
+    await receipts.review_receipt(FORM)
+    model.release()
+    await _settle()
+    await asyncio.sleep(0.02)
+
+    # The model is already released, so this call finishes within the budget.
+    monkeypatch.setenv("REVIEW_LLM_BUDGET_SECONDS", "5")
+    assert _title(await receipts.review_receipt(FORM)) == "AI確認"
+    assert model.calls == 2
+
+
+# endregion
+
+# region coalescing
+
+
+@pytest.mark.asyncio
+async def test_identical_reviews_share_one_model_call(stub_model, monkeypatch):
+    monkeypatch.delenv("REVIEW_LLM_BUDGET_SECONDS")
+    model = stub_model(json.dumps(_ai_layout(FORM), ensure_ascii=False))
+    waiters = [asyncio.ensure_future(receipts.review_receipt(dict(FORM))) for _ in range(4)]
+    assert await asyncio.to_thread(model.started.wait, 5)
+    model.release()
+
+    results = await asyncio.gather(*waiters)
+    assert [_title(messages) for messages in results] == ["AI確認"] * 4
+    assert model.calls == 1
+    # Each caller gets its own copy.
+    assert len({id(messages) for messages in results}) == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_review_does_not_cancel_the_shared_call(stub_model, monkeypatch):
+    monkeypatch.delenv("REVIEW_LLM_BUDGET_SECONDS")
+    model = stub_model(json.dumps(_ai_layout(FORM), ensure_ascii=False))
+    first = asyncio.ensure_future(receipts.review_receipt(FORM))
+    second = asyncio.ensure_future(receipts.review_receipt(FORM))
+    assert await asyncio.to_thread(model.started.wait, 5)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    model.release()
+    assert _title(await second) == "AI確認"
+    assert model.calls == 1
+
+
+def _raise_after(model: StubModel):
+    def review(data):
+        model.create()
+        raise RuntimeError("review crashed")
+
+    return review
+
+
+@pytest.mark.asyncio
+async def test_review_error_reaches_every_waiter(stub_model, monkeypatch):
+    monkeypatch.delenv("REVIEW_LLM_BUDGET_SECONDS")
+    model = stub_model(None)
+    # A failure inside the shared call itself, not one try_ai_review turns into the fallback.
+    monkeypatch.setattr(receipts, "try_ai_review", _raise_after(model))
+    waiters = [asyncio.ensure_future(receipts.review_receipt(FORM)) for _ in range(3)]
+    assert await asyncio.to_thread(model.started.wait, 5)
+    model.release()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [type(result) for result in results] == [RuntimeError] * 3
+    assert model.calls == 1
+
+
+# endregion
@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for coalescing concurrent calls."""
+
+import asyncio
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class Blocking:
+    """A thread-pool function that counts its calls and blocks until released."""
+
+    def __init__(self, result=None, error: Exception | None = None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.started = threading.Event()
+        self._released = threading.Event()
+
+    def release(self) -> None:
+        self._released.set()
+
+    def __call__(self, *args):
+        self.calls += 1
+        self.started.set()
+        assert self._released.wait(5), "the test never released the call"
+        if self.error is not None:
+            raise self.error
+        return (self.result, *args)
+
+
+async def _started(func: Blocking) -> None:
+    assert await asyncio.to_thread(func.started.wait, 5)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    func = Blocking("r")
+    waiters = [asyncio.ensure_future(flight.run("k", func, i)) for i in range(5)]
+    await _started(func)
+    assert flight.in_flight() == 1
+
+    func.release()
+    # Later callers share the first caller's arguments as well as its result.
+    assert await asyncio.gather(*waiters) == [("r", 0)] * 5
+    assert func.calls == 1
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flight = SingleFlight()
+    func = Blocking("r")
+    func.release()
+    assert await asyncio.gather(flight.run("a", func, 1), flight.run("b", func, 2)) == [("r", 1), ("r", 2)]
+    assert func.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight()
+    func = Blocking("r")
+    func.release()
+    await flight.run("k", func)
+    await flight.run("k", func)
+    assert func.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_does_not_cancel_the_others():
+    flight = SingleFlight()
+    func = Blocking("r")
+    first = asyncio.ensure_future(flight.run("k", func))
+    second = asyncio.ensure_future(flight.run("k", func))
+    await _started(func)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    task = flight.start("k", func)
+    assert not task.cancelled()
+
+    func.release()
+    assert await second == ("r",)
+    assert func.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    func = Blocking(error=ValueError("boom"))
+    waiters = [asyncio.ensure_future(flight.run("k", func)) for _ in range(3)]
+    await _started(func)
+    func.release()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert func.calls == 1
+    assert flight.in_flight() == 0
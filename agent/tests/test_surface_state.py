@@ -0,0 +1,220 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the per-context A2UI delta tracker."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import surface_state
+from surface_state import SurfaceStateTracker
+
+SURFACE = "s"
+BEGIN = {"beginRendering": {"surfaceId": SURFACE, "root": "root"}}
+
+
+def _text(component_id: str, text: str) -> dict:
+    return {"id": component_id, "component": {"Text": {"text": {"literalString": text}}}}
+
+
+def _components(*components: dict) -> dict:
+    return {"surfaceUpdate": {"surfaceId": SURFACE, "components": list(components)}}
+
+
+def _data(*contents: dict, path: str | None = None) -> dict:
+    body = {"surfaceId": SURFACE, "contents": list(contents)}
+    if path is not None:
+        body["path"] = path
+    return {"dataModelUpdate": body}
+
+
+def _string(key: str, value: str) -> dict:
+    return {"key": key, "valueString": value}
+
+
+DATA = _data(_string("a", "1"), _string("b", "2"), _string("c", "3"), _string("d", "4"))
+
+
+@pytest.fixture
+def tracker():
+    return SurfaceStateTracker(max_contexts=10, ttl_seconds=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(surface_state, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+# region components
+
+
+def test_first_response_is_sent_in_full(tracker):
+    messages = [BEGIN, _components(_text("root", "x")), DATA]
+    assert tracker.diff("ctx", messages) == messages
+
+
+def test_unchanged_messages_are_suppressed(tracker):
+    messages = [BEGIN, _components(_text("root", "x"), _text("title", "y")), DATA]
+    tracker.diff("ctx", messages)
+    assert tracker.diff("ctx", messages) == []
+
+
+def test_only_changed_components_are_sent(tracker):
+    tracker.diff("ctx", [BEGIN, _components(_text("root", "x"), _text("title", "y"))])
+    updated = _components(_text("root", "x"), _text("title", "z"), _text("new", "n"))
+    delta = tracker.diff("ctx", [BEGIN, updated])
+    assert delta == [_components(_text("title", "z"), _text("new", "n"))]
+
+
+def test_changed_begin_rendering_is_sent(tracker):
+    tracker.diff("ctx", [BEGIN])
+    begin = {"beginRendering": {"surfaceId": SURFACE, "root": "other"}}
+    assert tracker.diff("ctx", [begin]) == [begin]
+
+
+def test_contexts_and_surfaces_are_tracked_separately(tracker):
+    messages = [BEGIN, _components(_text("root", "x"))]
+    tracker.diff("ctx", messages)
+    assert tracker.diff("other", messages) == messages
+    other_surface = [{"beginRendering": {"surfaceId": "t", "root": "root"}}]
+    assert tracker.diff("ctx", other_surface) == other_surface
+
+
+def test_delete_surface_resets_it(tracker):
+    messages = [BEGIN, _components(_text("root", "x"))]
+    tracker.diff("ctx", messages)
+    delete = {"deleteSurface": {"surfaceId": SURFACE}}
+    assert tracker.diff("ctx", [delete]) == [delete]
+    assert tracker.diff("ctx", messages) == messages
+
+
+def test_forget(tracker):
+    messages = [BEGIN, _components(_text("root", "x"))]
+    tracker.diff("ctx", messages)
+    tracker.forget("ctx")
+    assert tracker.diff("ctx", messages) == messages
+
+
+# endregion
+
+# region data model
+
+
+def test_changed_key_is_sent_at_its_path(tracker):
+    tracker.diff("ctx", [DATA])
+    changed = _data(_string("a", "1"), _string("b", "9"), _string("c", "3"), _string("d", "4"))
+    assert tracker.diff("ctx", [changed]) == [_data({"key": ".", "valueString": "9"}, path="/b")]
+
+
+def test_changed_map_is_sent_as_its_entries(tracker):
+    items = [_string("x", "1")]
+    tracker.diff("ctx", [_data({"key": "m", "valueMap": items}, _string("a", "1"), _string("b", "2"))])
+    changed_items = [_string("x", "2"), _string("y", "3")]
+    changed = _data({"key": "m", "valueMap": changed_items}, _string("a", "1"), _string("b", "2"))
+    delta = tracker.diff("ctx", [changed])
+    assert delta == [_data(*changed_items, path="/m")]
+
+
+def test_added_key_is_sent_at_its_path(tracker):
+    tracker.diff("ctx", [DATA])
+    grown = _data(*DATA["dataModelUpdate"]["contents"], {"key": "e", "valueNumber": 5})
+    assert tracker.diff("ctx", [grown]) == [_data({"key": ".", "valueNumber": 5}, path="/e")]
+
+
+def test_half_the_keys_changed_is_still_a_delta(tracker):
+    tracker.diff("ctx", [DATA])
+    changed = _data(_string("a", "x"), _string("b", "y"), _string("c", "3"), _string("d", "4"))
+    assert len(tracker.diff("ctx", [changed])) == 2
+
+
+def test_most_keys_changed_replaces_the_root(tracker):
+    tracker.diff("ctx", [DATA])
+    changed = _data(_string("a", "x"), _string("b", "y"), _string("c", "z"), _string("d", "4"))
+    assert tracker.diff("ctx", [changed]) == [changed]
+
+
+def test_removed_key_replaces_the_root(tracker):
+    tracker.diff("ctx", [DATA])
+    shrunk = _data(_string("a", "1"), _string("b", "2"), _string("c", "3"))
+    assert tracker.diff("ctx", [shrunk]) == [shrunk]
+
+
+def test_entry_without_a_known_value_replaces_the_root(tracker):
+    tracker.diff("ctx", [DATA])
+    odd = _data(_string("a", "1"), {"key": "b", "valueList": []}, _string("c", "3"), _string("d", "4"))
+    assert tracker.diff("ctx", [odd]) == [odd]
+    # Its state is unknown afterwards, so the next update is sent in full too.
+    assert tracker.diff("ctx", [DATA]) == [DATA]
+
+
+def test_nested_path_update_resets_the_data_state(tracker):
+    tracker.diff("ctx", [DATA])
+    nested = _data(_string("x", "1"), path="/b/items")
+    assert tracker.diff("ctx", [nested]) == [nested]
+    # The client's data no longer matches what was tracked, so the root goes out in full.
+    assert tracker.diff("ctx", [DATA]) == [DATA]
+    assert tracker.diff("ctx", [DATA]) == []
+
+
+@pytest.mark.parametrize("path", ["/", ""])
+def test_root_paths(tracker, path):
+    tracker.diff("ctx", [DATA])
+    assert tracker.diff("ctx", [_data(*DATA["dataModelUpdate"]["contents"], path=path)]) == []
+
+
+# endregion
+
+# region eviction
+
+
+def test_contexts_over_the_limit_are_evicted_oldest_first(clock):
+    tracker = SurfaceStateTracker(max_contexts=2, ttl_seconds=60)
+    for context_id in ("a", "b", "c"):
+        tracker.diff(context_id, [BEGIN])
+        clock[0] += 1
+    # c pushed out a; b is still known.
+    assert tracker.diff("b", [BEGIN]) == []
+    assert tracker.diff("a", [BEGIN]) == [BEGIN]
+
+
+def test_use_refreshes_a_context(clock):
+    tracker = SurfaceStateTracker(max_contexts=2, ttl_seconds=60)
+    tracker.diff("a", [BEGIN])
+    tracker.diff("b", [BEGIN])
+    tracker.diff("a", [BEGIN])
+    tracker.diff("c", [BEGIN])
+    assert tracker.diff("a", [BEGIN]) == []
+    assert tracker.diff("b", [BEGIN]) == [BEGIN]
+
+
+def test_idle_contexts_expire(clock):
+    tracker = SurfaceStateTracker(max_contexts=10, ttl_seconds=60)
+    tracker.diff("a", [BEGIN])
+    clock[0] += 59
+    assert tracker.diff("a", [BEGIN]) == []
+    clock[0] += 61
+    assert tracker.diff("a", [BEGIN]) == [BEGIN]
+
+
+def test_limits_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SURFACE_STATE_MAX_CONTEXTS", "1")
+    tracker = SurfaceStateTracker()
+    tracker.diff("a", [BEGIN])
+    tracker.diff("b", [BEGIN])
+    assert tracker.diff("a", [BEGIN]) == [BEGIN]
+
+
+# endregion
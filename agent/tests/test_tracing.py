@@ -0,0 +1,142 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tracing spans and the TRACE_FILE exporter."""
+
+import asyncio
+import json
+
+import pytest
+from starlette.concurrency import run_in_threadpool
+
+import tracing
+from tracing import span, stage, traced_handler, traced_stage
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(trace_file=str(path))
+    yield path
+    tracing.configure()
+
+
+def _records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _by_name(path) -> dict[str, dict]:
+    return {record["name"]: record for record in _records(path)}
+
+
+def test_one_record_per_finished_span(trace_file):
+    with span("root", receipt="a.png"):
+        with span("child"):
+            pass
+        with span("child2"):
+            pass
+    records = _records(trace_file)
+    # Children finish, and are written, before their parent.
+    assert [record["name"] for record in records] == ["child", "child2", "root"]
+    root = records[-1]
+    assert root["parentId"] is None
+    assert root["attributes"] == {"receipt": "a.png"}
+    assert root["status"] == "ok"
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert root["durationMs"] >= 0 and root["startTimeUnixNano"] > 0
+    for child in records[:2]:
+        assert (child["traceId"], child["parentId"]) == (root["traceId"], root["spanId"])
+
+
+def test_separate_roots_get_separate_traces(trace_file):
+    with span("first"):
+        pass
+    with span("second"):
+        pass
+    first, second = _records(trace_file)
+    assert first["traceId"] != second["traceId"]
+
+
+def test_failed_span_records_the_error(trace_file):
+    with pytest.raises(ValueError):
+        with span("broken"):
+            raise ValueError("bad receipt")
+    (record,) = _records(trace_file)
+    assert record["status"] == "error"
+    assert record["attributes"]["error"] == "ValueError('bad receipt')"
+
+
+@pytest.mark.asyncio
+async def test_parent_propagates_across_await_and_thread_pool(trace_file):
+    def in_thread():
+        with span("thread"):
+            pass
+
+    async def awaited():
+        await asyncio.sleep(0)
+        with span("awaited"):
+            await run_in_threadpool(in_thread)
+
+    with span("request"):
+        await awaited()
+        await run_in_threadpool(in_thread)
+
+    records = _records(trace_file)
+    spans = {record["spanId"]: record for record in records}
+    parents = sorted(
+        (record["name"], spans[record["parentId"]]["name"]) for record in records if record["parentId"]
+    )
+    assert parents == [("awaited", "request"), ("thread", "awaited"), ("thread", "request")]
+    assert len({record["traceId"] for record in records}) == 1
+    request_thread = next(record["thread"] for record in records if record["name"] == "request")
+    assert all(record["thread"] != request_thread for record in records if record["name"] == "thread")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_keep_their_own_parents(trace_file):
+    async def request(name):
+        with span(name):
+            await asyncio.sleep(0)
+            with span(f"{name}.child"):
+                await asyncio.sleep(0)
+
+    await asyncio.gather(request("a"), request("b"))
+    records = _by_name(trace_file)
+    for name in ("a", "b"):
+        assert records[f"{name}.child"]["parentId"] == records[name]["spanId"]
+
+
+@pytest.mark.asyncio
+async def test_traced_handler_and_stages(trace_file):
+    @traced_stage("ocr.extract")
+    def extract():
+        with stage("ocr.parse", pages=1):
+            pass
+
+    @traced_handler("POST /ocr")
+    async def handler():
+        await run_in_threadpool(extract)
+        return type("Response", (), {"status_code": 201})()
+
+    await handler()
+    records = _by_name(trace_file)
+    assert records["POST /ocr"]["attributes"] == {"http.status_code": 201}
+    assert records["ocr.extract"]["parentId"] == records["POST /ocr"]["spanId"]
+    assert records["ocr.parse"]["parentId"] == records["ocr.extract"]["spanId"]
+    assert records["ocr.parse"]["attributes"] == {"pages": 1}
+
+
+def test_spans_are_free_when_disabled():
+    tracing.configure()
+    with span("nothing") as current:
+        assert current is None
@@ -0,0 +1,208 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the review model routing."""
+
+import json
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import ui_builder
+from metrics import MODEL_TOTAL, REVIEW_TOTAL
+from ui_builder import build_ai_review, build_review_fallback, try_ai_review
+
+FORM = {"receiptName": "lunch.jpg", "merchant": "Cafe", "amount": "1200", "currency": "JPY"}
+FAST = "fast-model"
+MAIN = "main-model"
+
+
+def _ai_layout() -> str:
+    """The fallback with another title: valid, complete and recognisable."""
+    messages = build_review_fallback(FORM)
+    for component in messages[1]["surfaceUpdate"]["components"]:
+        if component["id"] == "review-title":
+            component["component"]["Text"]["text"]["literalString"] = "AI確認"
+    return json.dumps(messages, ensure_ascii=False)
+
+
+def _partial_layout() -> str:
+    """Only the title; the rest has to come from the fallback."""
+    messages = json.loads(_ai_layout())
+    components = messages[1]["surfaceUpdate"]["components"]
+    messages[1]["surfaceUpdate"]["components"] = [c for c in components if c["id"] == "review-title"]
+    return json.dumps(messages, ensure_ascii=False)
+
+
+UNREPAIRABLE = json.dumps([{"deleteSurface": {"surfaceId": "expense-review"}}])
+
+
+def _timeout() -> Exception:
+    return openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+
+
+class StubClient:
+    """Answers responses.create per model: a string is the output text, an exception is raised."""
+
+    def __init__(self, outputs: dict[str, object]):
+        self.outputs = outputs
+        self.calls: list[tuple[str, dict]] = []
+
+    def with_options(self, **options):
+        def create(**request):
+            return self._create(options, **request)
+
+        return SimpleNamespace(responses=SimpleNamespace(create=create))
+
+    def _create(self, options, model, input, temperature):
+        self.calls.append((model, options))
+        output = self.outputs[model]
+        if isinstance(output, Exception):
+            raise output
+        return SimpleNamespace(output_text=output)
+
+
+@pytest.fixture(autouse=True)
+def model_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_MODEL", MAIN)
+    monkeypatch.setenv("OPENAI_FAST_MODEL", FAST)
+    monkeypatch.delenv("OPENAI_TIMEOUT_SECONDS", raising=False)
+    monkeypatch.delenv("OPENAI_FAST_TIMEOUT_SECONDS", raising=False)
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    def install(**outputs) -> StubClient:
+        client = StubClient({FAST: outputs.get("fast"), MAIN: outputs.get("main")})
+        monkeypatch.setattr(ui_builder, "_openai_client", lambda api_key, base_url: client)
+        return client
+
+    return install
+
+
+@pytest.fixture
+def counts():
+    """Counter increments since the test started, by label values."""
+    before = {metric: dict(metric._values) for metric in (MODEL_TOTAL, REVIEW_TOTAL)}
+
+    def delta(metric) -> dict[tuple[str, ...], float]:
+        return {
+            key: value - before[metric].get(key, 0)
+            for key, value in metric._values.items()
+            if value != before[metric].get(key, 0)
+        }
+
+    return delta
+
+
+def _title(messages) -> str:
+    components = messages[1]["surfaceUpdate"]["components"]
+    title = next(component for component in components if component["id"] == "review-title")
+    return title["component"]["Text"]["text"]["literalString"]
+
+
+# region routing
+
+
+def test_fast_model_is_tried_first(stub_client, counts):
+    client = stub_client(fast=_ai_layout(), main=AssertionError("main model called"))
+    assert _title(try_ai_review(FORM)) == "AI確認"
+    assert client.calls == [(FAST, {"timeout": 5.0, "max_retries": 0})]
+    assert counts(MODEL_TOTAL) == {(FAST, "ok"): 1}
+    assert counts(REVIEW_TOTAL) == {("ai", ""): 1}
+
+
+def test_fast_timeout_from_the_environment(stub_client, monkeypatch):
+    monkeypatch.setenv("OPENAI_FAST_TIMEOUT_SECONDS", "1.5")
+    monkeypatch.setenv("OPENAI_TIMEOUT_SECONDS", "20")
+    client = stub_client(fast=_timeout(), main=_ai_layout())
+    try_ai_review(FORM)
+    assert client.calls == [(FAST, {"timeout": 1.5, "max_retries": 0}), (MAIN, {"timeout": 20.0})]
+
+
+@pytest.mark.parametrize(
+    "fast, outcome",
+    [
+        (_timeout(), "timeout"),
+        (RuntimeError("connection reset"), "request_failed"),
+        ("I cannot help with that.", "invalid_json"),
+        (UNREPAIRABLE, "unrepairable"),
+    ],
+)
+def test_fast_failures_fall_through_to_the_main_model(stub_client, counts, fast, outcome):
+    client = stub_client(fast=fast, main=_ai_layout())
+    assert _title(try_ai_review(FORM)) == "AI確認"
+    assert [model for model, _ in client.calls] == [FAST, MAIN]
+    assert counts(MODEL_TOTAL) == {(FAST, outcome): 1, (MAIN, "ok"): 1}
+    assert counts(REVIEW_TOTAL) == {("ai", ""): 1}
+
+
+def test_repaired_layout_is_used(stub_client, counts):
+    stub_client(fast=_partial_layout(), main=AssertionError("main model called"))
+    messages = try_ai_review(FORM)
+    assert _title(messages) == "AI確認"
+    # The components the model left out come from the fallback.
+    fallback = build_review_fallback(FORM)[1]["surfaceUpdate"]["components"]
+    components = messages[1]["surfaceUpdate"]["components"]
+    assert {component["id"] for component in components} == {component["id"] for component in fallback}
+    assert counts(MODEL_TOTAL) == {(FAST, "repaired"): 1}
+    assert counts(REVIEW_TOTAL) == {("ai", "repaired"): 1}
+
+
+@pytest.mark.parametrize(
+    "main, outcome, reason",
+    [
+        (_timeout(), "timeout", "request_failed"),
+        ("not json", "invalid_json", "invalid_json"),
+        (UNREPAIRABLE, "unrepairable", "unrepairable"),
+    ],
+)
+def test_both_models_failing_gives_the_fallback(stub_client, counts, main, outcome, reason):
+    stub_client(fast=_timeout(), main=main)
+    assert try_ai_review(FORM) is None
+    assert counts(MODEL_TOTAL) == {(FAST, "timeout"): 1, (MAIN, outcome): 1}
+    assert counts(REVIEW_TOTAL) == {("fallback", reason): 1}
+
+
+def test_build_ai_review_falls_back(stub_client):
+    stub_client(fast=_timeout(), main=_timeout())
+    assert build_ai_review(FORM) == build_review_fallback(FORM)
+
+
+@pytest.mark.parametrize("fast_model", [None, MAIN])
+def test_without_a_separate_fast_model_only_the_main_model_is_used(
+    stub_client, counts, monkeypatch, fast_model
+):
+    if fast_model is None:
+        monkeypatch.delenv("OPENAI_FAST_MODEL")
+    else:
+        monkeypatch.setenv("OPENAI_FAST_MODEL", fast_model)
+    client = stub_client(main=_ai_layout())
+    assert _title(try_ai_review(FORM)) == "AI確認"
+    # Without OPENAI_TIMEOUT_SECONDS the client's own timeout and retries apply.
+    assert client.calls == [(MAIN, {})]
+    assert counts(MODEL_TOTAL) == {(MAIN, "ok"): 1}
+
+
+def test_without_an_api_key_no_model_is_called(stub_client, counts, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY")
+    client = stub_client(fast=_ai_layout(), main=_ai_layout())
+    assert try_ai_review(FORM) is None
+    assert client.calls == []
+    assert counts(REVIEW_TOTAL) == {("fallback", "no_api_key"): 1}
+
+
+# endregion
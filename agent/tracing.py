@@ -0,0 +1,202 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lightweight tracing spans for the request pipeline.
+
+Spans nest through a context variable, so they follow the request across
+awaits and into run_in_threadpool workers. Finished spans are written as
+JSON lines to TRACE_FILE. When OTEL_EXPORTER_OTLP_ENDPOINT is set and the
+OpenTelemetry SDK with the OTLP exporter is installed, spans go to that
+collector instead. With neither configured, span() does no work.
+
+stage() is a span that also feeds expense_stage_duration_seconds.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Iterator
+
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes")
+
+    def __init__(self, name: str, parent: _Span | None, attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+_current: contextvars.ContextVar[_Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class _JsonLinesExporter:
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+class _Tracer:
+    def __init__(self) -> None:
+        self._exporter: _JsonLinesExporter | None = None
+        self._otel = None
+        self.enabled = False
+
+    def configure(self, trace_file: str | None, otlp_endpoint: str | None) -> None:
+        self._exporter = None
+        self._otel = None
+        if otlp_endpoint:
+            self._otel = _otel_tracer()
+        if self._otel is None and trace_file:
+            self._exporter = _JsonLinesExporter(trace_file)
+        self.enabled = self._otel is not None or self._exporter is not None
+
+    @contextmanager
+    def span(self, name: str, attributes: dict[str, Any]) -> Iterator[Any]:
+        if self._otel is not None:
+            with self._otel.start_as_current_span(name, attributes=attributes) as otel_span:
+                yield otel_span
+            return
+
+        current = _Span(name, _current.get(), attributes)
+        token = _current.set(current)
+        start_ns = time.time_ns()
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield current
+        except BaseException as exc:
+            status = "error"
+            current.attributes["error"] = repr(exc)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _current.reset(token)
+            self._exporter.export(
+                {
+                    "traceId": current.trace_id,
+                    "spanId": current.span_id,
+                    "parentId": current.parent_id,
+                    "name": name,
+                    "startTimeUnixNano": start_ns,
+                    "durationMs": round(duration * 1000, 3),
+                    "status": status,
+                    "thread": threading.current_thread().name,
+                    "attributes": current.attributes,
+                }
+            )
+
+
+def _otel_tracer():
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk and "
+            "opentelemetry-exporter-otlp are not installed; using TRACE_FILE."
+        )
+        return None
+    provider = TracerProvider(
+        resource=Resource.create(
+            {"service.name": os.getenv("OTEL_SERVICE_NAME", "expense-reporter")}
+        )
+    )
+    # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT and related settings itself.
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    return provider.get_tracer(__name__)
+
+
+_TRACER = _Tracer()
+_TRACER.configure(os.getenv("TRACE_FILE"), os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+
+
+def configure(trace_file: str | None = None, otlp_endpoint: str | None = None) -> None:
+    _TRACER.configure(trace_file, otlp_endpoint)
+
+
+def span(name: str, **attributes: Any) -> ContextManager[Any]:
+    """Opens a child span of the current one, or a root span if there is none."""
+    if not _TRACER.enabled:
+        return nullcontext()
+    return _TRACER.span(name, attributes)
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[Any]:
+    """A span that is also timed into expense_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        with span(name, **attributes) as current:
+            yield current
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def traced_stage(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_handler(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Opens the root span of an async request handler."""
+
+    def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(handler)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _TRACER.enabled:
+                return await handler(*args, **kwargs)
+            with span(name) as current:
+                response = await handler(*args, **kwargs)
+                status_code = getattr(response, "status_code", None)
+                if status_code is not None:
+                    current.set_attribute("http.status_code", status_code)
+                return response
+
+        return wrapper
+
+    return decorator
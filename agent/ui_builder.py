@@ -14,18 +14,38 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+import functools
 import json
 import logging
 import os
+import time
+from dataclasses import dataclass
 
-from openai import OpenAI
+from a2ui.a2ui_logging import Payload
+
+from a2ui_repair import RepairResult, parse_lenient, repair_messages
+from metrics import MODEL_SECONDS, MODEL_TOTAL, REVIEW_TOTAL
+from tracing import stage
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
 _REVIEW_SURFACE_ID = "expense-review"
 _DEFAULT_MODEL = "gpt-4o-mini"
+_DEFAULT_FAST_TIMEOUT_SECONDS = 5.0
+
+
+@functools.lru_cache(maxsize=4)
+def _openai_client(api_key: str, base_url: str | None) -> OpenAI:
+    # openai takes a large share of startup time, so it is imported on first use.
+    # One client per key/base URL so its connection pool is reused across reviews.
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, base_url=base_url)
 
 
 def _review_data_contents(data: dict[str, Any]) -> list[dict[str, Any]]:
@@ -41,7 +61,7 @@ def _review_data_contents(data: dict[str, Any]) -> list[dict[str, Any]]:
     ]
 
 
-def _build_review_fallback(data: dict[str, Any]) -> list[dict[str, Any]]:
+def build_review_fallback(data: dict[str, Any]) -> list[dict[str, Any]]:
     return [
         {
             "beginRendering": {
@@ -165,134 +185,39 @@ def _build_review_fallback(data: dict[str, Any]) -> list[dict[str, Any]]:
             "dataModelUpdate": {
                 "surfaceId": _REVIEW_SURFACE_ID,
                 "path": "/",
-                "contents": [
-                    {"key": "receiptName", "valueString": data.get("receiptName", "")},
-                    {"key": "merchant", "valueString": data.get("merchant", "")},
-                    {"key": "date", "valueString": data.get("date", "")},
-                    {"key": "amount", "valueString": data.get("amount", "")},
-                    {"key": "currency", "valueString": data.get("currency", "JPY")},
-                    {"key": "category", "valueString": data.get("category", "")},
-                    {"key": "paymentMethod", "valueString": data.get("paymentMethod", "")},
-                    {"key": "memo", "valueString": data.get("memo", "")},
-                ],
+                "contents": _review_data_contents(data),
             }
         },
     ]
 
 
-def _ensure_review_data_model(
-    messages: list[dict[str, Any]], data: dict[str, Any]
-) -> list[dict[str, Any]]:
-    contents = _review_data_contents(data)
-    data_update = None
-    for message in messages:
-        update = message.get("dataModelUpdate")
-        if update and update.get("surfaceId") == _REVIEW_SURFACE_ID:
-            data_update = update
-            break
-
-    if not data_update:
-        messages.append(
-            {
-                "dataModelUpdate": {
-                    "surfaceId": _REVIEW_SURFACE_ID,
-                    "path": "/",
-                    "contents": contents,
-                }
-            }
-        )
-        return messages
-
-    if not data_update.get("contents"):
-        data_update["contents"] = contents
-    return messages
+@dataclass(frozen=True)
+class _ModelRoute:
+    model: str
+    timeout: float | None
+    max_retries: int | None = None
 
 
-def _ensure_review_components(
-    messages: list[dict[str, Any]], data: dict[str, Any]
-) -> list[dict[str, Any]]:
-    fallback = _build_review_fallback(data)
-    fallback_components: list[dict[str, Any]] = []
-    fallback_order: list[str] = []
-    for message in fallback:
-        update = message.get("surfaceUpdate")
-        if update and update.get("surfaceId") == _REVIEW_SURFACE_ID:
-            fallback_components = update.get("components", [])
-            for component in fallback_components:
-                if component.get("id") == "review-root":
-                    try:
-                        fallback_order = (
-                            component.get("component", {})
-                            .get("Column", {})
-                            .get("children", {})
-                            .get("explicitList", [])
-                        )
-                    except AttributeError:
-                        fallback_order = []
-            break
-
-    required_by_id = {
-        component.get("id"): component
-        for component in fallback_components
-        if component.get("id")
-    }
-
-    surface_update = None
-    for message in messages:
-        update = message.get("surfaceUpdate")
-        if update and update.get("surfaceId") == _REVIEW_SURFACE_ID:
-            surface_update = update
-            break
-
-    if not surface_update:
-        messages.append(
-            {
-                "surfaceUpdate": {
-                    "surfaceId": _REVIEW_SURFACE_ID,
-                    "components": list(required_by_id.values()),
-                }
-            }
-        )
-        return messages
-
-    components = surface_update.get("components")
-    if not isinstance(components, list):
-        surface_update["components"] = list(required_by_id.values())
-        return messages
-
-    existing_ids = {component.get("id") for component in components}
-    for component_id, component in required_by_id.items():
-        if component_id not in existing_ids:
-            components.append(component)
-
-    # Ensure the explicitList includes required components in order.
-    for component in components:
-        if component.get("id") != "review-root":
-            continue
-        column = component.get("component", {}).get("Column")
-        if not isinstance(column, dict):
-            continue
-        children = column.get("children")
-        if not isinstance(children, dict):
-            continue
-        explicit_list = children.get("explicitList")
-        if not isinstance(explicit_list, list):
-            children["explicitList"] = fallback_order or list(required_by_id.keys())
-            continue
-        for item_id in fallback_order:
-            if item_id not in explicit_list:
-                explicit_list.append(item_id)
-    return messages
+def _model_routes() -> list[_ModelRoute]:
+    """The models to try in order.
 
+    With OPENAI_FAST_MODEL set, it is tried first under a tight timeout and
+    without retries, and OPENAI_MODEL is only used when that attempt fails or
+    returns a layout that cannot be repaired.
+    """
+    strong_timeout = os.getenv("OPENAI_TIMEOUT_SECONDS")
+    strong = _ModelRoute(
+        os.getenv("OPENAI_MODEL", _DEFAULT_MODEL),
+        float(strong_timeout) if strong_timeout else None,
+    )
+    fast_model = os.getenv("OPENAI_FAST_MODEL")
+    if not fast_model or fast_model == strong.model:
+        return [strong]
+    fast_timeout = float(os.getenv("OPENAI_FAST_TIMEOUT_SECONDS", _DEFAULT_FAST_TIMEOUT_SECONDS))
+    return [_ModelRoute(fast_model, fast_timeout, max_retries=0), strong]
 
-def build_ai_review(data: dict[str, Any]) -> list[dict[str, Any]]:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.warning("OPENAI_API_KEY not set; falling back to static review UI.")
-        return _build_review_fallback(data)
 
-    client = OpenAI(api_key=api_key)
-    model = os.getenv("OPENAI_MODEL", _DEFAULT_MODEL)
+def _review_prompt(data: dict[str, Any]) -> list[dict[str, str]]:
     system_prompt = {
         "role": "system",
         "content": (
@@ -326,43 +251,96 @@ def build_ai_review(data: dict[str, Any]) -> list[dict[str, Any]]:
             f"Data:\n{json.dumps(data, ensure_ascii=False)}"
         ),
     }
+    return [system_prompt, user_prompt]
+
+
+def _try_model(
+    client: OpenAI,
+    route: _ModelRoute,
+    prompt: list[dict[str, str]],
+    data: dict[str, Any],
+) -> tuple[RepairResult | None, str]:
+    """One attempt at the AI layout; returns the repaired layout or why it failed."""
+    from openai import APITimeoutError
+
+    options: dict[str, Any] = {}
+    if route.timeout is not None:
+        options["timeout"] = route.timeout
+    if route.max_retries is not None:
+        options["max_retries"] = route.max_retries
+    start = time.perf_counter()
+    result: RepairResult | None = None
     try:
-        response = client.responses.create(
-            model=model,
-            input=[system_prompt, user_prompt],
-            temperature=0.2,
-        )
+        with stage("review.openai", model=route.model):
+            response = client.with_options(**options).responses.create(
+                model=route.model,
+                input=prompt,
+                temperature=0.2,
+            )
+    except APITimeoutError:
+        logger.warning("OpenAI request to %s timed out after %ss.", route.model, route.timeout)
+        outcome = "timeout"
     except Exception as exc:
-        logger.warning("OpenAI request failed; falling back. error=%s", exc)
-        return _build_review_fallback(data)
-
-    raw = response.output_text.strip()
-    if raw:
-        logger.info("OpenAI review UI response (truncated): %s", raw[:800])
-    sanitized = raw
-    if "```" in sanitized:
-        sanitized = sanitized.replace("```json", "").replace("```", "").strip()
-    start = sanitized.find("[")
-    end = sanitized.rfind("]")
-    if start != -1 and end != -1:
-        sanitized = sanitized[start : end + 1]
+        logger.warning("OpenAI request to %s failed. error=%s", route.model, exc)
+        outcome = "request_failed"
+    else:
+        raw = response.output_text.strip()
+        if raw:
+            logger.debug("OpenAI review UI response: %s", Payload(raw))
+        with stage("review.validate"):
+            parsed = parse_lenient(raw)
+            if parsed:
+                result = repair_messages(parsed, _REVIEW_SURFACE_ID, build_review_fallback(data))
+        if result is None:
+            logger.warning("Failed to parse %s response as JSON.", route.model)
+            outcome = "invalid_json"
+        elif result.kept_components == 0:
+            logger.warning("No usable components in %s response.", route.model)
+            outcome, result = "unrepairable", None
+        elif result.repairs:
+            logger.info("Repaired AI review UI: %s", Payload(result.repairs))
+            outcome = "repaired"
+        else:
+            outcome = "ok"
+    MODEL_SECONDS.observe(time.perf_counter() - start, model=route.model)
+    MODEL_TOTAL.inc(model=route.model, outcome=outcome)
+    return result, outcome
+
+
+def warm_up() -> None:
+    """Imports openai and creates the client the first review will use."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if api_key:
+        _openai_client(api_key, os.getenv("OPENAI_BASE_URL") or None)
+    else:
+        import openai  # noqa: F401
 
-    try:
-        parsed = json.loads(sanitized)
-    except json.JSONDecodeError:
-        logger.warning("Failed to parse AI response as JSON; falling back.")
-        return _build_review_fallback(data)
 
-    if not isinstance(parsed, list):
-        logger.warning("AI response is not a list; falling back.")
-        return _build_review_fallback(data)
+def try_ai_review(data: dict[str, Any]) -> list[dict[str, Any]] | None:
+    """The AI review layout, or None when the caller should use the fallback."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.warning("OPENAI_API_KEY not set; falling back to static review UI.")
+        REVIEW_TOTAL.inc(outcome="fallback", reason="no_api_key")
+        return None
 
-    if not any("beginRendering" in message for message in parsed):
-        logger.warning("AI response missing beginRendering; falling back.")
-        return _build_review_fallback(data)
+    client = _openai_client(api_key, os.getenv("OPENAI_BASE_URL") or None)
+    prompt = _review_prompt(data)
+    outcome = ""
+    for route in _model_routes():
+        result, outcome = _try_model(client, route, prompt, data)
+        if result is not None:
+            REVIEW_TOTAL.inc(outcome="ai", reason="repaired" if result.repairs else "")
+            return result.messages
 
-    parsed = _ensure_review_components(parsed, data)
-    return _ensure_review_data_model(parsed, data)
+    logger.warning("No usable AI review UI (%s); falling back.", outcome)
+    reason = "request_failed" if outcome == "timeout" else outcome
+    REVIEW_TOTAL.inc(outcome="fallback", reason=reason)
+    return None
+
+
+def build_ai_review(data: dict[str, Any]) -> list[dict[str, Any]]:
+    return try_ai_review(data) or build_review_fallback(data)
 
 
 def build_expense_form(data: dict[str, Any]) -> list[dict[str, Any]]:
@@ -722,6 +700,129 @@ def build_search_results(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
     ]
 
 
+def _summary_items(rows: list[dict[str, Any]], label_key: str | None, empty_label: str) -> list[dict[str, Any]]:
+    from claim_table import format_amount
+
+    items = []
+    for idx, row in enumerate(rows, start=1):
+        label = row["currency"] if label_key is None else (row[label_key] or empty_label)
+        items.append(
+            {
+                "key": f"item{idx}",
+                "valueMap": [
+                    {"key": "label", "valueString": label},
+                    {"key": "amountDisplay", "valueString": f"{format_amount(row['amount'])} {row['currency']}"},
+                    {"key": "countDisplay", "valueString": f"{row['count']}件"},
+                ],
+            }
+        )
+    return items
+
+
+def build_summary(
+    totals: list[dict[str, Any]],
+    months: list[dict[str, Any]],
+    categories: list[dict[str, Any]],
+    period: str = "",
+    converted: str = "",
+) -> list[dict[str, Any]]:
+    """Renders claim totals as returned by ClaimSummary.totals.
+
+    totals are grouped by currency only, months by month and currency and
+    categories by category and currency. converted is an optional line with
+    the total converted to a single currency.
+    """
+    sections = [
+        ("totals", "通貨別合計", _summary_items(totals, None, "")),
+        ("months", "月別", _summary_items(months, "month", "日付不明")),
+        ("categories", "カテゴリ別", _summary_items(categories, "category", "未分類")),
+    ]
+    components: list[dict[str, Any]] = [
+        {
+            "id": "summary-root",
+            "component": {
+                "Column": {
+                    "children": {
+                        "explicitList": [
+                            "summary-title",
+                            "summary-period",
+                            "summary-converted",
+                            *(f"summary-{name}-{part}" for name, _, _ in sections for part in ("title", "list")),
+                        ]
+                    }
+                }
+            },
+        },
+        {
+            "id": "summary-title",
+            "component": {"Text": {"usageHint": "h2", "text": {"literalString": "経費サマリー"}}},
+        },
+        {"id": "summary-period", "component": {"Text": {"text": {"path": "period"}}}},
+        {"id": "summary-converted", "component": {"Text": {"text": {"path": "converted"}}}},
+    ]
+    for name, title, _ in sections:
+        components.append(
+            {
+                "id": f"summary-{name}-title",
+                "component": {"Text": {"usageHint": "h4", "text": {"literalString": title}}},
+            }
+        )
+        components.append(
+            {
+                "id": f"summary-{name}-list",
+                "component": {
+                    "List": {
+                        "direction": "vertical",
+                        "children": {
+                            "template": {"dataBinding": f"/{name}", "componentId": "summary-row-template"}
+                        },
+                    }
+                },
+            }
+        )
+    components.extend(
+        [
+            {"id": "summary-row-template", "component": {"Card": {"child": "summary-row"}}},
+            {
+                "id": "summary-row",
+                "component": {
+                    "Row": {
+                        "children": {
+                            "explicitList": ["summary-row-label", "summary-row-amount", "summary-row-count"]
+                        },
+                        "distribution": "spaceBetween",
+                    }
+                },
+            },
+            {"id": "summary-row-label", "component": {"Text": {"text": {"path": "label"}}}},
+            {"id": "summary-row-amount", "component": {"Text": {"text": {"path": "amountDisplay"}}}},
+            {"id": "summary-row-count", "component": {"Text": {"text": {"path": "countDisplay"}}}},
+        ]
+    )
+
+    return [
+        {
+            "beginRendering": {
+                "surfaceId": "expense-summary",
+                "root": "summary-root",
+                "styles": {"primaryColor": "#2F5AFF", "font": "Roboto"},
+            }
+        },
+        {"surfaceUpdate": {"surfaceId": "expense-summary", "components": components}},
+        {
+            "dataModelUpdate": {
+                "surfaceId": "expense-summary",
+                "path": "/",
+                "contents": [
+                    {"key": "period", "valueString": period or "全期間"},
+                    {"key": "converted", "valueString": converted},
+                    *({"key": name, "valueMap": items} for name, _, items in sections),
+                ],
+            }
+        },
+    ]
+
+
 def build_entries_screen(
     entries: list[dict[str, Any]], layout: dict[str, Any]
 ) -> list[dict[str, Any]]:
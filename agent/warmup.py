@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Optional warm-up of lazily loaded dependencies, reported through /readyz.
+
+The a2a server stack, openai, PIL/pdf2image/pytesseract and jsonschema are
+imported on first use so the process starts serving quickly. With WARMUP=1
+they are loaded in a background thread right after startup instead, and
+/readyz answers 503 until that has finished, so traffic only reaches a warm
+instance. Each step's duration is exported as
+expense_startup_seconds{phase="warmup_<step>"}.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from metrics import STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("WARMUP", "").lower() in ("1", "true", "yes")
+
+
+class Readiness:
+    def __init__(self, ready: bool):
+        self.ready = ready
+        self.steps: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+
+    def payload(self) -> dict[str, Any]:
+        return {"ready": self.ready, "steps": dict(self.steps), "errors": dict(self.errors)}
+
+
+def run_warmup(steps: list[tuple[str, Callable[[], Any]]], readiness: Readiness) -> None:
+    """Runs each step once; a failed step is logged and does not block readiness."""
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:
+            logger.warning("Warm-up step %s failed: %s", name, exc)
+            readiness.errors[name] = str(exc)
+        elapsed = time.perf_counter() - start
+        readiness.steps[name] = round(elapsed, 4)
+        STARTUP_SECONDS.set(elapsed, phase=f"warmup_{name}")
+    readiness.ready = True
+    logger.info("Warm-up finished in %.2fs", sum(readiness.steps.values()))
+
+
+def start_warmup(steps: list[tuple[str, Callable[[], Any]]], readiness: Readiness) -> threading.Thread:
+    thread = threading.Thread(
+        target=run_warmup, args=(steps, readiness), name="warmup", daemon=True
+    )
+    thread.start()
+    return thread